@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内存基准 - 用与真实爬取结果相同形态的合成书籍（作者、出版社大量重复，评分为文本），
+分别测量书籍字典列表、Book 列表和 BookTable 保存 N 本书时占用的内存（tracemalloc），
+以及 BookTable 转换为字典和 DataFrame 的耗时。每种表示在独立的子进程中测量
+
+用法:
+    python benchmarks/bench_memory.py --count 1000000
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+LAYOUTS = ('dicts', 'books', 'table')
+
+
+def synthetic_books(count, authors=200000, publishers=3000):
+    """
+    生成 count 本合成书籍：每条记录的字符串都是新建的对象（与逐页解析得到的结果一样，不共享）
+    """
+    for index in range(count):
+        subject = 1000000 + index
+        yield {
+            '书名': f"测试书名 {index} 副标题",
+            '作者': f"[中] 作者{index * 7919 % authors}",
+            '出版社': f"出版社{index * 104729 % publishers}",
+            '评分': f"{(index % 40) / 10 + 6:.1f}" if index % 17 else '',
+            '封面链接': f"https://img9.doubanio.com/view/subject/s/public/s{subject * 3}.jpg",
+            '书籍链接': f"https://book.douban.com/subject/{subject}/",
+        }
+
+
+def measure(layout, count):
+    """在当前进程中构建一种表示，返回 {'bytes': 占用字节数, 'build_seconds': 构建耗时, ...}"""
+    from douban_books import Book, BookTable
+
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    if layout == 'dicts':
+        data = list(synthetic_books(count))
+    elif layout == 'books':
+        data = [Book.from_dict(book) for book in synthetic_books(count)]
+    else:
+        data = BookTable(synthetic_books(count))
+    build_seconds = time.perf_counter() - start_time
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {'bytes': current, 'build_seconds': round(build_seconds, 3)}
+    if layout == 'table':
+        start_time = time.perf_counter()
+        for _ in data.iter_dicts():
+            pass
+        result['iter_dicts_seconds'] = round(time.perf_counter() - start_time, 3)
+        start_time = time.perf_counter()
+        data.to_frame()
+        result['to_frame_seconds'] = round(time.perf_counter() - start_time, 3)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='书籍表示的内存基准')
+    parser.add_argument('--count', type=int, default=1000000, help='书籍数量')
+    parser.add_argument('--layout', choices=LAYOUTS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.layout:
+        print(json.dumps(measure(args.layout, args.count)))
+        return
+
+    results = {}
+    for layout in LAYOUTS:
+        output = subprocess.run([sys.executable, __file__, '--count', str(args.count), '--layout', layout],
+                                check=True, capture_output=True, text=True).stdout
+        results[layout] = json.loads(output)
+
+    baseline = results['dicts']['bytes']
+    print(f"{args.count} 本书籍:")
+    names = {'dicts': '书籍字典列表', 'books': 'Book 列表', 'table': 'BookTable'}
+    for layout in LAYOUTS:
+        entry = results[layout]
+        print(f"  {names[layout]:<12}{entry['bytes'] / 1024 / 1024:>9.1f} MB  {entry['bytes'] / args.count:>6.0f} 字节/本"
+              f"  {entry['bytes'] / baseline:>6.1%}  构建 {entry['build_seconds']:.2f}s")
+    table = results['table']
+    print(f"  BookTable 逐条转换为字典 {table['iter_dicts_seconds']:.2f}s，转换为 DataFrame {table['to_frame_seconds']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
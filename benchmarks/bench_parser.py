@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+解析后端对比基准 - 在本地保存的书单页面上比较各后端的吞吐量，
+并逐字段校验各后端的结果与原始 html.parser 实现一致
+
+用法:
+    # 先保存若干页面
+    python benchmarks/bench_parser.py --save "https://www.douban.com/doulist/45298673/?start=0" --pages 5
+    # 在保存的页面上运行基准
+    python benchmarks/bench_parser.py --repeat 5
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from douban_http import create_session
+from douban_parser import PARSER_BACKENDS, parse_doulist_page
+from enhanced_douban_spider import PAGE_SIZE, build_page_url, parse_single_book
+
+
+def save_pages(doulist_url, pages, pages_dir):
+    """下载书单页面原始字节到本地目录"""
+    os.makedirs(pages_dir, exist_ok=True)
+    session = create_session()
+    for page in range(pages):
+        url = build_page_url(doulist_url, page * PAGE_SIZE)
+        response = session.get(url, timeout=10)
+        response.raise_for_status()
+        filename = os.path.join(pages_dir, f"page_{page + 1:03d}.html")
+        with open(filename, 'wb') as f:
+            f.write(response.content)
+        print(f"已保存 {filename}")
+        time.sleep(2)
+
+
+def run_benchmark(pages_dir, repeat):
+    files = sorted(glob.glob(os.path.join(pages_dir, '*.html')))
+    if not files:
+        print(f"{pages_dir} 中没有保存的页面，请先使用 --save 保存页面")
+        return 1
+
+    contents = []
+    for filename in files:
+        with open(filename, 'rb') as f:
+            contents.append(f.read())
+
+    print(f"共 {len(contents)} 个页面，{sum(map(len, contents)) / 1024:.0f} KB，每个后端重复 {repeat} 次")
+
+    reference = [parse_doulist_page(content, 'html.parser', parse_single_book) for content in contents]
+    item_count = sum(len(page.books) for page in reference)
+    baseline = None
+    exit_code = 0
+
+    print(f"\n{'后端':<12}{'页/秒':>10}{'条目/秒':>12}{'毫秒/页':>10}{'加速比':>8}  结果")
+    for backend in PARSER_BACKENDS:
+        start_time = time.perf_counter()
+        for _ in range(repeat):
+            results = [parse_doulist_page(content, backend, parse_single_book) for content in contents]
+        elapsed = (time.perf_counter() - start_time) / repeat
+
+        # 逐字段校验
+        mismatches = 0
+        for expected, actual in zip(reference, results):
+            if expected.books != actual.books or expected.has_next != actual.has_next \
+                    or expected.total_pages != actual.total_pages:
+                mismatches += 1
+        if mismatches:
+            exit_code = 1
+
+        baseline = baseline or elapsed
+        status = '一致' if not mismatches else f"{mismatches} 页不一致"
+        print(f"{backend:<12}{len(contents) / elapsed:>10.1f}{item_count / elapsed:>12.0f}"
+              f"{elapsed / len(contents) * 1000:>10.2f}{baseline / elapsed:>8.1f}x  {status}")
+
+    return exit_code
+
+
+def main():
+    parser = argparse.ArgumentParser(description='解析后端对比基准')
+    parser.add_argument('--pages-dir', default='saved_pages', help='保存页面的目录')
+    parser.add_argument('--repeat', type=int, default=3, help='每个后端重复解析的次数')
+    parser.add_argument('--save', metavar='URL', help='先从该书单URL下载页面')
+    parser.add_argument('--pages', type=int, default=5, help='配合 --save 使用，下载的页数')
+    args = parser.parse_args()
+
+    if args.save:
+        save_pages(args.save, args.pages, args.pages_dir)
+    return run_benchmark(args.pages_dir, args.repeat)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+搜索索引基准 - 用随机中文书名、作者和出版社合成 N 本书，测量建立索引、保存、载入的耗时，
+以及各类查询（书名子串、作者前缀、出版社+评分过滤、不带文本的评分排行）的延迟分位数
+
+用法:
+    python benchmarks/bench_search.py --count 1000000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from douban_search import SearchIndex
+
+# 常用汉字，书名、作者从中随机取字
+COMMON_CHARS = ('的一是了我不人在他有这个上们来到时大地为子中你说生国年着就那和要她出也得里后自以会家可下而过天去能对小多'
+                '然于心学么之都好看起发当没成只如事把还用第样道想作种开美总从无情己面最女但现前些所同日手又行意动方期它头经'
+                '长儿回位分爱老因很给名法间斯知世什两次使身者被高已亲其进此话常与活正感见明问力理尔点文几定本公特做外孩相西'
+                '果走将月十实向声车全信重三机工物气每并别真打太新比才便夫再书部水像眼等体却加电主界门利海受听表德少克代员许'
+                '稜先口由死安写性马光白或住难望教命花结乐色更拉东神记处让母父应直字场平报友关放至张认接告入笑内英军候民岁往')
+
+QUERY_KINDS = ('书名子串', '书名前缀', '作者前缀', '出版社+评分', '任意字段', '评分排行')
+
+
+def synthetic_books(count, authors=200000, publishers=3000, seed=0):
+    """生成 count 本合成书籍：书名 2~14 字，作者和出版社从固定的候选中随机选取"""
+    rng = random.Random(seed)
+    author_names = [''.join(rng.choices(COMMON_CHARS, k=rng.randint(2, 4))) for _ in range(authors)]
+    publisher_names = [''.join(rng.choices(COMMON_CHARS, k=rng.randint(2, 4))) + '出版社' for _ in range(publishers)]
+    for index in range(count):
+        yield {
+            '书名': ''.join(rng.choices(COMMON_CHARS, k=rng.randint(2, 14))),
+            '作者': rng.choice(author_names),
+            '出版社': rng.choice(publisher_names),
+            '评分': f"{rng.randint(20, 99) / 10:.1f}" if index % 17 else '',
+            '封面链接': f"https://img9.doubanio.com/view/subject/s/public/s{index}.jpg",
+            '书籍链接': f"https://book.douban.com/subject/{1000000 + index}/",
+        }
+
+
+def make_queries(index, kind, repeat, rng):
+    """从索引中已有的书籍取查询词，返回 search() 的参数列表"""
+    queries = []
+    for _ in range(repeat):
+        book = index.book(rng.randrange(len(index)))
+        if kind == '书名子串':
+            start = rng.randrange(max(1, len(book.title) - 2))
+            queries.append({'query': book.title[start:start + 3], 'field': '书名'})
+        elif kind == '书名前缀':
+            queries.append({'query': book.title[:2], 'field': '书名', 'prefix': True})
+        elif kind == '作者前缀':
+            queries.append({'query': book.author[:2], 'field': '作者', 'prefix': True})
+        elif kind == '出版社+评分':
+            queries.append({'publisher': book.publisher, 'min_rating': 8.0})
+        elif kind == '任意字段':
+            queries.append({'query': book.author})
+        else:
+            queries.append({'min_rating': 9.0})
+    return queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description='搜索索引基准')
+    parser.add_argument('--count', type=int, default=1000000, help='书籍数量')
+    parser.add_argument('--repeat', type=int, default=200, help='每类查询的次数')
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    index = SearchIndex(synthetic_books(args.count))
+    print(f"{args.count} 本书籍，建立索引 {time.perf_counter() - start_time:.1f}s")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, 'search.idx')
+        start_time = time.perf_counter()
+        index.save(path)
+        print(f"保存 {time.perf_counter() - start_time:.1f}s，文件 {os.path.getsize(path) / 1024 / 1024:.1f} MB")
+        del index
+        start_time = time.perf_counter()
+        index = SearchIndex.load(path)
+        print(f"载入 {time.perf_counter() - start_time:.2f}s")
+
+    rng = random.Random(1)
+    print(f"{'查询':<12}{'中位数':>10}{'P95':>10}{'P99':>10}")
+    for kind in QUERY_KINDS:
+        timings = []
+        for query in make_queries(index, kind, args.repeat, rng):
+            start_time = time.perf_counter()
+            index.search(k=10, **query)
+            timings.append(time.perf_counter() - start_time)
+        timings.sort()
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        p99 = timings[int(len(timings) * 0.99) - 1]
+        print(f"{kind:<12}{statistics.median(timings) * 1000:>8.3f}ms{p95 * 1000:>8.3f}ms{p99 * 1000:>8.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+冷启动基准 - 在全新的解释器进程中导入每个子命令需要的模块，测量进程总耗时（含解释器启动），
+并列出加载了哪些重依赖（requests / bs4 / lxml / PIL / openpyxl / numpy / pandas）
+
+用法:
+    python benchmarks/bench_startup.py --repeat 10
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from douban_cli import COMMAND_MODULES, HEAVY_MODULES
+
+# 进程中执行的导入语句：空解释器、旧的脚本入口，以及 douban_cli 的各子命令
+TARGETS = {
+    '(空解释器)': 'pass',
+    'enhanced_douban_spider': 'import enhanced_douban_spider',
+    'create_excel_simple': 'import create_excel_simple',
+    'douban_cli': 'import douban_cli',
+}
+TARGETS.update({
+    f'douban_cli {command}': f'import douban_cli; douban_cli.import_command({command!r})' for command in COMMAND_MODULES
+})
+
+REPORT = 'import json, sys; print(json.dumps([name for name in {heavy!r} if name in sys.modules]))'
+
+
+def run_once(statement):
+    """在新进程中执行导入语句，返回 (耗时秒数, 已加载的重依赖)"""
+    code = f"{statement}\n{REPORT.format(heavy=HEAVY_MODULES)}"
+    start_time = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True, capture_output=True, text=True).stdout
+    return time.perf_counter() - start_time, json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='冷启动基准')
+    parser.add_argument('--repeat', type=int, default=10, help='每个目标运行的次数，取中位数')
+    args = parser.parse_args()
+
+    print(f"{'目标':<28}{'中位数':>10}{'最快':>10}  已加载的重依赖")
+    for name, statement in TARGETS.items():
+        runs = [run_once(statement) for _ in range(args.repeat)]
+        seconds = [run[0] for run in runs]
+        loaded = ', '.join(runs[-1][1]) or '-'
+        print(f"{name:<28}{statistics.median(seconds) * 1000:>8.0f}ms{min(seconds) * 1000:>8.0f}ms  {loaded}")
+
+
+if __name__ == "__main__":
+    main()
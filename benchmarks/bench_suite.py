@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+离线基准套件 - 在本地替身服务器上对各热点路径计时：
+parse_single_book、完整的 crawl_all_douban_books（含流水线模式）、封面下载+缩略图、两个Excel生成器，
+规模默认为 100 / 1000 / 10000 本书。结果可保存为JSON，并与基线比较以发现性能回归
+
+用法:
+    python benchmarks/bench_suite.py --output bench_results.json
+    python benchmarks/bench_suite.py --sizes 100 1000 --baseline bench_results.json --tolerance 0.25
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_douban import FakeDouban
+
+DEFAULT_SIZES = (100, 1000, 10000)
+
+STAGES = [
+    'parse_single_book',
+    'crawl_all_douban_books',
+    'crawl_pipelined',
+    'covers_and_thumbnails',
+    'create_excel_with_covers',
+    'create_excel_from_data',
+    'create_excel_with_images',
+]
+
+
+@contextlib.contextmanager
+def quiet():
+    """屏蔽被测函数的逐条打印"""
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def timed(function, *args, **kwargs):
+    """运行一次并返回 (耗时秒数, 返回值)"""
+    with quiet():
+        start_time = time.perf_counter()
+        result = function(*args, **kwargs)
+        return time.perf_counter() - start_time, result
+
+
+def bench_size(fake, size, workers, rate):
+    """在临时工作目录中对一个规模跑完全部阶段，返回 {阶段: 秒数}"""
+    import create_excel_simple
+    from douban_http import create_session
+    from douban_parser import parse_doulist_page
+    from douban_thumbnails import thumbnail_covers
+    from enhanced_douban_spider import (PAGE_SIZE, build_page_url, crawl_all_douban_books, create_excel_with_covers,
+                                        download_covers, parse_single_book, save_data)
+
+    results = {}
+    doulist_url = fake.doulist_url(size)
+    pages = (size + PAGE_SIZE - 1) // PAGE_SIZE
+
+    # 解析：预先取回全部页面，只计解析时间
+    session = create_session()
+    contents = [session.get(build_page_url(doulist_url, page * PAGE_SIZE), timeout=10).content for page in range(pages)]
+    session.close()
+    results['parse_single_book'], _ = timed(
+        lambda: [parse_doulist_page(content, 'html.parser', parse_single_book) for content in contents])
+
+    results['crawl_all_douban_books'], books_data = timed(
+        crawl_all_douban_books, doulist_url, max_pages=pages, workers=workers, rate=rate)
+    if len(books_data) != size:
+        raise RuntimeError(f"爬取结果数量不符: 期望 {size}，实际 {len(books_data)}")
+    # 抓取线程只做I/O，解析交给进程池（每个CPU核一个进程）
+    results['crawl_pipelined'], pipelined = timed(
+        crawl_all_douban_books, doulist_url, max_pages=pages, workers=workers, rate=rate,
+        parse_workers=os.cpu_count())
+    if pipelined != books_data:
+        raise RuntimeError("流水线爬取的结果与逐线程解析不一致")
+
+    workdir = tempfile.mkdtemp(prefix=f'douban_bench_{size}_')
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        def covers_and_thumbnails():
+            cover_paths = download_covers(books_data, 'book_covers', workers)
+            return thumbnail_covers([path for path in cover_paths if path])
+
+        results['covers_and_thumbnails'], _ = timed(covers_and_thumbnails)
+        results['create_excel_with_covers'], _ = timed(create_excel_with_covers, books_data, workers=workers)
+
+        with quiet():
+            save_data(books_data)
+        results['create_excel_from_data'], _ = timed(create_excel_simple.create_excel_from_data)
+        results['create_excel_with_images'], _ = timed(create_excel_simple.create_excel_with_images)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def compare(results, baseline, tolerance, min_delta=0.05):
+    """与基线比较，返回回归列表 [(规模, 阶段, 基线秒数, 当前秒数)]；绝对差小于 min_delta 秒的视为噪声"""
+    regressions = []
+    for size, stages in results.items():
+        for stage, seconds in stages.items():
+            previous = baseline.get(size, {}).get(stage)
+            if previous and seconds > previous * (1 + tolerance) and seconds - previous >= min_delta:
+                regressions.append((size, stage, previous, seconds))
+    return regressions
+
+
+def print_table(results, baseline=None):
+    sizes = list(results)
+    print(f"\n{'阶段':<28}" + ''.join(f"{size + '本':>14}" for size in sizes))
+    for stage in STAGES:
+        cells = []
+        for size in sizes:
+            seconds = results[size].get(stage)
+            if seconds is None:
+                cells.append(f"{'-':>14}")
+                continue
+            previous = (baseline or {}).get(size, {}).get(stage)
+            change = f"{(seconds / previous - 1) * 100:+.0f}%" if previous else ''
+            cells.append(f"{seconds:>9.3f}s{change:>5}" if change else f"{seconds:>13.3f}s")
+        print(f"{stage:<28}" + ''.join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='离线基准套件')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES), help='书单规模（书籍数量）')
+    parser.add_argument('--latency', type=float, default=0.0, help='替身服务器每个请求的延迟（秒）')
+    parser.add_argument('--workers', type=int, default=8, help='抓取和下载的并发数')
+    parser.add_argument('--rate', type=float, default=1000.0, help='抓取限速（次/秒），离线测试时设得足够大')
+    parser.add_argument('--repeat', type=int, default=1, help='每个规模重复的次数，各阶段取最快的一次')
+    parser.add_argument('--output', help='把结果保存为JSON')
+    parser.add_argument('--baseline', help='基线结果JSON，超出容差的阶段视为回归')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='允许的变慢比例')
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+
+    results = {}
+    with FakeDouban(latency=args.latency) as fake:
+        print(f"替身服务器: {fake.base_url}，延迟 {args.latency * 1000:.0f} ms")
+        for size in args.sizes:
+            print(f"正在测试 {size} 本书...")
+            runs = [bench_size(fake, size, args.workers, args.rate) for _ in range(args.repeat)]
+            results[str(size)] = {stage: min(run[stage] for run in runs) for stage in runs[0]}
+
+    print_table(results, baseline)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'latency': args.latency, 'workers': args.workers, 'results': results}, f, indent=2)
+        print(f"\n结果已保存到 {args.output}")
+
+    if baseline:
+        regressions = compare(results, baseline, args.tolerance)
+        for size, stage, previous, seconds in regressions:
+            print(f"回归: {size}本 {stage} {previous:.3f}s → {seconds:.3f}s")
+        if regressions:
+            return 1
+        print(f"\n与基线相比没有超过 {args.tolerance:.0%} 的回归")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
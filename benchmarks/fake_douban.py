@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地豆瓣替身服务器 - 生成与真实页面相同结构（doulist-item / span.next / paginator）的书单页面、
+书籍详情页和封面图片，可配置每个请求的延迟，供离线基准测试使用
+
+书单 /doulist/<N>/ 包含 N 本书，因此同一个服务器可以同时提供不同规模的书单。
+
+用法:
+    python benchmarks/fake_douban.py --port 8765 --latency 0.05
+"""
+
+import argparse
+import http.server
+import io
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+PAGE_SIZE = 25
+
+
+def book_item(base_url, index, cover_count):
+    """第 index 本书的 doulist-item 片段"""
+    book_url = f"{base_url}/subject/{1000000 + index}/"
+    return f'''<div class="doulist-item"><div class="mod"><div class="bd doulist-subject">
+<div class="post"><a href="{book_url}"><img width="100" src="{base_url}/cover/{index % cover_count}.jpg"/></a></div>
+<div class="title"> <a href="{book_url}" target="_blank">测试书名 {index} &amp; 副标题</a> </div>
+<div class="rating"><span class="allstar40"></span><span class="rating_nums">{(index % 40) / 10 + 6:.1f}</span><span>({index}人评价)</span></div>
+<div class="abstract"> 作者: 作者{index % 97} <br/> 出版社: 出版社{index % 13} <br/> 出版年: {1990 + index % 30} </div>
+</div></div></div>'''
+
+
+def doulist_page(base_url, list_path, item_count, start, cover_count):
+    """书单第 start 条开始的一页"""
+    items = ''.join(book_item(base_url, index, cover_count) for index in range(start, min(start + PAGE_SIZE, item_count)))
+    total_pages = max(1, (item_count + PAGE_SIZE - 1) // PAGE_SIZE)
+    if start + PAGE_SIZE < item_count:
+        next_link = f'<span class="next"><a href="{list_path}?start={start + PAGE_SIZE}">后页&gt;</a></span>'
+    else:
+        next_link = '<span class="next">后页&gt;</span>'
+    # 与真实分页器一样只列出附近的页码
+    first_page = max(0, start // PAGE_SIZE - 4)
+    links = ''.join(f'<a href="{list_path}?start={page * PAGE_SIZE}">{page + 1}</a>'
+                    for page in range(first_page, min(total_pages, first_page + 9)))
+    return (f'<html><head><title>测试书单</title></head><body><div class="article"><div class="doulist">{items}</div>'
+            f'<div class="paginator"><span class="thispage" data-total-page="{total_pages}">{start // PAGE_SIZE + 1}</span>'
+            f'{links}{next_link}</div></div></body></html>')
+
+
+def detail_page(index):
+    """书籍详情页（只包含 #info 和评分区块）"""
+    return (f'<html><body><div id="wrapper"><div id="info">'
+            f'<span><span class="pl"> 作者</span>: <a href="#">作者{index % 97}</a></span><br/>'
+            f'<span class="pl">出版社:</span> 出版社{index % 13}<br/>'
+            f'<span class="pl">出版年:</span> {1990 + index % 30}-{index % 12 + 1}<br/>'
+            f'<span class="pl">页数:</span> {200 + index % 500}<br/>'
+            f'<span class="pl">定价:</span> {20 + index % 80}.00元<br/>'
+            f'<span class="pl">ISBN:</span> {9787000000000 + index}<br/></div>'
+            f'<div id="interest_sectl"><strong class="ll rating_num" property="v:average"> 8.0 </strong>'
+            f'<a href="collections" class="rating_people"><span property="v:votes">{index * 7}</span>人评价</a>'
+            f'</div></div></body></html>')
+
+
+def make_covers(count, size=(270, 400)):
+    """生成 count 张颜色各不相同的JPEG封面"""
+    from PIL import Image
+
+    covers = []
+    for index in range(count):
+        color = ((index * 37) % 256, (index * 91) % 256, (index * 53) % 256)
+        output = io.BytesIO()
+        Image.new('RGB', size, color).save(output, 'JPEG', quality=90)
+        covers.append(output.getvalue())
+    return covers
+
+
+class FakeDouban:
+    """
+    在后台线程中运行的替身服务器
+
+    Args:
+        latency: 每个请求的额外延迟（秒）
+        cover_count: 不同封面的数量，书籍按序号循环使用
+        port: 监听端口，0 表示自动分配
+    """
+
+    def __init__(self, latency=0.0, cover_count=50, port=0):
+        self.latency = latency
+        self.cover_count = cover_count
+        self.covers = make_covers(cover_count)
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = http.server.ThreadingHTTPServer(('127.0.0.1', port), self._handler_class())
+        self._server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        self._thread = None
+
+    def doulist_url(self, item_count):
+        """包含 item_count 本书的书单URL"""
+        return f"{self.base_url}/doulist/{item_count}/"
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with fake._lock:
+                    fake.requests += 1
+                if fake.latency:
+                    time.sleep(fake.latency)
+                url = urlparse(self.path)
+                parts = [part for part in url.path.split('/') if part]
+                try:
+                    if len(parts) == 2 and parts[0] == 'doulist':
+                        start = int(parse_qs(url.query).get('start', ['0'])[0])
+                        body = doulist_page(fake.base_url, url.path, int(parts[1]), start, fake.cover_count).encode('utf-8')
+                        content_type = 'text/html; charset=utf-8'
+                    elif len(parts) == 2 and parts[0] == 'subject':
+                        body = detail_page(int(parts[1])).encode('utf-8')
+                        content_type = 'text/html; charset=utf-8'
+                    elif len(parts) == 2 and parts[0] == 'cover':
+                        body = fake.covers[int(parts[1].split('.')[0]) % fake.cover_count]
+                        content_type = 'image/jpeg'
+                    else:
+                        raise ValueError(url.path)
+                except ValueError:
+                    self.send_response(404)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地豆瓣替身服务器')
+    parser.add_argument('--port', type=int, default=8765, help='监听端口')
+    parser.add_argument('--latency', type=float, default=0.0, help='每个请求的额外延迟（秒）')
+    parser.add_argument('--covers', type=int, default=50, help='不同封面的数量')
+    args = parser.parse_args()
+
+    fake = FakeDouban(args.latency, args.covers, args.port)
+    print(f"替身服务器已启动: {fake.base_url}")
+    print(f"示例书单（1000本）: {fake.doulist_url(1000)}")
+    try:
+        fake._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -4,98 +4,123 @@
 简化Excel生成器 - 为已爬取的数据生成带封面的Excel文件
 """
 
-import pandas as pd
 import json
+import io
 import os
-from openpyxl import Workbook
-from openpyxl.drawing.image import Image
-from openpyxl.styles import Alignment
-from PIL import Image as PILImage
+import argparse
+import logging
 
-def create_excel_from_data():
-    """从已爬取的数据创建Excel文件"""
+from douban_covers import CoverStore
+from douban_illustrated import DEFAULT_IMAGE_BYTES, DEFAULT_MAX_FILE_BYTES, DEFAULT_ROWS_PER_FILE, export_illustrated
+from douban_metrics import DEFAULT_METRICS_FILE, LOG_FORMATS, LOG_LEVELS, METRICS, setup_logging
+from douban_ndjson import NdjsonReader, index_is_current
+from douban_store import BookStore
+from douban_thumbnails import thumbnail_covers
+
+logger = logging.getLogger(__name__)
+
+def load_books(db_file=None, limit=None, json_file='douban_books_all.json', ndjson_file='douban_books_all.ndjson'):
+    """
+    读取已爬取的书籍数据
     
-    # 读取JSON数据
-    print("正在读取数据文件...")
-    with open('douban_books_all.json', 'r', encoding='utf-8') as f:
-        books_data = json.load(f)
+    save_data 与流式输出总是同时写出JSON和NDJSON，NDJSON的偏移索引与文件长度一致时优先读取：
+    只解析需要的行，全量读取时也是逐行解析，不把整个文件载入内存；索引缺失或对不上
+    （NDJSON没有写完）时读取JSON
     
-    print(f"读取到 {len(books_data)} 本书籍数据")
+    Args:
+        db_file: SQLite书籍库，传入时逐批查询，不加载整个文件
+        limit: 最多读取多少本
+        json_file: JSON数组文件
+        ndjson_file: NDJSON文件（旁边的 .idx 为偏移索引）
     
-    # 创建工作簿
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "豆瓣书单"
+    Returns:
+        tuple: (书籍可迭代对象, 书籍数量)
+    """
+    if db_file:
+        if limit is not None:
+            with BookStore(db_file) as store:
+                books_data = list(store.iter_books(limit=limit))
+            return books_data, len(books_data)
+        
+        store = BookStore(db_file)
+        try:
+            total = store.count()
+        except BaseException:
+            store.close()
+            raise
+        
+        def iter_store():
+            # 读完（或生成器被关闭）后关闭书籍库
+            try:
+                yield from store.iter_books()
+            finally:
+                store.close()
+        
+        return iter_store(), total
     
-    # 设置列标题
-    headers = ['序号', '书名', '作者', '出版社', '评分', '书籍链接', '封面状态']
-    for col, header in enumerate(headers, 1):
-        ws.cell(row=1, column=col, value=header)
+    if os.path.exists(ndjson_file) and (index_is_current(ndjson_file) or not os.path.exists(json_file)):
+        reader = NdjsonReader(ndjson_file)
+        total = len(reader) if limit is None else min(len(reader), limit)
+        if limit is not None:
+            with reader:
+                return reader.read(0, limit), total
+        
+        def iter_all():
+            with reader:
+                yield from reader
+        
+        return iter_all(), total
     
-    # 设置列宽
-    ws.column_dimensions['A'].width = 8   # 序号
-    ws.column_dimensions['B'].width = 30  # 书名
-    ws.column_dimensions['C'].width = 25  # 作者
-    ws.column_dimensions['D'].width = 20  # 出版社
-    ws.column_dimensions['E'].width = 8   # 评分
-    ws.column_dimensions['F'].width = 50  # 链接
-    ws.column_dimensions['G'].width = 15  # 封面状态
+    with open(json_file, 'r', encoding='utf-8') as f:
+        books_data = json.load(f)
+    if limit is not None:
+        books_data = books_data[:limit]
+    return books_data, len(books_data)
+
+def create_excel_from_data(db_file=None):
+    """从已爬取的数据创建Excel文件，传入 db_file 时从SQLite书籍库读取"""
+    from douban_excel import write_books_streaming
     
-    # 设置标题行高
-    ws.row_dimensions[1].height = 20
+    # 读取数据
+    print("正在读取数据文件...")
+    books_data, total = load_books(db_file)
     
-    print("开始处理书籍数据...")
+    print(f"读取到 {total} 本书籍数据")
     
-    # 获取所有封面文件
-    cover_files = os.listdir('book_covers')
-    print(f"找到 {len(cover_files)} 个封面文件")
+    # 读取封面存储的 manifest
+    store = CoverStore('book_covers')
+    print(f"找到 {len(store.covers)} 个封面文件")
     
-    # 处理每本书
-    for i, book in enumerate(books_data, 2):
-        if i % 50 == 0:  # 每50本书显示一次进度
-            print(f"已处理 {i-1} 本书籍...")
-        
-        # 填充基本信息
-        ws.cell(row=i, column=1, value=i-1)  # 序号
-        ws.cell(row=i, column=2, value=book['书名'])  # 书名
-        ws.cell(row=i, column=3, value=book['作者'])  # 作者
-        ws.cell(row=i, column=4, value=book['出版社'])  # 出版社
-        ws.cell(row=i, column=5, value=book['评分'])  # 评分
-        ws.cell(row=i, column=6, value=book['书籍链接'])  # 链接
-        
-        # 检查封面状态
-        cover_status = "无封面"
-        if book['封面链接']:
-            # 查找对应的封面文件
-            cover_files_for_book = [f for f in cover_files if f.startswith(f"cover_{i-1}_")]
-            if cover_files_for_book:
-                cover_status = f"已下载 ({cover_files_for_book[0]})"
-            else:
-                cover_status = "封面链接存在但未下载"
-        
-        ws.cell(row=i, column=7, value=cover_status)
-        
-        # 设置文本对齐
-        for col in range(1, 8):
-            ws.cell(row=i, column=col).alignment = Alignment(horizontal='left', vertical='center')
+    def cover_status(book):
+        """检查封面状态"""
+        if not book['封面链接']:
+            return "无封面"
+        # 按书籍链接查找对应的封面文件
+        cover_key, _ = store.lookup(book['书籍链接'])
+        if cover_key:
+            return f"已下载 ({cover_key}.jpg)"
+        return "封面链接存在但未下载"
     
-    # 保存Excel文件
+    print("开始处理书籍数据...")
+    
+    # 逐行流式写入
     excel_file = 'douban_books_with_covers.xlsx'
-    wb.save(excel_file)
+    rows = ((book, None, cover_status(book)) for book in books_data)
+    write_books_streaming(rows, excel_file, "豆瓣书单", '封面状态', progress_every=50)
     print(f"\nExcel文件已保存: {excel_file}")
     
     return excel_file
 
-def create_excel_with_images():
-    """创建带图片的Excel文件（处理前50本书）"""
+def create_excel_with_images(db_file=None):
+    """创建带图片的Excel文件（处理前50本书），传入 db_file 时从SQLite书籍库读取"""
+    from openpyxl import Workbook
+    from openpyxl.drawing.image import Image
+    from openpyxl.styles import Alignment
     
-    # 读取JSON数据
+    # 读取数据，只处理前50本书（避免文件过大）
     print("正在读取数据文件...")
-    with open('douban_books_all.json', 'r', encoding='utf-8') as f:
-        books_data = json.load(f)
-    
-    # 只处理前50本书（避免文件过大）
-    books_data = books_data[:50]
+    books_data, _ = load_books(db_file, limit=50)
+    books_data = list(books_data)
     print(f"处理前 {len(books_data)} 本书籍")
     
     # 创建工作簿
@@ -122,9 +147,14 @@ def create_excel_with_images():
     
     print("开始处理书籍数据并插入封面...")
     
+    # 读取封面存储的 manifest，并在进程池中批量生成缩略图
+    store = CoverStore('book_covers')
+    cover_paths = [store.cover_path(book['书籍链接']) for book in books_data]
+    thumbnails, thumbnail_errors = thumbnail_covers([path for path in cover_paths if path])
+    
     # 处理每本书
     for i, book in enumerate(books_data, 2):
-        print(f"处理第 {i-1} 本书: {book['书名']}")
+        logger.debug(f"处理第 {i-1} 本书: {book['书名']}")
         
         # 填充基本信息
         ws.cell(row=i, column=1, value=i-1)  # 序号
@@ -137,22 +167,15 @@ def create_excel_with_images():
         # 处理封面
         if book['封面链接']:
             try:
-                # 查找对应的封面文件
-                cover_files = [f for f in os.listdir('book_covers') if f.startswith(f"cover_{i-1}_")]
+                # 按书籍链接查找对应的封面文件
+                cover_path = cover_paths[i-2]
                 
-                if cover_files:
-                    cover_path = f"book_covers/{cover_files[0]}"
-                    
-                    # 调整图片大小
-                    img = PILImage.open(cover_path)
-                    img.thumbnail((100, 140), PILImage.Resampling.LANCZOS)
+                if cover_path:
+                    if cover_path in thumbnail_errors:
+                        raise ValueError(thumbnail_errors[cover_path])
                     
-                    # 保存调整后的图片到临时文件
-                    temp_path = f"temp_cover_{i-1}.jpg"
-                    img.save(temp_path, 'JPEG', quality=85)
-                    
-                    # 插入到Excel
-                    excel_img = Image(temp_path)
+                    # 插入到Excel（缩略图直接在内存中，无需临时文件）
+                    excel_img = Image(io.BytesIO(thumbnails[cover_path]))
                     excel_img.width = 80
                     excel_img.height = 112
                     
@@ -163,19 +186,17 @@ def create_excel_with_images():
                     # 设置行高
                     ws.row_dimensions[i].height = 90
                     
-                    # 删除临时文件
-                    os.remove(temp_path)
-                    print(f"  ✓ 封面已添加")
+                    logger.debug(f"  ✓ 封面已添加")
                 else:
                     ws.cell(row=i, column=7, value="封面文件未找到")
-                    print(f"  ✗ 封面文件未找到")
+                    logger.debug(f"  ✗ 封面文件未找到")
                     
             except Exception as e:
                 ws.cell(row=i, column=7, value=f"封面处理失败: {str(e)}")
-                print(f"  ✗ 封面处理失败: {e}")
+                logger.warning(f"  ✗ 封面处理失败: {e}")
         else:
             ws.cell(row=i, column=7, value="无封面")
-            print(f"  - 无封面链接")
+            logger.debug(f"  - 无封面链接")
         
         # 设置文本对齐
         for col in range(1, 7):
@@ -183,27 +204,69 @@ def create_excel_with_images():
     
     # 保存Excel文件
     excel_file = 'douban_books_sample_with_covers.xlsx'
-    wb.save(excel_file)
+    with METRICS.timer('excel_write'):
+        wb.save(excel_file)
+    METRICS.count('excel_write', len(books_data))
     print(f"\nExcel文件已保存: {excel_file}")
     
     return excel_file
 
+def create_excel_with_all_covers(db_file=None, rows_per_file=DEFAULT_ROWS_PER_FILE,
+                                 max_file_bytes=DEFAULT_MAX_FILE_BYTES, image_budget=DEFAULT_IMAGE_BYTES, workers=None):
+    """为全部书籍创建带封面的Excel文件，按行数和大小拆分为多个文件，在多个进程中并行生成"""
+    
+    print("正在读取数据文件...")
+    books_data, total = load_books(db_file)
+    print(f"读取到 {total} 本书籍数据")
+    
+    excel_files = export_illustrated(books_data, 'douban_books_all_with_covers', 'book_covers',
+                                     rows_per_file, max_file_bytes, image_budget, workers)
+    print(f"\nExcel文件已保存: {', '.join(excel_files)}")
+    
+    return excel_files
+
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description='简化Excel生成器')
+    parser.add_argument('--db', help='从SQLite书籍库读取数据（默认读取 douban_books_all.ndjson，不存在时读取 douban_books_all.json）')
+    parser.add_argument('--all-covers', action='store_true',
+                        help='为全部书籍嵌入封面（代替前50本的示例文件），按需拆分为多个文件')
+    parser.add_argument('--rows-per-file', type=int, default=DEFAULT_ROWS_PER_FILE, help='每个文件的最大行数')
+    parser.add_argument('--max-file-mb', type=float, default=DEFAULT_MAX_FILE_BYTES / 1024 / 1024,
+                        help='每个文件的预估大小上限（MB）')
+    parser.add_argument('--image-kb', type=float, default=DEFAULT_IMAGE_BYTES / 1024, help='每张缩略图的大小上限（KB）')
+    parser.add_argument('--workers', type=int, help='并行生成文件的进程数，默认为CPU核数')
+    parser.add_argument('--log-level', choices=LOG_LEVELS, default='INFO', help='日志级别，DEBUG 时输出每本书')
+    parser.add_argument('--log-format', choices=LOG_FORMATS, default='text',
+                        help='日志格式：text 为带时间、级别和来源的文本，kv 为 key=value 行，json 为JSON行')
+    parser.add_argument('--metrics-file', default=DEFAULT_METRICS_FILE,
+                        help='运行指标文件（.prom 为 Prometheus 文本格式，其余为JSON）')
+    args = parser.parse_args()
+    setup_logging(args.log_level, args.log_format)
+    
     try:
         print("=== 创建完整数据Excel文件 ===")
-        excel_file1 = create_excel_from_data()
+        excel_file1 = create_excel_from_data(args.db)
         
-        print("\n=== 创建带封面示例Excel文件 ===")
-        excel_file2 = create_excel_with_images()
+        if args.all_covers:
+            print("\n=== 创建全部书籍带封面Excel文件 ===")
+            excel_files = create_excel_with_all_covers(args.db, args.rows_per_file, int(args.max_file_mb * 1024 * 1024),
+                                                       int(args.image_kb * 1024), args.workers)
+            excel_file2 = ', '.join(excel_files)
+        else:
+            print("\n=== 创建带封面示例Excel文件 ===")
+            excel_file2 = create_excel_with_images(args.db)
         
         print(f"\n=== 完成 ===")
         print(f"✓ 完整数据Excel文件: {excel_file1}")
-        print(f"✓ 带封面示例Excel文件: {excel_file2}")
+        print(f"✓ 带封面Excel文件: {excel_file2}")
         print(f"✓ 两个文件都可以用Excel打开查看")
         
     except Exception as e:
         print(f"生成Excel文件时出错: {e}")
+    
+    METRICS.print_summary()
+    print(f"运行指标已保存到 {METRICS.dump(args.metrics_file)}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+书籍统计分析 - 把书籍加载为带类型的列式表（评分为浮点数，出版社和作者为分类类型），
+评分分布、出版社汇总和作者排行全部使用向量化运算，每项结果只计算一次
+"""
+
+import json
+from functools import cached_property
+from operator import itemgetter
+
+import numpy as np
+import pandas as pd
+
+from douban_books import BookTable
+
+# 评分分布的默认分箱：0~10分，每0.5分一档
+DEFAULT_RATING_BINS = np.arange(0, 10.5, 0.5)
+
+
+# 统计用到的列
+FRAME_COLUMNS = ['书名', '作者', '出版社', '评分', '书籍链接']
+
+
+def _categorical(values):
+    # factorize 按首次出现的顺序编号，保证并列时与 Counter.most_common 的顺序一致
+    codes, categories = pd.factorize(values, sort=False)
+    return pd.Categorical.from_codes(codes, categories=categories)
+
+
+def build_frame(records):
+    """
+    把书籍记录转换为带类型的列式表
+
+    Args:
+        records: 书籍字典列表、BookTable，或已包含中文列名的 DataFrame
+    """
+    if isinstance(records, BookTable):
+        # 作者和出版社已按首次出现的顺序编码，直接使用
+        return records.to_frame()[FRAME_COLUMNS]
+    if isinstance(records, pd.DataFrame):
+        columns = {key: records[key].fillna('').to_numpy(dtype=object) for key in FRAME_COLUMNS}
+    else:
+        records = records if isinstance(records, list) else list(records)
+        columns = {key: np.array(list(map(itemgetter(key), records)), dtype=object) for key in FRAME_COLUMNS}
+    return pd.DataFrame({
+        '书名': columns['书名'],
+        '作者': _categorical(columns['作者']),
+        '出版社': _categorical(columns['出版社']),
+        '评分': pd.to_numeric(columns['评分'], errors='coerce').astype('float64'),
+        '书籍链接': columns['书籍链接'],
+    })
+
+
+def load_frame(json_files=(), db_file=None, books=None, dedupe=True):
+    """
+    从一个或多个爬取结果加载列式表
+
+    Args:
+        json_files: douban_books_*.json 文件列表（可来自多个书单）
+        db_file: SQLite书籍库
+        books: 内存中的书籍字典列表或 BookTable
+        dedupe: 是否按书籍链接去重（保留第一次出现的记录）
+    """
+    frames = []
+    for json_file in json_files:
+        with open(json_file, 'r', encoding='utf-8') as f:
+            frames.append(pd.DataFrame.from_records(json.load(f)))
+    if db_file:
+        import sqlite3
+
+        with sqlite3.connect(db_file) as conn:
+            frames.append(pd.read_sql_query(
+                "SELECT title AS 书名, author AS 作者, publisher AS 出版社, rating AS 评分, "
+                "cover_url AS 封面链接, book_url AS 书籍链接 FROM books ORDER BY rowid", conn))
+    if isinstance(books, BookTable):
+        frames.append(books.to_frame().astype({'作者': object, '出版社': object}))
+    elif books is not None:
+        frames.append(pd.DataFrame.from_records(books))
+
+    if not frames:
+        return build_frame([])
+    for frame in frames:
+        for key in FRAME_COLUMNS:
+            if key not in frame:
+                frame[key] = ''
+    raw = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    if dedupe and len(frames) > 1:
+        raw = raw.drop_duplicates('书籍链接', keep='first', ignore_index=True)
+    return build_frame(raw)
+
+
+class BookAnalytics:
+    """
+    书籍统计
+
+    Args:
+        frame: build_frame / load_frame 返回的列式表
+    """
+
+    def __init__(self, frame):
+        self.frame = frame
+
+    @classmethod
+    def from_books(cls, books):
+        return cls(build_frame(books))
+
+    @cached_property
+    def ratings(self):
+        """有评分的书籍的评分数组"""
+        values = self.frame['评分'].to_numpy()
+        return values[~np.isnan(values)]
+
+    @cached_property
+    def rating_summary(self):
+        """评分概况：总数、有评分数、平均、最高、最低"""
+        ratings = self.ratings
+        summary = {'总数': len(self.frame), '有评分': len(ratings)}
+        if len(ratings):
+            summary.update({'平均': float(ratings.mean()), '最高': float(ratings.max()), '最低': float(ratings.min())})
+        return summary
+
+    def rating_histogram(self, bins=DEFAULT_RATING_BINS):
+        """
+        评分分布：返回以区间为索引的数量 Series
+
+        区间与 np.histogram 的计数方式一致：前面的区间左闭右开，最后一个区间两端都闭合（含满分）
+        """
+        counts, edges = np.histogram(self.ratings, bins=bins)
+        last = len(counts) - 1
+        index = pd.Index([pd.Interval(edges[i], edges[i + 1], closed='both' if i == last else 'left')
+                          for i in range(len(counts))])
+        return pd.Series(counts, index=index, name='数量')
+
+    @cached_property
+    def publisher_table(self):
+        """每个出版社的书籍数、平均评分和最高评分（按书籍数降序，并列时按首次出现顺序）"""
+        return self._group_table('出版社')
+
+    @cached_property
+    def author_table(self):
+        """每个作者的书籍数、平均评分和最高评分"""
+        return self._group_table('作者')
+
+    def _group_table(self, column):
+        categorical = self.frame[column].array
+        codes = categorical.codes
+        categories = categorical.categories
+        ratings = self.frame['评分'].to_numpy()
+        rated = ~np.isnan(ratings)
+
+        size = len(categories)
+        counts = np.bincount(codes, minlength=size)
+        rated_counts = np.bincount(codes[rated], minlength=size)
+        rating_sums = np.bincount(codes[rated], weights=ratings[rated], minlength=size)
+        rating_max = np.full(size, np.nan)
+        np.fmax.at(rating_max, codes[rated], ratings[rated])
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = rating_sums / rated_counts
+        table = pd.DataFrame({'数量': counts, '有评分': rated_counts, '平均评分': means, '最高评分': rating_max},
+                             index=pd.Index(categories, name=column))
+        table = table[table.index != '']
+        return table.sort_values('数量', ascending=False, kind='stable')
+
+    def top_publishers(self, k=5):
+        """书籍最多的前k个出版社"""
+        return self.publisher_table.head(k)
+
+    def top_books_by_publisher(self, k=3, publishers=None):
+        """每个出版社评分最高的前k本书"""
+        frame = self.frame[self.frame['评分'].notna() & (self.frame['出版社'] != '')]
+        if publishers is not None:
+            frame = frame[frame['出版社'].isin(publishers)]
+        ranked = frame.sort_values(['出版社', '评分'], ascending=[True, False], kind='stable')
+        return ranked.groupby('出版社', observed=True, sort=False).head(k)
+
+    def author_leaderboard(self, k=10, min_books=2):
+        """作者排行：至少有 min_books 本有评分的书，按平均评分、书籍数降序"""
+        table = self.author_table[self.author_table['有评分'] >= min_books]
+        return table.sort_values(['平均评分', '有评分'], ascending=False, kind='stable').head(k)
+
+    def print_report(self, top_k=5):
+        """打印统计信息（格式与 print_statistics 一致）"""
+        summary = self.rating_summary
+        if not summary['总数']:
+            print("没有数据可统计")
+            return
+
+        print(f"\n=== 统计信息 ===")
+        print(f"总书籍数量: {summary['总数']}")
+        print(f"有评分的书籍: {summary['有评分']}")
+        if summary['有评分']:
+            print(f"平均评分: {summary['平均']:.2f}")
+            print(f"最高评分: {summary['最高']}")
+            print(f"最低评分: {summary['最低']}")
+
+        publishers = self.top_publishers(top_k)
+        if len(publishers):
+            print(f"\n出版社分布 (前{top_k}名):")
+            for publisher, count in publishers['数量'].items():
+                print(f"  {publisher}: {count}本")
+
+    def print_details(self, top_k=10):
+        """打印评分分布、出版社汇总和作者排行"""
+        histogram = self.rating_histogram()
+        histogram = histogram[histogram > 0]
+        if len(histogram):
+            print(f"\n评分分布:")
+            for interval, count in histogram.items():
+                print(f"  {interval.left:.1f}~{interval.right:.1f}: {count}本")
+
+        publishers = self.top_publishers(top_k)
+        if len(publishers):
+            print(f"\n出版社汇总 (前{top_k}名):")
+            for publisher, row in publishers.iterrows():
+                average = f"{row['平均评分']:.2f}" if row['有评分'] else '-'
+                print(f"  {publisher}: {int(row['数量'])}本，平均评分 {average}")
+
+        authors = self.author_leaderboard(top_k)
+        if len(authors):
+            print(f"\n作者排行 (至少2本有评分，前{top_k}名):")
+            for author, row in authors.iterrows():
+                print(f"  {author}: 平均评分 {row['平均评分']:.2f}（{int(row['有评分'])}本）")
+
+
+def main():
+    """对一个或多个爬取结果做统计"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='豆瓣书单统计分析')
+    parser.add_argument('json_files', nargs='*', help='douban_books_*.json 文件，可以是多个书单')
+    parser.add_argument('--db', help='SQLite书籍库')
+    parser.add_argument('--top', type=int, default=10, help='出版社和作者排行显示的数量')
+    args = parser.parse_args()
+
+    if not args.json_files and not args.db:
+        parser.error('请指定 JSON 文件或 --db')
+
+    analytics = BookAnalytics(load_frame(args.json_files, db_file=args.db))
+    analytics.print_report()
+    analytics.print_details(args.top)
+
+
+if __name__ == "__main__":
+    main()
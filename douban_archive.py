@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+原始页面归档 - 把抓取到的每个书单页面的原始字节压缩后追加写入分段文件，
+SQLite索引按URL和抓取时间定位；页面结构变化或 parse_single_book 增加字段后，
+可以用 reparse 在多个进程中离线重新解析全部历史页面，不再需要重新爬取
+
+目录结构:
+    page_archive/index.sqlite3
+    page_archive/segment_00001.dat     # 追加写入，超过分段大小后换新文件
+
+每条记录: 魔数 DBA1 + (URL长度, 抓取时间, 压缩后长度) + URL + zlib 压缩的正文，
+索引丢失时可以用 rebuild_index 扫描分段文件重建。同一URL内容未变化时不重复写入。
+
+用法:
+    python enhanced_douban_spider.py --workers 4 --archive page_archive
+    python douban_archive.py stats
+    python douban_archive.py reparse --workers 4
+    python douban_archive.py reparse --url "https://www.douban.com/doulist/45298673/" --parser lxml
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+DEFAULT_ARCHIVE_DIR = 'page_archive'
+DEFAULT_SEGMENT_BYTES = 256 * 1024 * 1024
+
+RECORD_MAGIC = b'DBA1'
+RECORD_HEADER = struct.Struct('<4sIdI')
+SEGMENT_PATTERN = re.compile(r'^segment_(\d{5})\.dat$')
+DOULIST_PATH_PATTERN = re.compile(r'^/doulist/\d+/?$')
+
+
+def segment_name(number):
+    return f"segment_{number:05d}.dat"
+
+
+def read_record(archive_dir, segment, offset, length):
+    """读取并解压一条记录的正文（可在任意进程中调用）"""
+    with open(os.path.join(archive_dir, segment_name(segment)), 'rb') as f:
+        f.seek(offset)
+        return zlib.decompress(f.read(length))
+
+
+class PageArchive:
+    """
+    追加写入的压缩页面归档（线程安全，同一时间只应有一个进程写入）
+
+    Args:
+        archive_dir: 归档目录
+        segment_bytes: 单个分段文件的大小上限
+        level: zlib 压缩级别
+    """
+
+    def __init__(self, archive_dir=DEFAULT_ARCHIVE_DIR, segment_bytes=DEFAULT_SEGMENT_BYTES, level=6):
+        self.archive_dir = archive_dir
+        self.segment_bytes = segment_bytes
+        self.level = level
+        os.makedirs(archive_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(archive_dir, 'index.sqlite3'), check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                segment INTEGER NOT NULL,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                raw_size INTEGER NOT NULL,
+                sha1 TEXT NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_pages_url ON pages (url, fetched_at)")
+        self._db.commit()
+
+        numbers = [int(match.group(1)) for match in map(SEGMENT_PATTERN.match, os.listdir(archive_dir)) if match]
+        self._segment = max(numbers, default=1)
+        self._file = open(os.path.join(archive_dir, segment_name(self._segment)), 'ab')
+
+    def add(self, url, content, fetched_at=None):
+        """
+        归档一个页面；与该URL最近一次归档的内容相同时不再写入
+
+        Returns:
+            bool: 是否写入了新记录
+        """
+        digest = hashlib.sha1(content).hexdigest()
+        fetched_at = fetched_at or time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT sha1 FROM pages WHERE url = ? ORDER BY fetched_at DESC LIMIT 1", (url,)).fetchone()
+            if row is not None and row[0] == digest:
+                return False
+
+            payload = zlib.compress(content, self.level)
+            url_bytes = url.encode('utf-8')
+            if self._file.tell() and self._file.tell() + len(payload) > self.segment_bytes:
+                self._file.close()
+                self._segment += 1
+                self._file = open(os.path.join(self.archive_dir, segment_name(self._segment)), 'ab')
+            offset = self._file.tell() + RECORD_HEADER.size + len(url_bytes)
+            self._file.write(RECORD_HEADER.pack(RECORD_MAGIC, len(url_bytes), fetched_at, len(payload)))
+            self._file.write(url_bytes)
+            self._file.write(payload)
+            self._file.flush()
+            self._db.execute("INSERT INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             (url, fetched_at, self._segment, offset, len(payload), len(content), digest))
+            self._db.commit()
+        return True
+
+    def get(self, url, at=None):
+        """读取URL在 at 时刻（默认为最新）之前最近一次归档的正文，不存在时返回None"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT segment, offset, length FROM pages WHERE url = ? AND fetched_at <= ?"
+                " ORDER BY fetched_at DESC LIMIT 1", (url, at if at is not None else float('inf'))).fetchone()
+        if row is None:
+            return None
+        self._file.flush()
+        return read_record(self.archive_dir, *row)
+
+    def latest(self, at=None):
+        """
+        每个URL在 at 时刻之前最近一次归档的位置
+
+        Returns:
+            list: [(url, fetched_at, segment, offset, length)]
+        """
+        with self._lock:
+            return self._db.execute(
+                "SELECT url, MAX(fetched_at), segment, offset, length FROM pages WHERE fetched_at <= ?"
+                " GROUP BY url ORDER BY url", (at if at is not None else float('inf'),)).fetchall()
+
+    def stats(self):
+        """(记录数, 不同URL数, 原始字节数, 压缩后字节数)"""
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT url), COALESCE(SUM(raw_size), 0), COALESCE(SUM(length), 0)"
+                " FROM pages").fetchone()
+
+    def rebuild_index(self):
+        """扫描全部分段文件重建索引，返回记录数"""
+        records = []
+        for name in sorted(os.listdir(self.archive_dir)):
+            match = SEGMENT_PATTERN.match(name)
+            if not match:
+                continue
+            with open(os.path.join(self.archive_dir, name), 'rb') as f:
+                data = f.read()
+            position = 0
+            while position + RECORD_HEADER.size <= len(data):
+                magic, url_size, fetched_at, length = RECORD_HEADER.unpack_from(data, position)
+                if magic != RECORD_MAGIC:
+                    break
+                url_start = position + RECORD_HEADER.size
+                offset = url_start + url_size
+                if offset + length > len(data):
+                    break  # 写入中断的残缺记录
+                content = zlib.decompress(data[offset:offset + length])
+                records.append((data[url_start:offset].decode('utf-8'), fetched_at, int(match.group(1)), offset,
+                                length, len(content), hashlib.sha1(content).hexdigest()))
+                position = offset + length
+        with self._lock:
+            self._db.execute("DELETE FROM pages")
+            self._db.executemany("INSERT INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)", records)
+            self._db.commit()
+        return len(records)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+def doulist_page_key(url):
+    """
+    书单页面URL → (书单URL, start)，不是书单页面时返回None
+
+    书单URL去掉查询参数，同一书单不同写法的URL归为一组
+    """
+    parts = urlsplit(url)
+    if not DOULIST_PATH_PATTERN.match(parts.path):
+        return None
+    start = int(parse_qs(parts.query).get('start', ['0'])[0])
+    return f"{parts.scheme}://{parts.netloc}{parts.path}", start
+
+
+def _reparse_record(archive_dir, segment, offset, length, backend):
+    """在解析进程中读取并解析一个归档页面，返回 (有书名的书籍列表, 页面上的总页数)"""
+    from douban_pipeline import parse_page_content
+
+    page, _ = parse_page_content(read_record(archive_dir, segment, offset, length), backend)
+    return page.books, page.total_pages
+
+
+def reparse_archive(archive_dir=DEFAULT_ARCHIVE_DIR, doulist_urls=None, backend='html.parser', workers=None, at=None):
+    """
+    不访问网络，用归档的页面在多个进程中重新解析书单
+
+    Args:
+        archive_dir: 归档目录
+        doulist_urls: 只解析这些书单，默认为归档中的全部书单
+        backend: 页面解析后端
+        workers: 解析进程数，默认为CPU核数
+        at: 只使用该时刻之前抓取的页面（默认为每个页面的最新版本）
+
+    Returns:
+        dict: 书单URL → 书籍列表（按页序）
+
+    各页面取的是各自最新的版本，可能来自不同的抓取时刻：书单缩短后，超出第一页所示总页数的旧页面会被丢弃；
+    书籍在页面间移动时，同一本书（按书籍链接）只保留页序靠前的一条
+    """
+    from douban_parser import PAGE_SIZE
+
+    wanted = None
+    if doulist_urls:
+        wanted = {}
+        for url in doulist_urls:
+            key = doulist_page_key(url)
+            wanted[key[0] if key else url] = url
+
+    with PageArchive(archive_dir) as archive:
+        rows = archive.latest(at)
+
+    pages = {}
+    for url, fetched_at, segment, offset, length in rows:
+        key = doulist_page_key(url)
+        if key is None or (wanted is not None and key[0] not in wanted):
+            continue
+        # 同一页面有多种URL写法时保留最近抓取的一个
+        if key not in pages or fetched_at > pages[key][0]:
+            pages[key] = (fetched_at, segment, offset, length)
+    keys = sorted(pages)
+    print(f"从归档中重新解析 {len(keys)} 个页面（{len({key[0] for key in keys})} 个书单）")
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        chunksize = max(1, len(keys) // ((workers or os.cpu_count() or 1) * 4))
+        parsed = executor.map(_reparse_record, *zip(*[(archive_dir, *pages[key][1:], backend) for key in keys]),
+                              chunksize=chunksize) if keys else []
+        parsed_pages = {}
+        for (list_url, start), result in zip(keys, parsed):
+            parsed_pages.setdefault(list_url, []).append((start, result))
+
+    books_by_list = {}
+    for list_url, list_pages in parsed_pages.items():
+        first_start, (_, total_pages) = list_pages[0]
+        limit = total_pages * PAGE_SIZE if first_start == 0 and total_pages else None
+        books, seen = [], set()
+        for start, (page_books, _) in list_pages:
+            if limit is not None and start >= limit:
+                continue
+            for book in page_books:
+                link = book.get('书籍链接')
+                if link:
+                    if link in seen:
+                        continue
+                    seen.add(link)
+                books.append(book)
+        books_by_list[list_url] = books
+
+    if wanted is not None:
+        books_by_list = {wanted[list_url]: books for list_url, books in books_by_list.items()}
+    return books_by_list
+
+
+def save_reparsed(books_by_list, output_dir='reparse_output'):
+    """保存重新解析的结果到 output_dir：单个书单与爬虫的输出格式相同，多个书单与批量爬虫的输出相同"""
+    from douban_batch import doulist_name, merge_catalog, save_batch
+    from enhanced_douban_spider import save_data
+
+    if len(books_by_list) == 1:
+        ((doulist_url, books),) = books_by_list.items()
+        os.makedirs(output_dir, exist_ok=True)
+        base = os.path.join(output_dir, doulist_name(doulist_url))
+        save_data(books, csv_file=f"{base}.csv", json_file=f"{base}.json")
+    elif books_by_list:
+        save_batch(books_by_list, *merge_catalog(books_by_list), output_dir)
+    else:
+        print("归档中没有匹配的书单页面")
+
+
+def main():
+    """主函数"""
+    from douban_parser import PARSER_BACKENDS
+
+    parser = argparse.ArgumentParser(description='原始页面归档与离线重新解析')
+    parser.add_argument('--archive', default=DEFAULT_ARCHIVE_DIR, help='归档目录')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('stats', help='查看归档大小')
+    subparsers.add_parser('rebuild-index', help='扫描分段文件重建索引')
+
+    reparse_parser = subparsers.add_parser('reparse', help='从归档重新解析书单并保存')
+    reparse_parser.add_argument('--url', action='append', help='只解析指定书单，可重复指定（默认为全部）')
+    reparse_parser.add_argument('--parser', choices=PARSER_BACKENDS, default='html.parser', help='页面解析后端')
+    reparse_parser.add_argument('--workers', type=int, help='解析进程数，默认为CPU核数')
+    reparse_parser.add_argument('--output-dir', default='reparse_output', help='输出目录')
+    args = parser.parse_args()
+
+    if args.command == 'stats':
+        with PageArchive(args.archive) as archive:
+            records, urls, raw_size, stored_size = archive.stats()
+        ratio = raw_size / stored_size if stored_size else 0
+        print(f"{records} 条记录，{urls} 个URL，原始 {raw_size / 1024 / 1024:.1f} MB，"
+              f"压缩后 {stored_size / 1024 / 1024:.1f} MB（{ratio:.1f} 倍）")
+    elif args.command == 'rebuild-index':
+        with PageArchive(args.archive) as archive:
+            print(f"已重建索引: {archive.rebuild_index()} 条记录")
+    elif args.command == 'reparse':
+        start_time = time.perf_counter()
+        books_by_list = reparse_archive(args.archive, args.url, args.parser, args.workers)
+        print(f"解析完成，用时 {time.perf_counter() - start_time:.1f} 秒")
+        save_reparsed(books_by_list, args.output_dir)
+
+
+if __name__ == "__main__":
+    main()
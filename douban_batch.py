@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+豆瓣书单批量爬虫 - 从文件读取多个书单URL，所有书单的页面共用一个连接池，
+经同一个按主机限速的调度器并发抓取；书籍按书籍链接跨书单去重，
+共享的书籍合并为同一条记录，封面和详情页只下载一次。
+输出每个书单各自的CSV/JSON，以及合并后的总目录
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from douban_archive import PageArchive
+from douban_cache import HttpCache
+from douban_details import DetailCache, enrich_books
+from douban_http import create_session
+from douban_metrics import DEFAULT_METRICS_FILE, LOG_FORMATS, LOG_LEVELS, METRICS, setup_logging
+from douban_parser import PAGE_SIZE, PARSER_BACKENDS
+from douban_rate_limit import HostScheduler
+from douban_search import update_index
+from enhanced_douban_spider import (build_page_url, download_covers, fetch_page, parse_page, plan_page_offsets,
+                                    print_statistics, save_data)
+
+DEFAULT_OUTPUT_DIR = 'batch_output'
+CATALOG_NAME = 'douban_catalog'
+
+DOULIST_ID_PATTERN = re.compile(r'/doulist/(\d+)')
+
+
+def read_doulist_urls(path):
+    """读取书单URL文件：每行一个URL，忽略空行和 # 开头的注释，重复的URL只保留一个"""
+    with open(path, 'r', encoding='utf-8') as f:
+        urls = [line.strip() for line in f]
+    return list(dict.fromkeys(url for url in urls if url and not url.startswith('#')))
+
+
+def doulist_name(doulist_url):
+    """书单的输出文件名（不含扩展名），优先使用书单ID"""
+    match = DOULIST_ID_PATTERN.search(doulist_url)
+    if match:
+        return f"doulist_{match.group(1)}"
+    return f"doulist_{hashlib.sha1(doulist_url.encode('utf-8')).hexdigest()[:10]}"
+
+
+def crawl_doulists(doulist_urls, max_pages=20, workers=8, rate=2.0, backend='html.parser', cache=None,
+                   parse_workers=0, archive=None):
+    """
+    并发爬取多个书单：先抓取各书单第一页读取分页信息，再把全部书单的剩余页面交给同一个线程池，
+    请求经按主机限速的调度器发出
+
+    Args:
+        doulist_urls: 书单URL列表
+        max_pages: 每个书单最多爬取的页数
+        workers: 并发抓取数（也是连接池大小）
+        rate: 每个主机每秒允许的请求数
+        backend: 页面解析后端
+        cache: HttpCache，为None时每次都重新下载
+        parse_workers: 解析进程数；大于0时抓取线程只做I/O，页面经有界队列交给解析进程池（见 douban_pipeline）
+        archive: PageArchive，传入时归档每个抓取到的页面（见 douban_archive）
+
+    Returns:
+        tuple: (各书单的书籍列表 {书单URL: [书籍]}, 各书单失败的页面 {书单URL: [start]})
+    """
+    session = create_session(pool_size=workers)
+    scheduler = HostScheduler(rate, capacity=workers)
+    shared = {}
+
+    page_results = {url: {} for url in doulist_urls}
+    failed = {url: [] for url in doulist_urls}
+    sequential = set()
+
+    print(f"开始批量爬取 {len(doulist_urls)} 个书单，并发数 {workers}，每个主机限速 {rate} 次请求/秒")
+
+    def fetch_and_parse(doulist_url, start):
+        url = build_page_url(doulist_url, start)
+        return parse_page(fetch_page(session, url, scheduler.bucket_for(url), cache, archive), backend)
+
+    def next_starts_for(doulist_url, start, doulist_page, error):
+        """记录一页结果，返回该书单接下来要抓取的页面"""
+        page_number = start // PAGE_SIZE + 1
+        if error is not None:
+            print(f"{doulist_name(doulist_url)} 第 {page_number} 页出错: {error}")
+            failed[doulist_url].append(start)
+            return []
+
+        # 共享书籍按书籍链接合并为同一个对象，后续的去重和封面下载都基于这一份
+        page_results[doulist_url][start] = [
+            shared.setdefault(book['书籍链接'], book) if book['书籍链接'] else book
+            for book in doulist_page.books
+        ]
+        print(f"{doulist_name(doulist_url)} 第 {page_number} 页成功解析 {len(doulist_page.books)} 本书籍")
+
+        # 第一页返回后一次性规划该书单的其余页面；读不到总页数时逐页往后抓
+        next_starts = []
+        if start == 0:
+            offsets = plan_page_offsets(doulist_page.total_pages, max_pages)
+            if offsets is not None:
+                next_starts = offsets[1:]
+                print(f"{doulist_name(doulist_url)} 共规划 {len(offsets)} 页")
+            else:
+                sequential.add(doulist_url)
+        if doulist_url in sequential and doulist_page.has_next and page_number < max_pages:
+            next_starts = [start + PAGE_SIZE]
+        return next_starts
+
+    if parse_workers:
+        from douban_pipeline import CrawlPipeline
+
+        def fetch(url):
+            return fetch_page(session, url, scheduler.bucket_for(url), cache, archive)
+
+        with CrawlPipeline(fetch, backend, workers, parse_workers) as pipeline:
+            for url in doulist_urls:
+                pipeline.submit((url, 0), url)
+            for (doulist_url, start), doulist_page, error in pipeline.results():
+                for next_start in next_starts_for(doulist_url, start, doulist_page, error):
+                    pipeline.submit((doulist_url, next_start), build_page_url(doulist_url, next_start))
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(fetch_and_parse, url, 0): (url, 0) for url in doulist_urls}
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    doulist_url, start = futures.pop(future)
+                    try:
+                        doulist_page, error = future.result(), None
+                    except Exception as e:
+                        doulist_page, error = None, e
+                    for next_start in next_starts_for(doulist_url, start, doulist_page, error):
+                        futures[executor.submit(fetch_and_parse, doulist_url, next_start)] = (doulist_url, next_start)
+
+    session.close()
+    books_by_list = {
+        url: [book for start in sorted(pages) for book in pages[start]]
+        for url, pages in page_results.items()
+    }
+    return books_by_list, failed
+
+
+def merge_catalog(books_by_list):
+    """
+    按书籍链接跨书单去重，合并为总目录
+
+    Returns:
+        tuple: (总目录书籍列表，按首次出现的顺序, 书籍链接 → 所在书单名列表)
+    """
+    catalog = {}
+    memberships = {}
+    unlinked = []
+    for doulist_url, books in books_by_list.items():
+        name = doulist_name(doulist_url)
+        for book in books:
+            book_url = book['书籍链接']
+            if not book_url:
+                unlinked.append(book)
+                continue
+            catalog.setdefault(book_url, book)
+            lists = memberships.setdefault(book_url, [])
+            if name not in lists:
+                lists.append(name)
+    return list(catalog.values()) + unlinked, memberships
+
+
+def save_batch(books_by_list, catalog, memberships, output_dir=DEFAULT_OUTPUT_DIR):
+    """保存每个书单的CSV/JSON、合并后的总目录，以及每本书所属书单的索引"""
+    os.makedirs(output_dir, exist_ok=True)
+    for doulist_url, books in books_by_list.items():
+        name = doulist_name(doulist_url)
+        save_data(books, os.path.join(output_dir, f"{name}.csv"), os.path.join(output_dir, f"{name}.json"))
+
+    save_data(catalog, os.path.join(output_dir, f"{CATALOG_NAME}.csv"),
+              os.path.join(output_dir, f"{CATALOG_NAME}.json"))
+    memberships_file = os.path.join(output_dir, f"{CATALOG_NAME}_lists.json")
+    with open(memberships_file, 'w', encoding='utf-8') as f:
+        json.dump(memberships, f, ensure_ascii=False, indent=2)
+    print(f"书籍所属书单已保存到 {memberships_file}")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='豆瓣书单批量爬虫')
+    parser.add_argument('url_file', help='书单URL文件，每行一个')
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR, help='输出目录')
+    parser.add_argument('--max-pages', type=int, default=20, help='每个书单最多爬取的页数')
+    parser.add_argument('--workers', type=int, default=8, help='并发抓取数')
+    parser.add_argument('--rate', type=float, default=2.0, help='每个主机每秒允许的请求数')
+    parser.add_argument('--parser', choices=PARSER_BACKENDS, default='html.parser', help='页面解析后端')
+    parser.add_argument('--parse-workers', type=int, default=0,
+                        help='解析进程数，大于0时抓取线程只做I/O，解析在进程池中进行（适合大批量爬取）')
+    parser.add_argument('--covers', action='store_true', help='为总目录下载封面（共享的书籍只下载一次）')
+    parser.add_argument('--cover-workers', type=int, default=8, help='封面并发下载数')
+    parser.add_argument('--details', action='store_true', help='为总目录抓取详情页（共享的书籍只抓取一次）')
+    parser.add_argument('--detail-workers', type=int, default=4, help='详情页并发抓取数')
+    parser.add_argument('--detail-rate', type=float, default=1.0, help='详情页每秒允许的请求数')
+    parser.add_argument('--no-cache', action='store_true', help='不使用HTTP缓存')
+    parser.add_argument('--search-index', help='把总目录增量加入该搜索索引文件（见 douban_search.py）')
+    parser.add_argument('--archive', help='把抓取到的书单页面压缩归档到该目录（见 douban_archive.py）')
+    parser.add_argument('--log-level', choices=LOG_LEVELS, default='INFO', help='日志级别，DEBUG 时输出每本书')
+    parser.add_argument('--log-format', choices=LOG_FORMATS, default='text',
+                        help='日志格式：text 为带时间、级别和来源的文本，kv 为 key=value 行，json 为JSON行')
+    parser.add_argument('--metrics-file', default=DEFAULT_METRICS_FILE,
+                        help='运行指标文件（.prom 为 Prometheus 文本格式，其余为JSON）')
+    args = parser.parse_args()
+    setup_logging(args.log_level, args.log_format)
+
+    doulist_urls = read_doulist_urls(args.url_file)
+    if not doulist_urls:
+        print(f"{args.url_file} 中没有书单URL")
+        return
+
+    cache = None if args.no_cache else HttpCache()
+    archive = PageArchive(args.archive) if args.archive else None
+    try:
+        try:
+            books_by_list, failed = crawl_doulists(doulist_urls, args.max_pages, args.workers, args.rate, args.parser,
+                                                   cache, args.parse_workers, archive)
+        finally:
+            if archive is not None:
+                archive.close()
+        catalog, memberships = merge_catalog(books_by_list)
+        total = sum(len(books) for books in books_by_list.values())
+        print(f"\n批量爬取完成！{len(doulist_urls)} 个书单共 {total} 条，去重后 {len(catalog)} 本书籍")
+
+        for doulist_url, starts in failed.items():
+            if starts:
+                pages = sorted(start // PAGE_SIZE + 1 for start in starts)
+                print(f"  {doulist_name(doulist_url)} 失败的页面: {pages}")
+
+        if args.details and catalog:
+            # 各书单与总目录共用同一批书籍字典，补充一次即全部生效
+            detail_cache = DetailCache()
+            try:
+                enrich_books(catalog, args.detail_workers, args.detail_rate, detail_cache)
+            finally:
+                detail_cache.close()
+
+        save_batch(books_by_list, catalog, memberships, args.output_dir)
+        if args.search_index and catalog:
+            update_index(catalog, args.search_index)
+        if args.covers and catalog:
+            download_covers(catalog, workers=args.cover_workers, cache=cache)
+        print_statistics(catalog)
+    finally:
+        if cache is not None:
+            cache.close()
+    METRICS.print_summary()
+    print(f"运行指标已保存到 {METRICS.dump(args.metrics_file)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+紧凑的书籍表示 - 面向上百万条记录的大规模爬取：
+- Book: 带 __slots__ 的单条记录，评分为浮点数，作者和出版社字符串驻留共享
+- BookTable: 按列存储的书籍表，书名和链接以UTF-8字节连续存放在一个缓冲区中（配偏移数组），
+  作者和出版社按首次出现的顺序编号，只存一份字符串和一个整数编码数组，评分存为 float32 数组
+  （读取时还原为一位小数）
+
+两者都支持 book['书名'] 形式的读取，可以直接交给只读取字段的函数（下载封面、写Excel）；
+需要原有字典或 DataFrame 时用 to_dicts() / iter_dicts() / to_frame() 转换。
+BookTable 可以用 write() / read() 整列写入和读回二进制文件（本机字节序，用作本地索引文件）。
+"""
+
+import json
+import math
+import struct
+import sys
+from array import array
+
+from douban_sinks import BOOK_COLUMNS
+
+# 与 BOOK_COLUMNS 一一对应的属性名
+BOOK_ATTRIBUTES = ('title', 'author', 'publisher', 'rating', 'cover_url', 'book_url')
+ATTRIBUTE_BY_FIELD = dict(zip(BOOK_COLUMNS, BOOK_ATTRIBUTES))
+
+NAN = float('nan')
+
+BLOB_HEADER = struct.Struct('<Q')
+
+
+def write_blob(f, data):
+    """写入一段带长度前缀的字节"""
+    f.write(BLOB_HEADER.pack(len(data)))
+    f.write(data)
+
+
+def read_blob(f):
+    """读取 write_blob 写入的一段字节"""
+    header = f.read(BLOB_HEADER.size)
+    if len(header) != BLOB_HEADER.size:
+        raise ValueError('文件不完整')
+    (size,) = BLOB_HEADER.unpack(header)
+    data = f.read(size)
+    if len(data) != size:
+        raise ValueError('文件不完整')
+    return data
+
+
+def read_array(f, typecode):
+    """读取 write_blob 写入的数组"""
+    values = array(typecode)
+    values.frombytes(read_blob(f))
+    return values
+
+
+def parse_rating(text):
+    """把评分文本转换为浮点数，无评分或无法解析时为 NaN"""
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return NAN
+
+
+def format_rating(value):
+    """把评分转换回原有的文本格式（豆瓣评分保留一位小数），NaN 为空字符串"""
+    return '' if math.isnan(value) else f'{value:.1f}'
+
+
+class Book:
+    """
+    单本书籍（带 __slots__，不为每个对象建 __dict__）
+
+    六个基本字段之外的字段（如详情页补充的 ISBN）保存在 extra 字典中。
+    """
+
+    __slots__ = BOOK_ATTRIBUTES + ('extra',)
+
+    def __init__(self, title='', author='', publisher='', rating=NAN, cover_url='', book_url='', extra=None):
+        self.title = title
+        self.author = author
+        self.publisher = publisher
+        self.rating = rating
+        self.cover_url = cover_url
+        self.book_url = book_url
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, book):
+        """从原有的书籍字典创建，作者和出版社字符串驻留共享"""
+        extra = {field: value for field, value in book.items() if field not in ATTRIBUTE_BY_FIELD}
+        return cls(book['书名'], sys.intern(book['作者']), sys.intern(book['出版社']), parse_rating(book['评分']),
+                   book['封面链接'], book['书籍链接'], extra or None)
+
+    def to_dict(self):
+        """转换为原有的书籍字典"""
+        book = {
+            '书名': self.title,
+            '作者': self.author,
+            '出版社': self.publisher,
+            '评分': format_rating(self.rating),
+            '封面链接': self.cover_url,
+            '书籍链接': self.book_url,
+        }
+        if self.extra:
+            book.update(self.extra)
+        return book
+
+    def __getitem__(self, field):
+        attribute = ATTRIBUTE_BY_FIELD.get(field)
+        if attribute is None:
+            if self.extra and field in self.extra:
+                return self.extra[field]
+            raise KeyError(field)
+        if attribute == 'rating':
+            return format_rating(self.rating)
+        return getattr(self, attribute)
+
+    def get(self, field, default=None):
+        try:
+            return self[field]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return list(BOOK_COLUMNS) + list(self.extra or ())
+
+    def __eq__(self, other):
+        if not isinstance(other, Book):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return f"Book({self.title!r}, {self.author!r}, {self.publisher!r}, {format_rating(self.rating)!r})"
+
+
+class _TextColumn:
+    """字符串列：UTF-8 字节连续存放，offsets[i]:offsets[i+1] 为第 i 个值"""
+
+    __slots__ = ('data', 'offsets')
+
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = array('Q', [0])
+
+    def append(self, text):
+        self.data += text.encode('utf-8')
+        self.offsets.append(len(self.data))
+
+    def __getitem__(self, index):
+        return self.data[self.offsets[index]:self.offsets[index + 1]].decode('utf-8')
+
+    def nbytes(self):
+        return len(self.data) + self.offsets.itemsize * len(self.offsets)
+
+    def write(self, f):
+        write_blob(f, self.data)
+        write_blob(f, self.offsets.tobytes())
+
+    @classmethod
+    def read(cls, f):
+        column = cls()
+        column.data = bytearray(read_blob(f))
+        column.offsets = read_array(f, 'Q')
+        return column
+
+
+class _InternedColumn:
+    """重复度高的字符串列：每个不同的值只存一份，按首次出现的顺序编号"""
+
+    __slots__ = ('values', 'codes', '_code_by_value')
+
+    def __init__(self):
+        self.values = []
+        self.codes = array('I')
+        self._code_by_value = {}
+
+    def append(self, text):
+        code = self._code_by_value.get(text)
+        if code is None:
+            code = self._code_by_value[text] = len(self.values)
+            self.values.append(text)
+        self.codes.append(code)
+
+    def __getitem__(self, index):
+        return self.values[self.codes[index]]
+
+    def nbytes(self):
+        return self.codes.itemsize * len(self.codes) + sum(sys.getsizeof(value) for value in self.values)
+
+    def write(self, f):
+        write_blob(f, json.dumps(self.values, ensure_ascii=False).encode('utf-8'))
+        write_blob(f, self.codes.tobytes())
+
+    @classmethod
+    def read(cls, f):
+        column = cls()
+        column.values = json.loads(read_blob(f))
+        column.codes = read_array(f, 'I')
+        column._code_by_value = {value: code for code, value in enumerate(column.values)}
+        return column
+
+
+class BookTable:
+    """
+    按列存储的书籍表
+
+    支持 append/extend（书籍字典或 Book）、len、下标访问和迭代（得到 Book），
+    可以直接作为爬取结果的容器（emit_page 只调用 extend）。
+
+    Args:
+        books: 初始的书籍字典或 Book
+    """
+
+    def __init__(self, books=()):
+        self._titles = _TextColumn()
+        self._authors = _InternedColumn()
+        self._publishers = _InternedColumn()
+        self._ratings = array('f')
+        self._cover_urls = _TextColumn()
+        self._book_urls = _TextColumn()
+        # 基本字段之外的字段按行存为JSON，没有时为空字符串
+        self._extras = _TextColumn()
+        self._extra_fields = {}
+        self.extend(books)
+
+    @classmethod
+    def from_dicts(cls, books):
+        return cls(books)
+
+    def append(self, book):
+        """追加一本书（书籍字典或 Book）"""
+        if isinstance(book, dict):
+            book = Book.from_dict(book)
+        self._titles.append(book.title)
+        self._authors.append(book.author)
+        self._publishers.append(book.publisher)
+        self._ratings.append(book.rating)
+        self._cover_urls.append(book.cover_url)
+        self._book_urls.append(book.book_url)
+        if book.extra:
+            self._extra_fields.update(dict.fromkeys(book.extra))
+            self._extras.append(json.dumps(book.extra, ensure_ascii=False))
+        else:
+            self._extras.append('')
+
+    def extend(self, books):
+        for book in books:
+            self.append(book)
+
+    def __len__(self):
+        return len(self._ratings)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('BookTable index out of range')
+        extra = self._extras[index]
+        # float32 存储的评分还原为一位小数
+        rating = round(self._ratings[index], 1)
+        return Book(self._titles[index], self._authors[index], self._publishers[index], rating,
+                    self._cover_urls[index], self._book_urls[index], json.loads(extra) if extra else None)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    @property
+    def columns(self):
+        """全部字段名（CSV表头），基本字段在前"""
+        return list(BOOK_COLUMNS) + list(self._extra_fields)
+
+    def iter_dicts(self):
+        """逐条生成原有格式的书籍字典"""
+        for book in self:
+            yield book.to_dict()
+
+    def to_dicts(self):
+        return list(self.iter_dicts())
+
+    def to_frame(self):
+        """
+        转换为 DataFrame：作者和出版社直接由编码数组构成分类类型，评分为 float64
+
+        Returns:
+            pandas.DataFrame: 列为 BOOK_COLUMNS
+        """
+        import numpy as np
+        import pandas as pd
+
+        count = len(self)
+        ratings = np.frombuffer(self._ratings, dtype=np.float32) if count else np.empty(0, np.float32)
+
+        def text_column(column):
+            return np.array([column[index] for index in range(count)], dtype=object)
+
+        def categorical(column):
+            codes = np.frombuffer(column.codes, dtype=np.uint32).astype(np.int64) if count else np.empty(0, np.int64)
+            return pd.Categorical.from_codes(codes, categories=pd.Index(column.values, dtype=object))
+
+        return pd.DataFrame({
+            '书名': text_column(self._titles),
+            '作者': categorical(self._authors),
+            '出版社': categorical(self._publishers),
+            '评分': np.round(ratings.astype(np.float64), 1),
+            '封面链接': text_column(self._cover_urls),
+            '书籍链接': text_column(self._book_urls),
+        })
+
+    def write(self, f):
+        """把全部列写入已打开的二进制文件（可以接着写入其他内容）"""
+        write_blob(f, json.dumps(list(self._extra_fields), ensure_ascii=False).encode('utf-8'))
+        self._titles.write(f)
+        self._authors.write(f)
+        self._publishers.write(f)
+        write_blob(f, self._ratings.tobytes())
+        self._cover_urls.write(f)
+        self._book_urls.write(f)
+        self._extras.write(f)
+
+    @classmethod
+    def read(cls, f):
+        """从已打开的二进制文件读回 write() 写入的表"""
+        table = cls()
+        table._extra_fields = dict.fromkeys(json.loads(read_blob(f)))
+        table._titles = _TextColumn.read(f)
+        table._authors = _InternedColumn.read(f)
+        table._publishers = _InternedColumn.read(f)
+        table._ratings = read_array(f, 'f')
+        table._cover_urls = _TextColumn.read(f)
+        table._book_urls = _TextColumn.read(f)
+        table._extras = _TextColumn.read(f)
+        return table
+
+    def nbytes(self):
+        """列存储占用的字节数（估算）"""
+        return (self._titles.nbytes() + self._authors.nbytes() + self._publishers.nbytes()
+                + self._ratings.itemsize * len(self._ratings) + self._cover_urls.nbytes()
+                + self._book_urls.nbytes() + self._extras.nbytes())
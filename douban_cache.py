@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+磁盘HTTP缓存 - 保存响应正文及其 ETag / Last-Modified，
+过期后发送条件请求（If-None-Match / If-Modified-Since）重新验证，
+按总大小以LRU策略淘汰
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+# 书单页面变化较快，封面图片几乎不变
+PAGE_TTL = 10 * 60
+COVER_TTL = 30 * 24 * 3600
+
+DEFAULT_CACHE_DIR = 'http_cache'
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+CacheEntry = namedtuple('CacheEntry', ['url', 'key', 'etag', 'last_modified', 'expires_at', 'size'])
+
+
+class HttpCache:
+    """
+    持久化的HTTP响应缓存（线程安全）
+
+    Args:
+        cache_dir: 缓存目录，正文按URL哈希存放，索引保存在 index.sqlite3
+        max_bytes: 缓存正文总大小上限，超出时淘汰最久未访问的条目
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(cache_dir, 'index.sqlite3'), check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                url TEXT PRIMARY KEY,
+                key TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                expires_at REAL NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries (last_access)")
+        self._db.commit()
+
+    def _body_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + '.bin')
+
+    def lookup(self, url):
+        """查找缓存条目，不存在或正文丢失时返回None"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT url, key, etag, last_modified, expires_at, size FROM entries WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        entry = CacheEntry(*row)
+        if not os.path.exists(self._body_path(entry.key)):
+            self.delete(url)
+            return None
+        return entry
+
+    def read(self, entry):
+        """读取条目正文并更新访问时间，正文已被淘汰时返回None"""
+        try:
+            with open(self._body_path(entry.key), 'rb') as f:
+                content = f.read()
+        except OSError:
+            return None
+        with self._lock:
+            self._db.execute("UPDATE entries SET last_access = ? WHERE url = ?", (time.time(), entry.url))
+            self._db.commit()
+        return content
+
+    def store(self, url, content, etag=None, last_modified=None, ttl=PAGE_TTL):
+        """保存响应正文及其验证器"""
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        path = self._body_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 多个爬虫进程可能共用同一个缓存目录，临时文件按进程和线程区分
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(content)
+        os.replace(temp_path, path)
+
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (url, key, etag, last_modified, expires_at, size, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, key, etag, last_modified, now + ttl, len(content), now)
+            )
+            self._db.commit()
+        self.evict()
+
+    def revalidated(self, entry, ttl=PAGE_TTL):
+        """服务器返回304后延长条目的有效期"""
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "UPDATE entries SET expires_at = ?, last_access = ? WHERE url = ?", (now + ttl, now, entry.url)
+            )
+            self._db.commit()
+
+    def delete(self, url):
+        with self._lock:
+            row = self._db.execute("SELECT key FROM entries WHERE url = ?", (url,)).fetchone()
+            self._db.execute("DELETE FROM entries WHERE url = ?", (url,))
+            self._db.commit()
+        if row and os.path.exists(self._body_path(row[0])):
+            os.remove(self._body_path(row[0]))
+
+    def total_size(self):
+        with self._lock:
+            return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def evict(self):
+        """总大小超过上限时，按最久未访问的顺序淘汰条目"""
+        with self._lock:
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            victims = []
+            for url, key, size in self._db.execute("SELECT url, key, size FROM entries ORDER BY last_access"):
+                if total <= self.max_bytes:
+                    break
+                victims.append((url, key))
+                total -= size
+            self._db.executemany("DELETE FROM entries WHERE url = ?", [(url,) for url, _ in victims])
+            self._db.commit()
+        for _, key in victims:
+            path = self._body_path(key)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def fetch_bytes(session, url, cache=None, ttl=PAGE_TTL, timeout=10, headers=None):
+    """
+    请求URL并返回正文字节，所有页面和封面请求都经过这里
+
+    Args:
+        session: requests.Session（或 requests 模块本身）
+        url: 请求地址
+        cache: HttpCache，为None时不使用缓存
+        ttl: 缓存有效期（秒），过期后发送条件请求重新验证
+        timeout: 请求超时（秒）
+        headers: 额外的请求头
+
+    Returns:
+        bytes: 响应正文；请求失败时抛出 requests.RequestException
+    """
+    if cache is None:
+        response = session.get(url, headers=headers, timeout=timeout)
+        response.raise_for_status()
+        return response.content
+
+    entry = cache.lookup(url)
+    if entry is not None and entry.expires_at > time.time():
+        content = cache.read(entry)
+        if content is not None:
+            return content
+
+    request_headers = dict(headers or {})
+    if entry is not None:
+        if entry.etag:
+            request_headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            request_headers['If-Modified-Since'] = entry.last_modified
+
+    response = session.get(url, headers=request_headers, timeout=timeout)
+    if response.status_code == 304 and entry is not None:
+        content = cache.read(entry)
+        if content is not None:
+            cache.revalidated(entry, ttl)
+            return content
+        # 正文恰好被淘汰，重新完整请求
+        response = session.get(url, headers=headers, timeout=timeout)
+
+    response.raise_for_status()
+    cache.store(url, response.content, response.headers.get('ETag'), response.headers.get('Last-Modified'), ttl)
+    return response.content
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+爬取检查点 - 记录已完成页面的偏移量及其解析结果，
+中断或出错后可以只补抓缺失的页面
+
+检查点为追加写入的 JSON Lines 文件：第一行记录书单URL，
+之后每完成（或失败）一页追加一行，崩溃时最多丢失最后一行。
+内存中只保留每页的元数据及其所在行的字节偏移，书籍列表在恢复时才从文件中读回，
+因此检查点不会让流式输出的内存占用随书单长度增长。
+"""
+
+import json
+import os
+from collections import namedtuple
+
+DEFAULT_CHECKPOINT_FILE = 'douban_crawl_checkpoint.jsonl'
+
+PageRecord = namedtuple('PageRecord', ['start', 'books', 'has_next', 'total_pages'])
+# 已完成页面在内存中的记录：offset 为该页所在行在检查点文件中的字节偏移
+PageInfo = namedtuple('PageInfo', ['start', 'has_next', 'total_pages', 'offset'])
+
+
+class CrawlCheckpoint:
+    """
+    爬取检查点
+
+    Args:
+        path: 检查点文件路径
+        doulist_url: 书单URL，恢复时用于确认检查点属于同一书单
+        resume: 为True时加载已有检查点，否则重新开始
+    """
+
+    def __init__(self, path, doulist_url, resume=False):
+        self.path = path
+        self.doulist_url = doulist_url
+        self.pages = {}
+        self.failed = set()
+
+        if resume and os.path.exists(path):
+            self._load()
+        else:
+            self._reset()
+
+        self._file = open(path, 'ab')
+
+    def _reset(self):
+        self.pages = {}
+        self.failed = set()
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'doulist_url': self.doulist_url}, ensure_ascii=False) + '\n')
+
+    def _load(self):
+        with open(self.path, 'rb') as f:
+            try:
+                header = json.loads(f.readline())
+            except json.JSONDecodeError:
+                header = {}
+            if not isinstance(header, dict) or header.get('doulist_url') != self.doulist_url:
+                f.close()
+                print(f"检查点 {self.path} 不属于当前书单，重新开始爬取")
+                self._reset()
+                return
+
+            offset = f.tell()
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    record = None
+                if record is not None:
+                    start = record['start']
+                    if record.get('failed'):
+                        if start not in self.pages:
+                            self.failed.add(start)
+                    else:
+                        self.pages[start] = PageInfo(start, record['has_next'], record['total_pages'], offset)
+                        self.failed.discard(start)
+                offset += len(line)
+
+        # 截掉中断时写了一半的最后一行，之后追加的记录才能从新的一行开始
+        if offset < os.path.getsize(self.path):
+            with open(self.path, 'r+b') as f:
+                f.truncate(offset)
+
+        print(f"从检查点 {self.path} 恢复：已完成 {len(self.pages)} 页，失败 {len(self.failed)} 页")
+
+    def _append(self, record):
+        """追加一行，返回该行的字节偏移"""
+        offset = self._file.tell()
+        self._file.write((json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8'))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return offset
+
+    @property
+    def total_pages(self):
+        """已记录页面中给出的总页数，未知时返回None"""
+        for record in self.pages.values():
+            if record.total_pages is not None:
+                return record.total_pages
+        return None
+
+    def get(self, start):
+        """返回已完成页面的记录（书籍从检查点文件中读回），未完成时返回None"""
+        info = self.pages.get(start)
+        if info is None:
+            return None
+        with open(self.path, 'rb') as f:
+            f.seek(info.offset)
+            record = json.loads(f.readline())
+        return PageRecord(start, record['books'], info.has_next, info.total_pages)
+
+    def record_page(self, start, books, has_next, total_pages):
+        """记录一页已完成"""
+        offset = self._append({'start': start, 'books': books, 'has_next': has_next, 'total_pages': total_pages})
+        self.pages[start] = PageInfo(start, has_next, total_pages, offset)
+        self.failed.discard(start)
+
+    def record_failure(self, start):
+        """记录一页抓取失败，恢复时会重新抓取"""
+        self.failed.add(start)
+        self._append({'start': start, 'failed': True})
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def complete(self):
+        """全部页面完成后删除检查点"""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
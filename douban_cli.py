@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+统一命令行入口 - crawl / covers / excel / stats / reparse / search 六个子命令，也可以作为库直接调用同名函数
+
+模块顶层只导入标准库：requests、bs4 在 crawl/covers 中才导入，openpyxl 和 PIL 只在生成
+Excel 或处理封面时导入，pandas 只在 stats 中导入，适合在定时任务中频繁调用。
+加上 --timing 时在结束后打印启动耗时（解析参数并导入子命令依赖）、命令耗时和已加载的重依赖。
+
+用法:
+    python douban_cli.py crawl --workers 4 --rate 2
+    python douban_cli.py covers --workers 8
+    python douban_cli.py excel --sample
+    python douban_cli.py stats --top 10
+    python douban_cli.py reparse --archive page_archive --workers 4
+    python douban_cli.py search 三体 --min-rating 8
+    python douban_cli.py --timing stats douban_books_all.json
+"""
+
+import time
+
+# 进程启动后最早的时间点，用于计算启动耗时（到解析完参数、导入子命令依赖为止）
+_STARTED = time.perf_counter()
+_COMMAND_STARTED = _STARTED
+
+import argparse
+import sys
+
+# 各子命令实际需要导入的模块（benchmarks/bench_startup.py 据此测量冷启动耗时）
+COMMAND_MODULES = {
+    'crawl': ('enhanced_douban_spider',),
+    'covers': ('enhanced_douban_spider', 'create_excel_simple'),
+    'excel': ('create_excel_simple',),
+    'stats': ('douban_analytics', 'create_excel_simple'),
+    'reparse': ('douban_archive',),
+    'search': ('douban_search',),
+}
+
+# --timing 报告中关注的重依赖
+HEAVY_MODULES = ('requests', 'bs4', 'lxml', 'PIL', 'openpyxl', 'numpy', 'pandas')
+
+
+def import_command(command):
+    """导入子命令需要的模块（不执行命令）"""
+    import importlib
+
+    for module in COMMAND_MODULES[command]:
+        importlib.import_module(module)
+
+
+def crawl(doulist_url=None, max_pages=20, workers=1, rate=2.0, backend='html.parser', use_cache=True,
+          details=False, db_file=None, csv_file='douban_books_all.csv', json_file='douban_books_all.json',
+          archive_dir=None):
+    """
+    爬取书单并保存为CSV/JSON/NDJSON（传入 db_file 时同时写入SQLite书籍库），不下载封面、不生成Excel；
+    传入 archive_dir 时把抓取到的页面压缩归档，以后可用 reparse 离线重新解析
+
+    Returns:
+        list: 书籍字典列表
+    """
+    from douban_archive import PageArchive
+    from douban_cache import HttpCache
+    from douban_parser import DEFAULT_DOULIST_URL
+    from enhanced_douban_spider import crawl_all_douban_books, save_data
+
+    cache = HttpCache() if use_cache else None
+    archive = PageArchive(archive_dir) if archive_dir else None
+    try:
+        books_data = crawl_all_douban_books(doulist_url or DEFAULT_DOULIST_URL, max_pages=max_pages, workers=workers,
+                                            rate=rate, backend=backend, cache=cache, archive=archive)
+        if books_data and details:
+            from douban_details import DetailCache, enrich_books
+
+            detail_cache = DetailCache()
+            try:
+                enrich_books(books_data, cache=detail_cache)
+            finally:
+                detail_cache.close()
+    finally:
+        if cache is not None:
+            cache.close()
+        if archive is not None:
+            archive.close()
+
+    if books_data:
+        save_data(books_data, csv_file, json_file)
+        if db_file:
+            from douban_store import BookStore
+
+            store = BookStore(db_file)
+            try:
+                store.upsert_many(books_data)
+            finally:
+                store.close()
+            print(f"数据已写入 {db_file}")
+    return books_data
+
+
+def covers(db_file=None, workers=8, use_cache=True, covers_dir='book_covers'):
+    """
+    为已爬取的书籍下载封面（已存在的封面不再下载）
+
+    Returns:
+        list: 与书籍一一对应的封面文件路径（下载失败为None）
+    """
+    from create_excel_simple import load_books
+    from douban_cache import HttpCache
+    from enhanced_douban_spider import download_covers
+
+    books_data, total = load_books(db_file)
+    books_data = list(books_data)
+    print(f"读取到 {total} 本书籍数据")
+    cache = HttpCache() if use_cache else None
+    try:
+        return download_covers(books_data, covers_dir, workers, cache)
+    finally:
+        if cache is not None:
+            cache.close()
+
+
+def excel(db_file=None, sample=False, all_covers=False, **export_options):
+    """
+    从已爬取的数据生成Excel：默认为不含图片的完整表格，sample 为前50本的带封面示例，
+    all_covers 为全部书籍的带封面文件（export_options 传给 create_excel_with_all_covers）
+
+    Returns:
+        生成的文件名（all_covers 时为文件名列表）
+    """
+    import create_excel_simple
+
+    if all_covers:
+        return create_excel_simple.create_excel_with_all_covers(db_file, **export_options)
+    if sample:
+        return create_excel_simple.create_excel_with_images(db_file)
+    return create_excel_simple.create_excel_from_data(db_file)
+
+
+def stats(json_files=(), db_file=None, top=5):
+    """
+    打印统计信息；未指定数据源时读取默认的爬取结果
+
+    Returns:
+        BookAnalytics: 统计对象，可继续查询
+    """
+    from douban_analytics import BookAnalytics, load_frame
+
+    if json_files or db_file:
+        analytics = BookAnalytics(load_frame(json_files, db_file=db_file))
+    else:
+        from create_excel_simple import load_books
+
+        books_data, _ = load_books()
+        analytics = BookAnalytics.from_books(list(books_data))
+    analytics.print_report(top)
+    if top > 5:
+        analytics.print_details(top)
+    return analytics
+
+
+def reparse(archive_dir='page_archive', doulist_urls=None, backend='html.parser', workers=None,
+            output_dir='reparse_output'):
+    """
+    不访问网络，用归档的页面在多个进程中重新解析书单并保存
+
+    Returns:
+        dict: 书单URL → 书籍列表
+    """
+    from douban_archive import reparse_archive, save_reparsed
+
+    books_by_list = reparse_archive(archive_dir, doulist_urls, backend, workers)
+    save_reparsed(books_by_list, output_dir)
+    return books_by_list
+
+
+def search(query='', field=None, prefix=False, publisher=None, min_rating=None, max_rating=None, top=10,
+           index_file='douban_search.idx'):
+    """
+    在搜索索引中查找书籍；索引文件不存在时先从默认的爬取结果建立
+
+    Returns:
+        list: Book 列表，按评分从高到低
+    """
+    import os
+
+    from douban_search import SearchIndex, iter_source_books, print_results
+
+    if os.path.exists(index_file):
+        index = SearchIndex.load(index_file)
+    else:
+        index = SearchIndex(iter_source_books())
+        index.save(index_file)
+        print(f"已为 {len(index)} 本书籍建立索引: {index_file}")
+    start_time = time.perf_counter()
+    books = index.search(query, field, prefix, publisher, min_rating, max_rating, top)
+    print_results(books, time.perf_counter() - start_time)
+    return books
+
+
+def print_timing(command_seconds):
+    """打印启动耗时、命令耗时和已加载的重依赖"""
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+    print(f"\n启动耗时 {(_COMMAND_STARTED - _STARTED) * 1000:.1f} ms，命令耗时 {command_seconds:.2f} s，"
+          f"已加载: {', '.join(loaded) or '无'}")
+
+
+def build_parser():
+    from douban_metrics import DEFAULT_METRICS_FILE, LOG_FORMATS, LOG_LEVELS
+    from douban_parser import PARSER_BACKENDS
+
+    parser = argparse.ArgumentParser(description='豆瓣书单工具')
+    parser.add_argument('--log-level', choices=LOG_LEVELS, default='INFO', help='日志级别，DEBUG 时输出每本书')
+    parser.add_argument('--log-format', choices=LOG_FORMATS, default='text',
+                        help='日志格式：text 为带时间、级别和来源的文本，kv 为 key=value 行，json 为JSON行')
+    parser.add_argument('--metrics-file', default=DEFAULT_METRICS_FILE,
+                        help='运行指标文件（.prom 为 Prometheus 文本格式，其余为JSON）')
+    parser.add_argument('--timing', action='store_true', help='结束后打印启动耗时和已加载的重依赖')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    crawl_parser = subparsers.add_parser('crawl', help='爬取书单并保存CSV/JSON')
+    crawl_parser.add_argument('--url', help='书单URL（默认为内置书单）')
+    crawl_parser.add_argument('--max-pages', type=int, default=20, help='最多爬取的页数')
+    crawl_parser.add_argument('--workers', type=int, default=1, help='并发抓取数')
+    crawl_parser.add_argument('--rate', type=float, default=2.0, help='并发模式下每秒允许的请求数')
+    crawl_parser.add_argument('--parser', choices=PARSER_BACKENDS, default='html.parser', help='页面解析后端')
+    crawl_parser.add_argument('--no-cache', action='store_true', help='不使用HTTP缓存')
+    crawl_parser.add_argument('--details', action='store_true', help='抓取详情页补充 ISBN、页数等字段')
+    crawl_parser.add_argument('--db', help='同时写入SQLite书籍库')
+    crawl_parser.add_argument('--archive', help='把抓取到的书单页面压缩归档到该目录')
+
+    covers_parser = subparsers.add_parser('covers', help='下载封面')
+    covers_parser.add_argument('--db', help='从SQLite书籍库读取书籍')
+    covers_parser.add_argument('--workers', type=int, default=8, help='封面并发下载数')
+    covers_parser.add_argument('--no-cache', action='store_true', help='不使用HTTP缓存')
+
+    excel_parser = subparsers.add_parser('excel', help='生成Excel')
+    excel_parser.add_argument('--db', help='从SQLite书籍库读取书籍')
+    mode = excel_parser.add_mutually_exclusive_group()
+    mode.add_argument('--sample', action='store_true', help='生成前50本的带封面示例')
+    mode.add_argument('--all-covers', action='store_true', help='为全部书籍嵌入封面，按需拆分为多个文件')
+    excel_parser.add_argument('--workers', type=int, help='--all-covers 的并行进程数，默认为CPU核数')
+
+    stats_parser = subparsers.add_parser('stats', help='统计分析')
+    stats_parser.add_argument('json_files', nargs='*', help='douban_books_*.json 文件（默认读取爬取结果）')
+    stats_parser.add_argument('--db', help='SQLite书籍库')
+    stats_parser.add_argument('--top', type=int, default=5, help='出版社和作者排行显示的数量')
+
+    reparse_parser = subparsers.add_parser('reparse', help='从页面归档离线重新解析书单')
+    reparse_parser.add_argument('--archive', default='page_archive', help='归档目录')
+    reparse_parser.add_argument('--url', action='append', help='只解析指定书单，可重复指定（默认为全部）')
+    reparse_parser.add_argument('--parser', choices=PARSER_BACKENDS, default='html.parser', help='页面解析后端')
+    reparse_parser.add_argument('--workers', type=int, help='解析进程数，默认为CPU核数')
+    reparse_parser.add_argument('--output-dir', default='reparse_output', help='输出目录')
+
+    search_parser = subparsers.add_parser('search', help='在搜索索引中查找书籍')
+    search_parser.add_argument('query', nargs='?', default='', help='查询文本（书名、作者、出版社的子串）')
+    search_parser.add_argument('--field', choices=('书名', '作者', '出版社'), help='只在该字段中查找')
+    search_parser.add_argument('--prefix', action='store_true', help='前缀匹配')
+    search_parser.add_argument('--publisher', help='出版社（完全匹配）')
+    search_parser.add_argument('--min-rating', type=float, help='最低评分')
+    search_parser.add_argument('--max-rating', type=float, help='最高评分')
+    search_parser.add_argument('--top', type=int, default=10, help='返回评分最高的前几本')
+    search_parser.add_argument('--index', default='douban_search.idx', help='索引文件（不存在时从爬取结果建立）')
+    return parser
+
+
+def main(argv=None):
+    """主函数"""
+    global _COMMAND_STARTED
+
+    args = build_parser().parse_args(argv)
+
+    from douban_metrics import METRICS, setup_logging
+
+    setup_logging(args.log_level, args.log_format)
+    if args.timing:
+        # 先导入子命令的依赖，启动耗时才包含这部分，命令耗时中不再重复计入
+        import_command(args.command)
+    _COMMAND_STARTED = time.perf_counter()
+
+    if args.command == 'crawl':
+        crawl(args.url, args.max_pages, args.workers, args.rate, args.parser, not args.no_cache, args.details, args.db,
+              archive_dir=args.archive)
+    elif args.command == 'covers':
+        covers(args.db, args.workers, not args.no_cache)
+    elif args.command == 'excel':
+        options = {'workers': args.workers} if args.all_covers else {}
+        excel(args.db, args.sample, args.all_covers, **options)
+    elif args.command == 'stats':
+        stats(args.json_files, args.db, args.top)
+    elif args.command == 'reparse':
+        reparse(args.archive, args.url, args.parser, args.workers, args.output_dir)
+    elif args.command == 'search':
+        search(args.query, args.field, args.prefix, args.publisher, args.min_rating, args.max_rating, args.top,
+               args.index)
+
+    if args.command not in ('stats', 'search'):
+        METRICS.print_summary()
+        print(f"运行指标已保存到 {METRICS.dump(args.metrics_file)}")
+    if args.timing:
+        print_timing(time.perf_counter() - _COMMAND_STARTED)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按内容寻址的封面存储 - 封面文件以封面URL的哈希命名，
+manifest.json 记录 书籍链接 → 封面键 以及每个封面的大小和尺寸，
+书单中插入或删除书籍不会使已有封面失效
+"""
+
+import hashlib
+import io
+import json
+import os
+import threading
+
+DEFAULT_COVERS_DIR = 'book_covers'
+MANIFEST_FILE = 'manifest.json'
+
+
+def cover_key(cover_url):
+    """封面键：封面URL的SHA1"""
+    return hashlib.sha1(cover_url.encode('utf-8')).hexdigest()
+
+
+def image_dimensions(content):
+    """读取图片尺寸，只解析文件头"""
+    from PIL import Image as PILImage
+
+    try:
+        with PILImage.open(io.BytesIO(content)) as img:
+            return img.size
+    except Exception:
+        return None, None
+
+
+class CoverStore:
+    """
+    封面存储（线程安全）
+
+    目录结构:
+        book_covers/manifest.json
+        book_covers/ab/ab12....jpg
+
+    manifest.json:
+        {"books": {书籍链接: 封面键},
+         "covers": {封面键: {"cover_url", "size", "width", "height"}}}
+    """
+
+    def __init__(self, root=DEFAULT_COVERS_DIR):
+        self.root = root
+        self.manifest_path = os.path.join(root, MANIFEST_FILE)
+        self._lock = threading.Lock()
+        self.books = {}
+        self.covers = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            self.books = manifest.get('books', {})
+            self.covers = manifest.get('covers', {})
+
+    def path_for(self, key):
+        """封面键对应的文件路径"""
+        return os.path.join(self.root, key[:2], key + '.jpg')
+
+    def has(self, key):
+        """封面是否已存在（manifest 中有记录且文件存在）"""
+        return key in self.covers and os.path.exists(self.path_for(key))
+
+    def lookup(self, book_url):
+        """按书籍链接查找封面信息，返回 (封面键, 信息字典)，不存在时返回 (None, None)"""
+        key = self.books.get(book_url)
+        if key is None or key not in self.covers:
+            return None, None
+        return key, self.covers[key]
+
+    def cover_path(self, book_url):
+        """按书籍链接查找封面文件路径，不存在时返回None"""
+        key, _ = self.lookup(book_url)
+        if key is None:
+            return None
+        path = self.path_for(key)
+        return path if os.path.exists(path) else None
+
+    def link(self, book, key):
+        """把书籍关联到已存在的封面"""
+        with self._lock:
+            self.books[book['书籍链接']] = key
+
+    def add(self, book, content):
+        """保存封面内容并关联到书籍，返回封面键"""
+        key = cover_key(book['封面链接'])
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(content)
+        os.replace(temp_path, path)
+
+        width, height = image_dimensions(content)
+        with self._lock:
+            self.covers[key] = {
+                'cover_url': book['封面链接'],
+                'size': len(content),
+                'width': width,
+                'height': height,
+            }
+            self.books[book['书籍链接']] = key
+        return key
+
+    def save(self):
+        """写回 manifest.json"""
+        os.makedirs(self.root, exist_ok=True)
+        with self._lock:
+            manifest = {'books': dict(self.books), 'covers': dict(self.covers)}
+        temp_path = self.manifest_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(temp_path, self.manifest_path)
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+书籍详情补充 - 在限速下并发抓取每本书的详情页，补充 ISBN、页数、定价、出版年和评价人数；
+解析结果按书籍链接缓存在SQLite中，同一本书无论出现在多少书单、多少次运行中只抓取一次
+"""
+
+import json
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from douban_cache import fetch_bytes
+from douban_http import create_session
+from douban_rate_limit import HostScheduler
+
+DEFAULT_DETAILS_DB = 'douban_details.db'
+
+# 详情缓存的有效期：评价人数会变化，其余字段基本不变
+DETAIL_MAX_AGE = 30 * 24 * 3600
+
+DETAIL_FIELDS = ['ISBN', '页数', '定价', '出版年', '评价人数']
+
+# 详情页 #info 中的字段，值截止到下一个“标签:”或结尾
+_LABEL_END = r'(?=\s+[^\s:：]{1,8}[:：]|$)'
+INFO_PATTERNS = {
+    'ISBN': re.compile(r'ISBN[:：]\s*([0-9Xx-]+)'),
+    '页数': re.compile(r'页数[:：]\s*(\d+)'),
+    '定价': re.compile(r'定价[:：]\s*(.+?)' + _LABEL_END),
+    '出版年': re.compile(r'出版年[:：]\s*(.+?)' + _LABEL_END),
+}
+
+
+def empty_detail():
+    """返回字段齐全的空详情字典"""
+    return {field: '' for field in DETAIL_FIELDS}
+
+
+def parse_book_detail(content):
+    """
+    解析书籍详情页
+
+    Args:
+        content: 详情页的原始字节或文本
+
+    Returns:
+        dict: 以 DETAIL_FIELDS 为键的详情，缺失的字段为空字符串
+    """
+    from bs4 import BeautifulSoup, SoupStrainer
+
+    from_encoding = 'utf-8' if isinstance(content, bytes) else None
+    # 只构建 #info 和评分区块
+    strainer = SoupStrainer('div', id=['info', 'interest_sectl'])
+    soup = BeautifulSoup(content, 'html.parser', from_encoding=from_encoding, parse_only=strainer)
+
+    detail = empty_detail()
+    info = soup.find('div', id='info')
+    if info:
+        info_text = info.get_text(' ', strip=True)
+        for field, pattern in INFO_PATTERNS.items():
+            match = pattern.search(info_text)
+            if match:
+                detail[field] = match.group(1).strip()
+
+    votes = soup.find('span', property='v:votes')
+    if votes:
+        detail['评价人数'] = votes.get_text(strip=True)
+    return detail
+
+
+class DetailCache:
+    """
+    按书籍链接保存解析后的详情（线程安全）
+
+    Args:
+        path: SQLite数据库文件
+        max_age: 缓存有效期（秒），过期的详情会重新抓取
+    """
+
+    def __init__(self, path=DEFAULT_DETAILS_DB, max_age=DETAIL_MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS details (
+                book_url TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        self._db.commit()
+
+    def get_many(self, book_urls):
+        """读取一批未过期的详情，返回 {书籍链接: 详情}"""
+        found = {}
+        oldest = time.time() - self.max_age
+        book_urls = list(book_urls)
+        with self._lock:
+            # 分批查询，避免超出SQLite的参数个数限制
+            for index in range(0, len(book_urls), 500):
+                batch = book_urls[index:index + 500]
+                placeholders = ', '.join('?' * len(batch))
+                rows = self._db.execute(
+                    f"SELECT book_url, data FROM details WHERE fetched_at >= ? AND book_url IN ({placeholders})",
+                    [oldest] + batch
+                ).fetchall()
+                found.update((book_url, json.loads(data)) for book_url, data in rows)
+        return found
+
+    def put(self, book_url, detail):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO details (book_url, data, fetched_at) VALUES (?, ?, ?)",
+                (book_url, json.dumps(detail, ensure_ascii=False), time.time())
+            )
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def enrich_books(books_data, workers=4, rate=1.0, cache=None, session=None):
+    """
+    为书籍补充详情字段（就地修改书籍字典）
+
+    Args:
+        books_data: 书籍信息列表
+        workers: 并发抓取数
+        rate: 每个主机每秒允许的请求数
+        cache: DetailCache，为None时不缓存
+        session: requests.Session，为None时新建
+
+    Returns:
+        tuple: (新抓取的数量, 缓存命中的数量, 失败的数量)
+    """
+    book_urls = list(dict.fromkeys(book['书籍链接'] for book in books_data if book['书籍链接']))
+    details = cache.get_many(book_urls) if cache else {}
+    pending = [book_url for book_url in book_urls if book_url not in details]
+    print(f"共 {len(book_urls)} 本书籍需要详情，缓存命中 {len(details)} 本，需要抓取 {len(pending)} 本")
+
+    own_session = session is None
+    session = session or create_session(pool_size=workers)
+    scheduler = HostScheduler(rate, capacity=workers)
+    failed = 0
+
+    def fetch_detail(book_url):
+        scheduler.acquire(book_url)
+        detail = parse_book_detail(fetch_bytes(session, book_url))
+        if cache:
+            cache.put(book_url, detail)
+        return detail
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {book_url: executor.submit(fetch_detail, book_url) for book_url in pending}
+            for book_url, future in futures.items():
+                try:
+                    details[book_url] = future.result()
+                except Exception as e:
+                    failed += 1
+                    print(f"获取详情失败 {book_url}: {e}")
+    if own_session:
+        session.close()
+
+    for book in books_data:
+        book.update(details.get(book['书籍链接']) or empty_detail())
+
+    fetched = len(pending) - failed
+    print(f"详情补充完成：新抓取 {fetched} 本，缓存 {len(book_urls) - len(pending)} 本，失败 {failed} 本")
+    return fetched, len(book_urls) - len(pending), failed
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式Excel导出 - 使用 openpyxl 的只写模式逐行写入，
+所有单元格共用一个命名样式，内存占用不随行数增长
+（openpyxl 在首次生成表格时才导入，只爬取不生成Excel时不承担其导入耗时）
+"""
+
+import io
+
+from douban_metrics import METRICS
+
+# 与原有表格一致的列宽
+COLUMN_WIDTHS = {
+    'A': 8,   # 序号
+    'B': 30,  # 书名
+    'C': 25,  # 作者
+    'D': 20,  # 出版社
+    'E': 8,   # 评分
+    'F': 50,  # 链接
+    'G': 15,  # 封面
+}
+
+BOOK_FIELDS = ['书名', '作者', '出版社', '评分', '书籍链接']
+CELL_STYLE_NAME = 'book_cell'
+
+# 插入封面时的图片大小和行高
+IMAGE_WIDTH = 80
+IMAGE_HEIGHT = 112
+IMAGE_ROW_HEIGHT = 90
+
+
+def create_streaming_sheet(title, last_header):
+    """创建只写工作簿并写好表头，返回 (工作簿, 工作表)；单元格样式以 CELL_STYLE_NAME 注册在工作簿上"""
+    from openpyxl import Workbook
+    from openpyxl.styles import Alignment, NamedStyle
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title)
+
+    # 共享的命名样式，避免每个单元格各建一个 Alignment
+    cell_style = NamedStyle(name=CELL_STYLE_NAME, alignment=Alignment(horizontal='left', vertical='center'))
+    wb.add_named_style(cell_style)
+
+    # 只写模式下列宽和行高必须在写入对应行之前设置
+    for column, width in COLUMN_WIDTHS.items():
+        ws.column_dimensions[column].width = width
+    ws.row_dimensions[1].height = 20
+
+    ws.append(['序号'] + BOOK_FIELDS + [last_header])
+    return wb, ws
+
+
+def book_row(ws, index, book, last_value=None):
+    """构建一行单元格：序号、书名、作者、出版社、评分、链接、最后一列"""
+    from openpyxl.cell import WriteOnlyCell
+
+    values = [index] + [book[field] for field in BOOK_FIELDS] + [last_value]
+    row = []
+    for value in values:
+        cell = WriteOnlyCell(ws, value=value)
+        cell.style = CELL_STYLE_NAME
+        row.append(cell)
+    return row
+
+
+def write_books_streaming(rows, excel_file, sheet_title="豆瓣书单", last_header='封面状态', progress_every=1000):
+    """
+    逐行写出书籍表格
+
+    Args:
+        rows: (书籍, 缩略图字节, G列文本) 的可迭代对象（可以是生成器）；
+            缩略图非空时在G列插入图片，否则写入G列文本（为None时留空）
+        excel_file: 输出文件
+        sheet_title: 工作表名称
+        last_header: 最后一列（G列）的标题
+        progress_every: 每写多少行打印一次进度
+
+    Returns:
+        int: 写入的书籍数量
+    """
+    with METRICS.timer('excel_write'):
+        count = _write_rows(rows, excel_file, sheet_title, last_header, progress_every)
+    METRICS.count('excel_write', count)
+    return count
+
+
+def _write_rows(rows, excel_file, sheet_title, last_header, progress_every):
+    from openpyxl.drawing.image import Image
+
+    wb, ws = create_streaming_sheet(sheet_title, last_header)
+
+    count = 0
+    for count, (book, image_data, status) in enumerate(rows, 1):
+        row_index = count + 1
+        if image_data:
+            excel_img = Image(io.BytesIO(image_data))
+            excel_img.width = IMAGE_WIDTH
+            excel_img.height = IMAGE_HEIGHT
+            ws.add_image(excel_img, f'G{row_index}')
+            ws.row_dimensions[row_index].height = IMAGE_ROW_HEIGHT
+            last_value = None
+        else:
+            last_value = status
+
+        ws.append(book_row(ws, count, book, last_value))
+
+        if progress_every and count % progress_every == 0:
+            print(f"已写入 {count} 本书籍...")
+
+    wb.save(excel_file)
+    return count
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享HTTP客户端 - 各爬虫和封面下载共用的会话工厂：
+统一的请求头（gzip/deflate 压缩、keep-alive）、可调的连接池、重试与自适应限速，
+以及记录每个请求耗时的响应钩子
+"""
+
+import threading
+from urllib.parse import urlsplit
+
+import requests
+
+from douban_retry import mount_retry_adapter
+
+USER_AGENT = ('Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 '
+              '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+
+DEFAULT_HEADERS = {
+    'User-Agent': USER_AGENT,
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+}
+
+# 请求图片时使用的 Accept
+IMAGE_ACCEPT = 'image/avif,image/webp,image/apng,image/*,*/*;q=0.8'
+
+DEFAULT_POOL_SIZE = 10
+
+
+class RequestTimer:
+    """按主机统计请求次数、耗时（到收到响应头为止）和传输字节数（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hosts = {}
+
+    def record(self, response, *args, **kwargs):
+        """requests 的 response 钩子"""
+        host = urlsplit(response.url).netloc
+        elapsed = response.elapsed.total_seconds()
+        size = int(response.headers.get('Content-Length') or 0)
+        with self._lock:
+            stats = self.hosts.setdefault(host, {'requests': 0, 'total': 0.0, 'max': 0.0, 'bytes': 0})
+            stats['requests'] += 1
+            stats['total'] += elapsed
+            stats['max'] = max(stats['max'], elapsed)
+            stats['bytes'] += size
+        return response
+
+    def reset(self):
+        with self._lock:
+            self.hosts.clear()
+
+    def print_summary(self):
+        """打印各主机的请求统计"""
+        with self._lock:
+            hosts = {host: dict(stats) for host, stats in self.hosts.items()}
+        if not hosts:
+            return
+        print(f"\n=== 请求统计 ===")
+        for host, stats in sorted(hosts.items()):
+            average = stats['total'] / stats['requests']
+            print(f"  {host}: {stats['requests']} 次请求，平均 {average * 1000:.0f} ms，"
+                  f"最长 {stats['max'] * 1000:.0f} ms，共 {stats['bytes'] / 1024:.0f} KB（压缩后）")
+
+
+# 默认挂在所有会话上的计时器
+REQUEST_TIMER = RequestTimer()
+
+_default_session = None
+_default_session_lock = threading.Lock()
+
+
+def create_session(pool_size=DEFAULT_POOL_SIZE, retries=3, throttle=None, timer=REQUEST_TIMER):
+    """
+    创建共享配置的会话
+
+    Args:
+        pool_size: 每个主机的连接池大小（应不小于并发数，否则多出的连接用完即关）
+        retries: 最多重试次数
+        throttle: AdaptiveThrottle，为None时新建一个
+        timer: RequestTimer，为None时不计时
+    """
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+    # 出错自动重试，并发上限和等待间隔随服务器响应自适应调整
+    mount_retry_adapter(session, pool_size, retries, throttle)
+    if timer is not None:
+        session.hooks['response'].append(timer.record)
+    return session
+
+
+def get_default_session():
+    """进程内共享的默认会话，供没有传入会话的零散请求复用连接"""
+    global _default_session
+    with _default_session_lock:
+        if _default_session is None:
+            _default_session = create_session()
+        return _default_session
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+全量带封面Excel导出 - 为每本书嵌入封面，不再只处理前50本：
+- 缩略图按字节预算压缩（逐步降低JPEG质量，必要时再缩小尺寸）
+- 按行数和预估文件大小自动拆分为多个工作簿，各工作簿在独立进程中并行生成
+- 写出后对 xlsx 内的图片去重：相同的封面在文件中只保存一份，多行共用
+"""
+
+import hashlib
+import io
+import os
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+DEFAULT_ROWS_PER_FILE = 2000
+DEFAULT_MAX_FILE_BYTES = 50 * 1024 * 1024
+DEFAULT_IMAGE_BYTES = 8 * 1024
+
+# 不含图片时每行在 xlsx 中大约占用的字节数（用于预估文件大小）
+ROW_OVERHEAD_BYTES = 400
+
+MEDIA_TARGET_PATTERN = re.compile(r'Target="(?:\.\./|/xl/)media/([^"]+)"')
+
+
+def fit_to_budget(content, max_bytes=DEFAULT_IMAGE_BYTES, min_quality=30):
+    """
+    把JPEG缩略图压缩到字节预算以内
+
+    先在 [min_quality, 85] 之间二分查找满足预算的最高质量，仍超出时按比例缩小尺寸后重试
+
+    Returns:
+        bytes: 不超过预算的JPEG（原图已满足预算时原样返回）
+    """
+    if len(content) <= max_bytes:
+        return content
+
+    from PIL import Image as PILImage
+
+    img = PILImage.open(io.BytesIO(content))
+    if img.mode not in ('RGB', 'L'):
+        img = img.convert('RGB')
+
+    def encode(image, quality):
+        output = io.BytesIO()
+        image.save(output, 'JPEG', quality=quality, optimize=True)
+        return output.getvalue()
+
+    while True:
+        best = None
+        low, high = min_quality, 85
+        while low <= high:
+            quality = (low + high) // 2
+            data = encode(img, quality)
+            if len(data) <= max_bytes:
+                best = data
+                low = quality + 1
+            else:
+                high = quality - 1
+        if best is not None or min(img.size) <= 16:
+            return best if best is not None else encode(img, min_quality)
+        img = img.resize((max(1, img.width * 3 // 4), max(1, img.height * 3 // 4)), PILImage.Resampling.LANCZOS)
+
+
+def plan_files(image_keys, image_bytes, rows_per_file=DEFAULT_ROWS_PER_FILE, max_file_bytes=DEFAULT_MAX_FILE_BYTES):
+    """
+    按行数上限和预估大小把书籍切分为若干个连续区间
+
+    Args:
+        image_keys: 每本书对应的图片键（无图片为None）
+        image_bytes: 图片键 → 压缩后的字节数
+        rows_per_file: 每个工作簿的最大行数
+        max_file_bytes: 每个工作簿的预估大小上限（同一文件内重复的图片只计一次）
+
+    Returns:
+        list: [(起始下标, 结束下标)]
+    """
+    ranges = []
+    start = 0
+    size = 0
+    seen = set()
+    for index, key in enumerate(image_keys):
+        cost = ROW_OVERHEAD_BYTES
+        if key is not None and key not in seen:
+            cost += image_bytes.get(key, 0)
+        if index > start and (index - start >= rows_per_file or size + cost > max_file_bytes):
+            ranges.append((start, index))
+            start = index
+            size = ROW_OVERHEAD_BYTES
+            seen = set()
+            if key is not None:
+                size += image_bytes.get(key, 0)
+        else:
+            size += cost
+        if key is not None:
+            seen.add(key)
+    if start < len(image_keys):
+        ranges.append((start, len(image_keys)))
+    return ranges
+
+
+def dedupe_xlsx_media(excel_file):
+    """
+    对 xlsx 中内容相同的图片去重：绘图关系全部指向第一份，删除其余副本
+
+    Returns:
+        int: 删除的重复图片数量
+    """
+    with zipfile.ZipFile(excel_file) as source:
+        entries = [(info, source.read(info.filename)) for info in source.infolist()]
+
+    canonical = {}
+    renamed = {}
+    for info, data in entries:
+        if info.filename.startswith('xl/media/'):
+            name = info.filename[len('xl/media/'):]
+            digest = hashlib.sha1(data).hexdigest()
+            if digest in canonical:
+                renamed[name] = canonical[digest]
+            else:
+                canonical[digest] = name
+    if not renamed:
+        return 0
+
+    def retarget(match):
+        name = match.group(1)
+        return match.group(0).replace(name, renamed.get(name, name))
+
+    temp_file = excel_file + '.tmp'
+    with zipfile.ZipFile(temp_file, 'w', zipfile.ZIP_DEFLATED) as target:
+        for info, data in entries:
+            if info.filename.startswith('xl/media/') and info.filename[len('xl/media/'):] in renamed:
+                continue
+            if info.filename.endswith('.rels') and b'media/' in data:
+                data = MEDIA_TARGET_PATTERN.sub(retarget, data.decode('utf-8')).encode('utf-8')
+            # 图片本身已压缩，直接存储
+            compress_type = zipfile.ZIP_STORED if info.filename.startswith('xl/media/') else zipfile.ZIP_DEFLATED
+            target.writestr(info.filename, data, compress_type)
+    os.replace(temp_file, excel_file)
+    return len(renamed)
+
+
+def cover_status(book, cover_path, thumbnail_errors):
+    """没有插入图片时G列显示的文字：无封面、封面文件未找到，或缩略图生成失败的原因"""
+    if not book['封面链接']:
+        return "无封面"
+    if not cover_path:
+        return "封面文件未找到"
+    if cover_path in thumbnail_errors:
+        return f"缩略图失败: {thumbnail_errors[cover_path]}"
+    return None
+
+
+def write_illustrated_file(books, image_keys, statuses, images, excel_file, sheet_title, image_budget,
+                           progress_every):
+    """
+    生成一个带封面的工作簿（在工作进程中运行）
+
+    Args:
+        books: 本文件的书籍列表
+        image_keys: 与 books 一一对应的图片键（无图片为None）
+        statuses: 与 books 一一对应的封面状态文字（没有图片时写在G列）
+        images: 图片键 → 缩略图字节（只含本文件用到的图片）
+        excel_file: 输出文件
+        sheet_title: 工作表名称
+        image_budget: 每张图片的字节预算
+        progress_every: 每写多少行打印一次进度
+
+    Returns:
+        tuple: (文件名, 行数, 去重的图片数, 文件字节数)
+    """
+    from douban_excel import write_books_streaming
+
+    fitted = {key: fit_to_budget(content, image_budget) for key, content in images.items()}
+    rows = ((book, fitted.get(key) if key is not None else None, status)
+            for book, key, status in zip(books, image_keys, statuses))
+    count = write_books_streaming(rows, excel_file, sheet_title, '封面', progress_every=progress_every)
+    removed = dedupe_xlsx_media(excel_file)
+    return excel_file, count, removed, os.path.getsize(excel_file)
+
+
+def export_illustrated(books_data, output_prefix='douban_books_illustrated', covers_dir='book_covers',
+                       rows_per_file=DEFAULT_ROWS_PER_FILE, max_file_bytes=DEFAULT_MAX_FILE_BYTES,
+                       image_budget=DEFAULT_IMAGE_BYTES, workers=None, sheet_title="豆瓣书单(带封面)"):
+    """
+    为全部书籍生成带封面的Excel，按需拆分为多个工作簿并行生成
+
+    Args:
+        books_data: 书籍字典列表
+        output_prefix: 输出文件名前缀，只有一个文件时为 <前缀>.xlsx，否则为 <前缀>_001.xlsx ...
+        covers_dir: 封面存储目录
+        rows_per_file: 每个工作簿的最大行数
+        max_file_bytes: 每个工作簿的预估大小上限
+        image_budget: 每张缩略图的字节预算
+        workers: 进程数，默认为CPU核数
+
+    Returns:
+        list: 生成的文件名
+    """
+    from douban_covers import CoverStore
+    from douban_thumbnails import thumbnail_covers
+
+    books_data = list(books_data)
+    store = CoverStore(covers_dir)
+    cover_paths = [store.cover_path(book['书籍链接']) for book in books_data]
+    thumbnails, thumbnail_errors = thumbnail_covers([path for path in cover_paths if path], workers=workers)
+    if thumbnail_errors:
+        print(f"有 {len(thumbnail_errors)} 张封面无法生成缩略图，将显示为文字")
+
+    # 以封面文件路径作为图片键：相同封面共用一份数据
+    image_keys = [path if path in thumbnails else None for path in cover_paths]
+    statuses = [cover_status(book, path, thumbnail_errors) for book, path in zip(books_data, cover_paths)]
+    image_bytes = {path: min(len(content), image_budget) for path, content in thumbnails.items()}
+    ranges = plan_files(image_keys, image_bytes, rows_per_file, max_file_bytes)
+
+    if len(ranges) == 1:
+        filenames = [f"{output_prefix}.xlsx"]
+    else:
+        filenames = [f"{output_prefix}_{number:03d}.xlsx" for number in range(1, len(ranges) + 1)]
+    print(f"共 {len(books_data)} 本书籍，{len(thumbnails)} 张不同的封面，拆分为 {len(ranges)} 个文件")
+
+    tasks = []
+    for (start, end), filename in zip(ranges, filenames):
+        keys = image_keys[start:end]
+        images = {key: thumbnails[key] for key in set(keys) if key is not None}
+        tasks.append((books_data[start:end], keys, statuses[start:end], images, filename, sheet_title, image_budget, 0))
+
+    results = []
+    if len(tasks) == 1 or workers == 1:
+        results = [write_illustrated_file(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(write_illustrated_file, *task) for task in tasks]
+            results = [future.result() for future in futures]
+
+    for filename, count, removed, size in results:
+        print(f"  {filename}: {count} 行，去除重复图片 {removed} 张，{size / 1024 / 1024:.1f} MB")
+    return filenames
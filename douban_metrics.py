@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运行指标 - 按阶段（抓取、解析、封面下载、缩略图、Excel写入、保存）记录计数和耗时直方图，
+运行结束时打印汇总并导出为 JSON 或 Prometheus 文本格式；
+爬取进度通过 logging 输出（逐本书为 DEBUG 级别），由 --log-level 控制级别，
+--log-format 选择带时间/级别/来源的文本、key=value 或 JSON 行格式，便于过滤
+"""
+
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+# 耗时直方图的桶上界（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LOG_LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR')
+LOG_FORMATS = ('text', 'kv', 'json')
+TEXT_LOG_FORMAT = '%(asctime)s %(levelname)s %(name)s %(message)s'
+DEFAULT_METRICS_FILE = 'douban_metrics.json'
+
+
+class KeyValueFormatter(logging.Formatter):
+    """每条日志输出为一行 key=value：time、level、logger、msg，值含空白或引号时加引号"""
+
+    def __init__(self, datefmt='%Y-%m-%dT%H:%M:%S%z'):
+        super().__init__(datefmt=datefmt)
+
+    def format(self, record):
+        fields = self.fields(record)
+        return ' '.join(f"{key}={self.quote(value)}" for key, value in fields.items())
+
+    def fields(self, record):
+        fields = {
+            'time': self.formatTime(record, self.datefmt),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        if record.exc_info:
+            fields['exc'] = self.formatException(record.exc_info)
+        return fields
+
+    @staticmethod
+    def quote(value):
+        value = str(value)
+        if not value or any(char.isspace() or char in '"=' for char in value):
+            return json.dumps(value, ensure_ascii=False)
+        return value
+
+
+class JsonFormatter(KeyValueFormatter):
+    """每条日志输出为一行JSON对象，字段与 KeyValueFormatter 相同"""
+
+    def format(self, record):
+        return json.dumps(self.fields(record), ensure_ascii=False)
+
+
+def setup_logging(level='INFO', fmt='text'):
+    """
+    配置根日志
+
+    Args:
+        level: 日志级别，见 LOG_LEVELS
+        fmt: 'text' 为带时间、级别和来源的文本，'kv' 为 key=value 行，'json' 为JSON行
+    """
+    handler = logging.StreamHandler()
+    if fmt == 'kv':
+        handler.setFormatter(KeyValueFormatter())
+    elif fmt == 'json':
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(TEXT_LOG_FORMAT))
+    logging.basicConfig(level=getattr(logging, level.upper()), handlers=[handler])
+
+
+class Histogram:
+    """固定桶的耗时直方图"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        index = 0
+        while index < len(self.buckets) and value > self.buckets[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """按桶估算分位数（返回所在桶的上界）"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= target:
+                return min(bound, self.max)
+        return self.max
+
+
+class Metrics:
+    """
+    按阶段汇总的指标（线程安全）
+
+    每个阶段记录：耗时直方图、处理的条目数、出错次数。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {}
+        self.items = {}
+        self.errors = {}
+        self.started = time.time()
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram()
+            histogram.observe(seconds)
+
+    def count(self, stage, value=1):
+        """记录阶段处理的条目数（如解析的书籍数、写入的行数）"""
+        with self._lock:
+            self.items[stage] = self.items.get(stage, 0) + value
+
+    def error(self, stage, value=1):
+        with self._lock:
+            self.errors[stage] = self.errors.get(stage, 0) + value
+
+    @contextmanager
+    def timer(self, stage):
+        """对一段代码计时，抛出异常时同时记一次错误"""
+        start_time = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.error(stage)
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - start_time)
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.items.clear()
+            self.errors.clear()
+            self.started = time.time()
+
+    def to_dict(self):
+        """JSON友好的指标快照"""
+        stages = {}
+        with self._lock:
+            names = sorted(set(self.histograms) | set(self.items) | set(self.errors))
+            for stage in names:
+                histogram = self.histograms.get(stage)
+                entry = {'items': self.items.get(stage, 0), 'errors': self.errors.get(stage, 0)}
+                if histogram is not None:
+                    entry.update({
+                        'calls': histogram.count,
+                        'seconds_total': round(histogram.sum, 6),
+                        'seconds_mean': round(histogram.sum / histogram.count, 6) if histogram.count else 0.0,
+                        'seconds_p50': histogram.quantile(0.5),
+                        'seconds_p95': histogram.quantile(0.95),
+                        'seconds_max': round(histogram.max, 6),
+                        'buckets': dict(zip([str(bound) for bound in histogram.buckets] + ['+Inf'], histogram.counts)),
+                    })
+                stages[stage] = entry
+        return {'started': self.started, 'wall_seconds': round(time.time() - self.started, 3), 'stages': stages}
+
+    def to_prometheus(self):
+        """Prometheus 文本格式"""
+        lines = [
+            '# HELP douban_stage_seconds 各阶段单次调用的耗时',
+            '# TYPE douban_stage_seconds histogram',
+        ]
+        with self._lock:
+            for stage, histogram in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'douban_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'douban_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+                lines.append(f'douban_stage_seconds_sum{{stage="{stage}"}} {histogram.sum:.6f}')
+                lines.append(f'douban_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+            for name, values, help_text in (('douban_stage_items_total', self.items, '各阶段处理的条目数'),
+                                            ('douban_stage_errors_total', self.errors, '各阶段出错次数')):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} counter')
+                for stage, value in sorted(values.items()):
+                    lines.append(f'{name}{{stage="{stage}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, path):
+        """导出指标文件：.prom / .txt 为 Prometheus 文本格式，其余为JSON"""
+        if path.endswith(('.prom', '.txt')):
+            content = self.to_prometheus()
+        else:
+            content = json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def print_summary(self):
+        """打印各阶段的耗时汇总"""
+        snapshot = self.to_dict()['stages']
+        if not snapshot:
+            return
+        print(f"\n=== 阶段耗时 ===")
+        print(f"  {'阶段':<16}{'次数':>8}{'条目':>8}{'错误':>6}{'总耗时':>10}{'平均':>10}{'P95':>8}")
+        for stage, entry in snapshot.items():
+            calls = entry.get('calls', 0)
+            print(f"  {stage:<16}{calls:>8}{entry['items']:>8}{entry['errors']:>6}"
+                  f"{entry.get('seconds_total', 0):>9.2f}s{entry.get('seconds_mean', 0) * 1000:>8.1f}ms"
+                  f"{entry.get('seconds_p95', 0):>7.2f}s")
+
+
+# 进程内共享的指标
+METRICS = Metrics()
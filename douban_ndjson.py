@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+带偏移索引的 JSON Lines 文件 - 每行一本书，旁边的 .idx 文件按顺序保存每行起始的字节偏移量
+（本机字节序的 uint64 数组，最后一项为文件长度），
+读取时内存映射数据文件，可以直接跳到任意行区间，只解析需要的记录
+"""
+
+import json
+import mmap
+import os
+from array import array
+
+INDEX_SUFFIX = '.idx'
+
+
+def index_path(path):
+    """数据文件对应的索引文件路径"""
+    return path + INDEX_SUFFIX
+
+
+def index_is_current(path):
+    """偏移索引存在且与数据文件长度一致（NDJSON已完整写出并关闭）"""
+    try:
+        size = os.path.getsize(path)
+        with open(index_path(path), 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() < 8 or f.tell() % 8:
+                return False
+            f.seek(-8, os.SEEK_END)
+            last = array('Q')
+            last.frombytes(f.read(8))
+    except OSError:
+        return False
+    return last[0] == size
+
+
+class NdjsonWriter:
+    """
+    逐批写出 JSON Lines，并在关闭时写出偏移索引
+
+    Args:
+        path: 数据文件路径
+        write_index: 是否写出 .idx 索引
+    """
+
+    def __init__(self, path, write_index=True):
+        self.path = path
+        self.write_index = write_index
+        # 上次写出的索引在本次关闭前已不再有效，先删除，读取方据索引判断文件是否写完
+        if os.path.exists(index_path(path)):
+            os.remove(index_path(path))
+        self._file = open(path, 'wb')
+        self._offsets = array('Q')
+        self._position = 0
+
+    def write_many(self, records):
+        lines = []
+        for record in records:
+            line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+            self._offsets.append(self._position)
+            self._position += len(line)
+            lines.append(line)
+        self._file.write(b''.join(lines))
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+        if self.write_index:
+            offsets = array('Q', self._offsets)
+            offsets.append(self._position)
+            temp_path = index_path(self.path) + '.tmp'
+            with open(temp_path, 'wb') as f:
+                offsets.tofile(f)
+            os.replace(temp_path, index_path(self.path))
+
+
+def build_index(path):
+    """扫描数据文件的换行符重建偏移索引，返回偏移数组"""
+    offsets = array('Q')
+    position = 0
+    with open(path, 'rb') as f:
+        for line in f:
+            if line.strip():
+                offsets.append(position)
+            position += len(line)
+    offsets.append(position)
+    return offsets
+
+
+class NdjsonReader:
+    """
+    按行号随机读取 JSON Lines 文件
+
+    索引缺失或与数据文件长度不一致时，扫描一遍数据文件重建索引（并尝试写回）。
+
+    Args:
+        path: 数据文件路径
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self._offsets = self._load_index(size)
+
+    def _load_index(self, size):
+        offsets = array('Q')
+        try:
+            with open(index_path(self.path), 'rb') as f:
+                offsets.frombytes(f.read())
+        except (OSError, ValueError):
+            offsets = array('Q')
+        if offsets and offsets[-1] == size:
+            return offsets
+
+        offsets = build_index(self.path)
+        try:
+            with open(index_path(self.path), 'wb') as f:
+                offsets.tofile(f)
+        except OSError:
+            pass
+        return offsets
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        """读取第 index 行（从0开始）"""
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return json.loads(self._mmap[self._offsets[index]:self._offsets[index + 1]])
+
+    def read(self, start=0, stop=None):
+        """读取第 start 到 stop-1 行（从0开始），只解析这一段"""
+        return list(self.iter_range(start, stop))
+
+    def iter_range(self, start=0, stop=None):
+        """逐行读取第 start 到 stop-1 行"""
+        count = len(self)
+        stop = count if stop is None else min(stop, count)
+        for index in range(max(0, start), stop):
+            yield json.loads(self._mmap[self._offsets[index]:self._offsets[index + 1]])
+
+    def __iter__(self):
+        return self.iter_range()
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
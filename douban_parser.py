@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+豆瓣书单页面解析器 - 可插拔的解析后端
+
+支持三种后端：
+- html.parser: 原始实现，BeautifulSoup 解析整个页面
+- strainer: BeautifulSoup + SoupStrainer，只构建书籍条目和分页器子树
+- lxml: lxml + 预编译XPath，直接解析原始字节
+
+三种后端返回逐字段相同的书籍字典。
+"""
+
+import math
+import re
+from collections import namedtuple
+
+# 预编译的作者、出版社正则（供各爬虫的 parse_single_book 共用）
+AUTHOR_PATTERN = re.compile(r'作者[:：]\s*(.+?)(?=出版社|出版年|$)')
+PUBLISHER_PATTERN = re.compile(r'出版社[:：]\s*(.+?)(?=出版年|$)')
+START_PATTERN = re.compile(r'start=(\d+)')
+COUNT_PATTERN = re.compile(r'共\s*(\d+)')
+
+# 豆瓣书单每页固定25本
+PAGE_SIZE = 25
+
+# 默认爬取的书单
+DEFAULT_DOULIST_URL = "https://www.douban.com/doulist/45298673/?start=0&sort=seq&playable=0&sub_type="
+
+PARSER_BACKENDS = ('html.parser', 'strainer', 'lxml')
+
+# 一页的解析结果：books 为全部条目（含无书名的条目），
+# total_pages 为分页器给出的总页数（无法判断时为None），has_next 表示是否有下一页
+DoulistPage = namedtuple('DoulistPage', ['books', 'total_pages', 'has_next'])
+
+
+def empty_book():
+    """返回字段齐全的空书籍字典"""
+    return {
+        '书名': '',
+        '作者': '',
+        '出版社': '',
+        '评分': '',
+        '封面链接': '',
+        '书籍链接': ''
+    }
+
+
+def extract_author_publisher(abstract_text):
+    """从简介文本中提取作者和出版社"""
+    author = ''
+    publisher = ''
+    author_match = AUTHOR_PATTERN.search(abstract_text)
+    if author_match:
+        author = author_match.group(1).strip()
+    publisher_match = PUBLISHER_PATTERN.search(abstract_text)
+    if publisher_match:
+        publisher = publisher_match.group(1).strip()
+    return author, publisher
+
+
+def compute_total_pages(total_page_attr, page_hrefs, count_text, has_next):
+    """
+    根据分页信息计算总页数
+
+    Args:
+        total_page_attr: 分页器 span.thispage 的 data-total-page 属性
+        page_hrefs: 分页器中全部链接的 href
+        count_text: span.count 的文本（如“共492本”）
+        has_next: 是否存在下一页链接
+
+    Returns:
+        int: 总页数；无法判断时返回None
+    """
+    # 分页器上直接标注了总页数
+    if total_page_attr and str(total_page_attr).isdigit():
+        return int(total_page_attr)
+
+    # 否则取分页链接中最大的 start 偏移量
+    starts = [int(match.group(1)) for match in map(START_PATTERN.search, page_hrefs) if match]
+    if starts:
+        return max(starts) // PAGE_SIZE + 1
+
+    # 退而求其次，使用“共N本”之类的总数
+    if count_text:
+        count_match = COUNT_PATTERN.search(count_text)
+        if count_match:
+            return max(1, math.ceil(int(count_match.group(1)) / PAGE_SIZE))
+
+    # 没有分页器也没有下一页，说明只有一页
+    if not has_next:
+        return 1
+    return None
+
+
+def soup_page_info(soup):
+    """从BeautifulSoup对象中读取 (总页数, 是否有下一页)"""
+    next_page = soup.find('span', class_='next')
+    has_next = bool(next_page and next_page.find('a'))
+
+    total_page_attr = None
+    page_hrefs = []
+    paginator = soup.find('div', class_='paginator')
+    if paginator:
+        this_page = paginator.find('span', class_='thispage')
+        if this_page:
+            total_page_attr = this_page.get('data-total-page')
+        page_hrefs = [link['href'] for link in paginator.find_all('a', href=True)]
+
+    count_span = soup.find('span', class_='count')
+    count_text = count_span.get_text() if count_span else ''
+
+    return compute_total_pages(total_page_attr, page_hrefs, count_text, has_next), has_next
+
+
+def _parse_with_soup(content, parse_item, parse_only=None):
+    from bs4 import BeautifulSoup
+
+    from_encoding = 'utf-8' if isinstance(content, bytes) else None
+    soup = BeautifulSoup(content, 'html.parser', from_encoding=from_encoding, parse_only=parse_only)
+    books = [parse_item(item) for item in soup.find_all('div', class_='doulist-item')]
+    total_pages, has_next = soup_page_info(soup)
+    return DoulistPage(books, total_pages, has_next)
+
+
+def _page_strainer():
+    from bs4 import SoupStrainer
+
+    # 只保留书籍条目、分页器（含 span.next）和总数
+    return SoupStrainer(['div', 'span'], class_=['doulist-item', 'paginator', 'count'])
+
+
+# ---- lxml 后端 ----
+
+def _class_xpath(tag, class_name, first=False, scope='.//'):
+    path = f"{scope}{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')]"
+    return f"({path})[1]" if first else path
+
+
+_lxml_xpaths = None
+
+
+def _get_lxml_xpaths():
+    """延迟编译XPath，避免未安装lxml时导入本模块失败"""
+    global _lxml_xpaths
+    if _lxml_xpaths is None:
+        from lxml import etree
+
+        _lxml_xpaths = {
+            'items': etree.XPath(_class_xpath('div', 'doulist-item', scope='//')),
+            'title': etree.XPath(_class_xpath('div', 'title', first=True)),
+            'post': etree.XPath(_class_xpath('div', 'post', first=True)),
+            'rating': etree.XPath(_class_xpath('div', 'rating', first=True)),
+            'rating_nums': etree.XPath(_class_xpath('span', 'rating_nums', first=True)),
+            'abstract': etree.XPath(_class_xpath('div', 'abstract', first=True)),
+            'first_link': etree.XPath('(.//a)[1]'),
+            'first_img': etree.XPath('(.//img)[1]'),
+            'texts': etree.XPath('.//text()'),
+            'next': etree.XPath(_class_xpath('span', 'next', first=True, scope='//')),
+            'paginator': etree.XPath(_class_xpath('div', 'paginator', first=True, scope='//')),
+            'this_page': etree.XPath(_class_xpath('span', 'thispage', first=True)),
+            'hrefs': etree.XPath('.//a/@href'),
+            'count': etree.XPath(_class_xpath('span', 'count', first=True, scope='//')),
+        }
+    return _lxml_xpaths
+
+
+def _lxml_text(xpaths, element):
+    # 与 BeautifulSoup 的 get_text(strip=True) 一致：逐段去空白后拼接
+    return ''.join(text.strip() for text in xpaths['texts'](element))
+
+
+def _first(nodes):
+    return nodes[0] if nodes else None
+
+
+def parse_item_lxml(item, xpaths=None):
+    """解析单个书籍条目（lxml元素），结果与 parse_single_book 一致"""
+    xpaths = xpaths or _get_lxml_xpaths()
+    book_info = empty_book()
+
+    try:
+        # 获取书名和链接
+        title_div = _first(xpaths['title'](item))
+        if title_div is not None:
+            title_link = _first(xpaths['first_link'](title_div))
+            if title_link is not None:
+                book_info['书名'] = _lxml_text(xpaths, title_link)
+                book_info['书籍链接'] = title_link.get('href', '')
+
+        # 获取封面
+        post_div = _first(xpaths['post'](item))
+        if post_div is not None:
+            img = _first(xpaths['first_img'](post_div))
+            if img is not None:
+                book_info['封面链接'] = img.get('src', '')
+
+        # 获取评分
+        rating_div = _first(xpaths['rating'](item))
+        if rating_div is not None:
+            rating_span = _first(xpaths['rating_nums'](rating_div))
+            if rating_span is not None:
+                book_info['评分'] = _lxml_text(xpaths, rating_span)
+
+        # 获取作者和出版社
+        abstract_div = _first(xpaths['abstract'](item))
+        if abstract_div is not None:
+            book_info['作者'], book_info['出版社'] = extract_author_publisher(_lxml_text(xpaths, abstract_div))
+
+    except Exception as e:
+        print(f"解析书籍信息时出错: {e}")
+
+    return book_info
+
+
+def _parse_with_lxml(content):
+    from lxml import html as lxml_html
+
+    xpaths = _get_lxml_xpaths()
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    parser = lxml_html.HTMLParser(encoding='utf-8')
+    tree = lxml_html.document_fromstring(content, parser=parser)
+
+    books = [parse_item_lxml(item, xpaths) for item in xpaths['items'](tree)]
+
+    next_span = _first(xpaths['next'](tree))
+    has_next = next_span is not None and bool(xpaths['first_link'](next_span))
+
+    total_page_attr = None
+    page_hrefs = []
+    paginator = _first(xpaths['paginator'](tree))
+    if paginator is not None:
+        this_page = _first(xpaths['this_page'](paginator))
+        if this_page is not None:
+            total_page_attr = this_page.get('data-total-page')
+        page_hrefs = xpaths['hrefs'](paginator)
+
+    count_span = _first(xpaths['count'](tree))
+    count_text = ''.join(xpaths['texts'](count_span)) if count_span is not None else ''
+
+    total_pages = compute_total_pages(total_page_attr, page_hrefs, count_text, has_next)
+    return DoulistPage(books, total_pages, has_next)
+
+
+def parse_doulist_page(content, backend='html.parser', parse_item=None):
+    """
+    解析一页豆瓣书单
+
+    Args:
+        content: 页面原始字节（utf-8）
+        backend: 解析后端，取值见 PARSER_BACKENDS
+        parse_item: BeautifulSoup 后端使用的单条目解析函数（如 parse_single_book）
+
+    Returns:
+        DoulistPage: 书籍列表、总页数和是否有下一页
+    """
+    if backend == 'lxml':
+        return _parse_with_lxml(content)
+    if parse_item is None:
+        raise ValueError(f"解析后端 {backend} 需要提供 parse_item")
+    if backend == 'strainer':
+        return _parse_with_soup(content, parse_item, _page_strainer())
+    if backend == 'html.parser':
+        return _parse_with_soup(content, parse_item)
+    raise ValueError(f"未知的解析后端: {backend}，可选: {', '.join(PARSER_BACKENDS)}")
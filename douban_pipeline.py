@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流水线爬取 - 抓取与解析分为两个阶段并行运行：
+- 抓取线程只负责网络I/O，把页面原始字节放入有界队列
+- 解析在进程池中进行（parse_single_book 不受GIL限制，可以用满多个CPU核）
+- 解析结果交给调用方的输出阶段
+
+背压：原始页面队列满时抓取线程阻塞；进程池中解析中与已解析未取走的页面数有上限，
+超过时不再从队列中取页面，因此内存占用与爬取规模无关。
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from douban_metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+def parse_page_content(content, backend):
+    """
+    在解析进程中解析一页（只保留有书名的条目）
+
+    Returns:
+        tuple: (DoulistPage, 解析耗时秒数)
+    """
+    from enhanced_douban_spider import parse_single_book
+    from douban_parser import parse_doulist_page
+
+    start_time = time.perf_counter()
+    page = parse_doulist_page(content, backend, parse_single_book)
+    page = page._replace(books=[book for book in page.books if book['书名']])
+    return page, time.perf_counter() - start_time
+
+
+class CrawlPipeline:
+    """
+    抓取 → 有界队列 → 解析进程池 → 输出 的流水线
+
+    用法:
+        with CrawlPipeline(fetch, backend, fetch_workers=8, parse_workers=4) as pipeline:
+            pipeline.submit(key, url)
+            for key, page, error in pipeline.results():
+                ...  # 可以在这里继续 submit 新的页面
+
+    Args:
+        fetch: 函数 url -> 原始字节（在抓取线程中调用，负责限速和缓存）
+        backend: 页面解析后端
+        fetch_workers: 抓取线程数
+        parse_workers: 解析进程数，默认为CPU核数
+        max_raw_pages: 等待解析的原始页面队列上限
+        max_parsing: 解析中和已解析未取走的页面数上限，默认为解析进程数的2倍
+    """
+
+    def __init__(self, fetch, backend='html.parser', fetch_workers=4, parse_workers=None, max_raw_pages=None,
+                 max_parsing=None):
+        self.fetch = fetch
+        self.backend = backend
+        parse_workers = parse_workers or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(max_workers=parse_workers)
+        self._jobs = queue.Queue()
+        self._raw_pages = queue.Queue(maxsize=max_raw_pages or parse_workers * 2)
+        self._results = queue.Queue()
+        self._parse_slots = threading.Semaphore(max_parsing or parse_workers * 2)
+        self._outstanding = 0
+        self._lock = threading.Lock()
+        self._fetchers = [threading.Thread(target=self._fetch_loop, daemon=True) for _ in range(fetch_workers)]
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, daemon=True)
+        for thread in self._fetchers + [self._dispatcher]:
+            thread.start()
+
+    def submit(self, key, url):
+        """加入一个待抓取的页面，key 原样出现在结果中"""
+        with self._lock:
+            self._outstanding += 1
+        self._jobs.put((key, url))
+
+    def _fetch_loop(self):
+        while True:
+            job = self._jobs.get()
+            if job is _STOP:
+                break
+            key, url = job
+            try:
+                content = self.fetch(url)
+            except Exception as e:
+                self._results.put((key, None, e, None))
+                continue
+            # 队列满时阻塞，抓取速度不会超过解析速度
+            self._raw_pages.put((key, content))
+
+    def _dispatch_loop(self):
+        while True:
+            item = self._raw_pages.get()
+            if item is _STOP:
+                break
+            key, content = item
+            # 解析中和未取走的结果达到上限时等待输出阶段取走结果
+            self._parse_slots.acquire()
+            future = self._executor.submit(parse_page_content, content, self.backend)
+            future.add_done_callback(lambda done, key=key: self._results.put((key, done, None, True)))
+
+    def results(self):
+        """
+        按完成顺序逐个返回结果，直到已提交的页面全部处理完
+
+        Yields:
+            tuple: (key, DoulistPage, None) 或出错时 (key, None, 异常)
+        """
+        while True:
+            with self._lock:
+                if self._outstanding == 0:
+                    return
+            key, future, error, holds_slot = self._results.get()
+            with self._lock:
+                self._outstanding -= 1
+            if holds_slot:
+                self._parse_slots.release()
+                try:
+                    page, seconds = future.result()
+                except Exception as e:
+                    METRICS.error('parse')
+                    yield key, None, e
+                    continue
+                METRICS.observe('parse', seconds)
+                METRICS.count('parse', len(page.books))
+                for book in page.books:
+                    logger.debug(f"  ✓ {book['书名']} - {book['评分']}")
+                yield key, page, None
+            else:
+                yield key, None, error
+
+    def close(self):
+        """停止流水线；提前结束时丢弃未抓取的页面，并放开解析上限让已抓取的页面排空"""
+        with self._lock:
+            unfinished = self._outstanding > 0
+        if unfinished:
+            while True:
+                try:
+                    self._jobs.get_nowait()
+                except queue.Empty:
+                    break
+            self._parse_slots.release(self._raw_pages.maxsize + len(self._fetchers) + 1)
+        for _ in self._fetchers:
+            self._jobs.put(_STOP)
+        for thread in self._fetchers:
+            thread.join()
+        self._raw_pages.put(_STOP)
+        self._dispatcher.join()
+        self._executor.shutdown(cancel_futures=unfinished)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分布式爬取 - 以本地SQLite文件作为持久化工作队列，多个工作进程（可以在不同机器上，共享同一个文件）
+各自领取任务：书单页面和封面下载都是任务，领取时加租约，进程崩溃后租约过期的任务会被重新领取；
+页面解析结果保存在队列中，最后由合并步骤按页序汇总为与单进程爬取相同的输出
+
+用法:
+    python douban_queue.py init --url https://www.douban.com/doulist/45298673/ --max-pages 20 --covers
+    python douban_queue.py work --processes 4 --rate 1
+    python douban_queue.py status
+    python douban_queue.py merge
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import time
+from contextlib import contextmanager
+
+from douban_covers import DEFAULT_COVERS_DIR, CoverStore, cover_key, image_dimensions
+from douban_http import IMAGE_ACCEPT, create_session
+from douban_metrics import LOG_FORMATS, LOG_LEVELS, METRICS, setup_logging
+from douban_parser import PAGE_SIZE, PARSER_BACKENDS
+from douban_rate_limit import TokenBucket
+
+DEFAULT_QUEUE_FILE = 'douban_queue.db'
+DEFAULT_LEASE_SECONDS = 120
+DEFAULT_MAX_ATTEMPTS = 3
+
+PENDING, LEASED, DONE, FAILED = 'pending', 'leased', 'done', 'failed'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    UNIQUE (kind, payload)
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, lease_expires);
+CREATE TABLE IF NOT EXISTS lists (
+    position INTEGER PRIMARY KEY AUTOINCREMENT,
+    doulist_url TEXT NOT NULL UNIQUE
+);
+"""
+
+
+class WorkQueue:
+    """
+    SQLite持久化工作队列（每个进程各自打开一个实例）
+
+    任务以 (类型, 负载JSON) 唯一，重复入队被忽略，因此任务可以安全地重做：
+    工作进程在完成前崩溃时，它派生的后续任务可能已入队，重做时不会重复。
+    不使用WAL日志，便于把队列文件放在多台机器共享的目录中。
+
+    Args:
+        path: 队列文件
+        max_attempts: 每个任务最多尝试的次数，超过后标记为失败
+    """
+
+    def __init__(self, path=DEFAULT_QUEUE_FILE, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    @contextmanager
+    def _transaction(self):
+        """显式事务（连接为自动提交模式）：整批写入一次提交，中途出错全部回滚"""
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self._conn
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    @staticmethod
+    def _encode(payload):
+        return json.dumps(payload, ensure_ascii=False, sort_keys=True)
+
+    def add_lists(self, doulist_urls):
+        """记录书单（合并时按加入的顺序输出）"""
+        with self._transaction():
+            self._conn.executemany("INSERT OR IGNORE INTO lists (doulist_url) VALUES (?)",
+                                   [(url,) for url in doulist_urls])
+
+    def lists(self):
+        """已记录的书单URL，按加入的顺序"""
+        return [url for (url,) in self._conn.execute("SELECT doulist_url FROM lists ORDER BY position")]
+
+    def enqueue(self, kind, payloads):
+        """批量入队，返回新加入的任务数"""
+        now = time.time()
+        rows = [(kind, self._encode(payload), now, now) for payload in payloads]
+        with self._transaction():
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO tasks (kind, payload, created, updated) VALUES (?, ?, ?, ?)", rows)
+            return self._conn.total_changes - before
+
+    def claim(self, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """
+        领取一个待处理任务，或租约已过期的任务（原工作进程可能已崩溃）
+
+        Returns:
+            tuple: (任务ID, 类型, 负载)，没有可领取的任务时返回None
+        """
+        now = time.time()
+        with self._transaction():
+            # 多次领取后仍未完成（工作进程反复崩溃）的任务不再重试
+            self._conn.execute(
+                "UPDATE tasks SET status = ?, error = ?, lease_owner = NULL, updated = ?"
+                " WHERE status = ? AND lease_expires < ? AND attempts >= ?",
+                (FAILED, '租约多次过期', now, LEASED, now, self.max_attempts))
+            row = self._conn.execute(
+                "SELECT id, kind, payload FROM tasks"
+                " WHERE status = ? OR (status = ? AND lease_expires < ?)"
+                " ORDER BY id LIMIT 1", (PENDING, LEASED, now)).fetchone()
+            if row is not None:
+                self._conn.execute(
+                    "UPDATE tasks SET status = ?, lease_owner = ?, lease_expires = ?, attempts = attempts + 1,"
+                    " updated = ? WHERE id = ?", (LEASED, worker_id, now + lease_seconds, now, row[0]))
+        if row is None:
+            return None
+        return row[0], row[1], json.loads(row[2])
+
+    def complete(self, task_id, worker_id, result):
+        """
+        提交任务结果；租约已被其他进程接管时放弃本次结果
+
+        Returns:
+            bool: 是否提交成功
+        """
+        with self._transaction():
+            cursor = self._conn.execute(
+                "UPDATE tasks SET status = ?, result = ?, error = NULL, lease_owner = NULL, updated = ?"
+                " WHERE id = ? AND status = ? AND lease_owner = ?",
+                (DONE, json.dumps(result, ensure_ascii=False), time.time(), task_id, LEASED, worker_id))
+        return cursor.rowcount == 1
+
+    def fail(self, task_id, worker_id, error):
+        """记录失败：未超过最大尝试次数时放回队列，否则标记为失败"""
+        with self._transaction():
+            self._conn.execute(
+                "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END,"
+                " error = ?, lease_owner = NULL, lease_expires = NULL, updated = ?"
+                " WHERE id = ? AND status = ? AND lease_owner = ?",
+                (self.max_attempts, FAILED, PENDING, str(error), time.time(), task_id, LEASED, worker_id))
+
+    def has_active(self):
+        """是否还有未完成的任务（待处理或租约中）"""
+        row = self._conn.execute("SELECT 1 FROM tasks WHERE status IN (?, ?) LIMIT 1", (PENDING, LEASED)).fetchone()
+        return row is not None
+
+    def counts(self):
+        """各类型、各状态的任务数：{类型: {状态: 数量}}"""
+        counts = {}
+        for kind, status, count in self._conn.execute(
+                "SELECT kind, status, COUNT(*) FROM tasks GROUP BY kind, status"):
+            counts.setdefault(kind, {})[status] = count
+        return counts
+
+    def results(self, kind):
+        """已完成任务的 (负载, 结果) 列表，按入队顺序"""
+        return [(json.loads(payload), json.loads(result)) for payload, result in self._conn.execute(
+            "SELECT payload, result FROM tasks WHERE kind = ? AND status = ? ORDER BY id", (kind, DONE))]
+
+    def failures(self, kind):
+        """最终失败任务的 (负载, 错误) 列表"""
+        return [(json.loads(payload), error) for payload, error in self._conn.execute(
+            "SELECT payload, error FROM tasks WHERE kind = ? AND status = ? ORDER BY id", (kind, FAILED))]
+
+
+def page_task(doulist_url, start, max_pages, covers, follow=False):
+    """书单页面任务的负载；follow 表示无法判断总页数，逐页顺序发现下一页"""
+    return {'doulist_url': doulist_url, 'start': start, 'max_pages': max_pages, 'covers': covers, 'follow': follow}
+
+
+def run_page_task(queue, payload, session, bucket, backend):
+    """抓取并解析一页（条目解析与单进程爬取共用 parse_single_book），派生后续页面和封面任务"""
+    from enhanced_douban_spider import build_page_url, fetch_page, parse_page, plan_page_offsets
+
+    doulist_url, start, max_pages = payload['doulist_url'], payload['start'], payload['max_pages']
+    content = fetch_page(session, build_page_url(doulist_url, start), bucket)
+    page = parse_page(content, backend)
+
+    follow_ups = []
+    if start == 0:
+        offsets = plan_page_offsets(page.total_pages, max_pages)
+        if offsets is not None:
+            follow_ups = [page_task(doulist_url, offset, max_pages, payload['covers']) for offset in offsets[1:]]
+        elif page.has_next and max_pages > 1:
+            follow_ups = [page_task(doulist_url, PAGE_SIZE, max_pages, payload['covers'], follow=True)]
+    elif payload['follow'] and page.has_next and start // PAGE_SIZE + 1 < max_pages:
+        follow_ups = [page_task(doulist_url, start + PAGE_SIZE, max_pages, payload['covers'], follow=True)]
+    if follow_ups:
+        queue.enqueue('page', follow_ups)
+
+    if payload['covers']:
+        cover_urls = dict.fromkeys(book['封面链接'] for book in page.books if book['封面链接'])
+        if cover_urls:
+            queue.enqueue('cover', [{'cover_url': url} for url in cover_urls])
+    return {'books': page.books}
+
+
+def run_cover_task(payload, session, bucket, covers_dir):
+    """下载一张封面，按封面键写入封面目录（原子替换）；manifest 由合并步骤统一写出"""
+    from douban_cache import COVER_TTL, fetch_bytes
+
+    cover_url = payload['cover_url']
+    if bucket is not None:
+        bucket.acquire()
+    with METRICS.timer('cover_download'):
+        content = fetch_bytes(session, cover_url, ttl=COVER_TTL, headers={'Accept': IMAGE_ACCEPT})
+    METRICS.count('cover_download')
+
+    key = cover_key(cover_url)
+    path = CoverStore(covers_dir).path_for(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(content)
+    os.replace(temp_path, path)
+    width, height = image_dimensions(content)
+    return {'key': key, 'size': len(content), 'width': width, 'height': height}
+
+
+def run_worker(queue_file=DEFAULT_QUEUE_FILE, worker_id=None, rate=1.0, backend='html.parser',
+               covers_dir=DEFAULT_COVERS_DIR, lease_seconds=DEFAULT_LEASE_SECONDS, poll_interval=1.0):
+    """
+    工作进程主循环：领取任务直到队列中没有待处理和租约中的任务
+
+    其他进程持有租约时，它们可能还会派生新任务，因此等待而不是立即退出。
+
+    Args:
+        queue_file: 队列文件
+        worker_id: 工作进程标识，默认为 主机名-进程号
+        rate: 本进程每秒允许的请求数
+        backend: 页面解析后端
+
+    Returns:
+        dict: {'done': 完成数, 'failed': 失败数}
+    """
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    session = create_session()
+    bucket = TokenBucket(rate)
+    stats = {'done': 0, 'failed': 0}
+    with WorkQueue(queue_file) as queue:
+        while True:
+            task = queue.claim(worker_id, lease_seconds)
+            if task is None:
+                if not queue.has_active():
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            task_id, kind, payload = task
+            try:
+                if kind == 'page':
+                    result = run_page_task(queue, payload, session, bucket, backend)
+                elif kind == 'cover':
+                    result = run_cover_task(payload, session, bucket, covers_dir)
+                else:
+                    raise ValueError(f"未知的任务类型: {kind}")
+            except Exception as e:
+                queue.fail(task_id, worker_id, e)
+                stats['failed'] += 1
+                print(f"[{worker_id}] {kind} 任务 {task_id} 失败: {e}")
+                continue
+            if queue.complete(task_id, worker_id, result):
+                stats['done'] += 1
+    session.close()
+    print(f"[{worker_id}] 完成 {stats['done']} 个任务，失败 {stats['failed']} 次")
+    return stats
+
+
+def run_workers(processes, **kwargs):
+    """在本机启动多个工作进程并等待它们结束"""
+    if processes <= 1:
+        run_worker(**kwargs)
+        return
+    workers = [multiprocessing.Process(target=run_worker, kwargs=kwargs) for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def init_queue(queue_file, doulist_urls, max_pages=20, covers=False):
+    """为每个书单加入第一页任务，返回新加入的任务数"""
+    with WorkQueue(queue_file) as queue:
+        queue.add_lists(doulist_urls)
+        return queue.enqueue('page', [page_task(url, 0, max_pages, covers) for url in doulist_urls])
+
+
+def collect_books(queue):
+    """
+    按书单顺序、页序汇总页面任务的结果
+
+    Returns:
+        dict: 书单URL → 书籍列表
+    """
+    pages = {url: {} for url in queue.lists()}
+    for payload, result in queue.results('page'):
+        pages.setdefault(payload['doulist_url'], {})[payload['start']] = result['books']
+    return {url: [book for start in sorted(starts) for book in starts[start]] for url, starts in pages.items()}
+
+
+def merge_results(queue_file=DEFAULT_QUEUE_FILE, csv_file='douban_books_all.csv', json_file='douban_books_all.json',
+                  covers_dir=DEFAULT_COVERS_DIR):
+    """
+    把队列中的结果合并为最终输出：书籍保存为CSV/JSON/NDJSON（多个书单时按书籍链接去重），
+    已下载的封面写入封面目录的 manifest
+
+    Returns:
+        list: 合并后的书籍
+    """
+    from douban_batch import merge_catalog
+    from enhanced_douban_spider import save_data
+
+    with WorkQueue(queue_file) as queue:
+        books_by_list = collect_books(queue)
+        covers = queue.results('cover')
+        failed_pages = queue.failures('page')
+        failed_covers = queue.failures('cover')
+
+    if len(books_by_list) == 1:
+        books_data = next(iter(books_by_list.values()))
+    else:
+        books_data, _ = merge_catalog(books_by_list)
+    for payload, error in failed_pages:
+        print(f"  失败的页面: {payload['doulist_url']} start={payload['start']} ({error})")
+    print(f"合并完成：{len(books_by_list)} 个书单，{len(books_data)} 本书籍")
+    save_data(books_data, csv_file, json_file)
+
+    if covers:
+        store = CoverStore(covers_dir)
+        for payload, result in covers:
+            store.covers[result['key']] = {'cover_url': payload['cover_url'], 'size': result['size'],
+                                           'width': result['width'], 'height': result['height']}
+        for book in books_data:
+            key = cover_key(book['封面链接']) if book['封面链接'] else None
+            if key in store.covers:
+                store.books[book['书籍链接']] = key
+        store.save()
+        print(f"封面 {len(covers)} 张已记录到 {store.manifest_path}，失败 {len(failed_covers)} 张")
+    return books_data
+
+
+def print_status(queue_file=DEFAULT_QUEUE_FILE):
+    """打印队列中各类任务的状态"""
+    with WorkQueue(queue_file) as queue:
+        counts = queue.counts()
+    if not counts:
+        print("队列为空")
+        return
+    for kind, statuses in sorted(counts.items()):
+        summary = '，'.join(f"{status} {statuses.get(status, 0)}" for status in (PENDING, LEASED, DONE, FAILED))
+        print(f"  {kind}: {summary}")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='豆瓣书单分布式爬取（SQLite工作队列）')
+    parser.add_argument('--queue', default=DEFAULT_QUEUE_FILE, help='队列文件（多台机器时放在共享目录）')
+    parser.add_argument('--covers-dir', default=DEFAULT_COVERS_DIR, help='封面存储目录')
+    parser.add_argument('--log-level', choices=LOG_LEVELS, default='INFO', help='日志级别，DEBUG 时输出每本书')
+    parser.add_argument('--log-format', choices=LOG_FORMATS, default='text',
+                        help='日志格式：text 为带时间、级别和来源的文本，kv 为 key=value 行，json 为JSON行')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    init_parser = subparsers.add_parser('init', help='加入书单的第一页任务')
+    init_parser.add_argument('--url', action='append', required=True, help='书单URL，可重复指定')
+    init_parser.add_argument('--max-pages', type=int, default=20, help='每个书单最多爬取的页数')
+    init_parser.add_argument('--covers', action='store_true', help='同时下载封面')
+
+    work_parser = subparsers.add_parser('work', help='启动工作进程，处理到队列为空')
+    work_parser.add_argument('--processes', type=int, default=1, help='本机启动的工作进程数')
+    work_parser.add_argument('--rate', type=float, default=1.0, help='每个工作进程每秒允许的请求数')
+    work_parser.add_argument('--parser', choices=PARSER_BACKENDS, default='html.parser', help='页面解析后端')
+    work_parser.add_argument('--lease', type=float, default=DEFAULT_LEASE_SECONDS,
+                             help='任务租约（秒），超时未完成的任务会被其他进程重新领取')
+
+    subparsers.add_parser('status', help='查看任务状态')
+
+    merge_parser = subparsers.add_parser('merge', help='合并结果并保存')
+    merge_parser.add_argument('--csv', default='douban_books_all.csv', help='CSV输出文件')
+    merge_parser.add_argument('--json', default='douban_books_all.json', help='JSON输出文件')
+    args = parser.parse_args()
+    setup_logging(args.log_level, args.log_format)
+
+    if args.command == 'init':
+        added = init_queue(args.queue, args.url, args.max_pages, args.covers)
+        print(f"已加入 {added} 个任务到 {args.queue}")
+    elif args.command == 'work':
+        run_workers(args.processes, queue_file=args.queue, rate=args.rate, backend=args.parser,
+                    covers_dir=args.covers_dir, lease_seconds=args.lease)
+        print_status(args.queue)
+    elif args.command == 'status':
+        print_status(args.queue)
+    elif args.command == 'merge':
+        merge_results(args.queue, args.csv, args.json, args.covers_dir)
+
+
+if __name__ == "__main__":
+    main()
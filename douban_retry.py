@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+重试与自适应限速 - 挂载在 requests 会话下的 HTTPAdapter：
+超时、连接错误和 429/5xx 自动以带抖动的指数退避重试，429/503 优先遵守 Retry-After；
+并发上限和逐页爬取的等待间隔按延迟与错误率做加性增、乘性减（AIMD）调整
+"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+RETRY_AFTER_STATUSES = frozenset({429, 503})
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+
+
+def parse_retry_after(value, max_wait=120.0):
+    """解析 Retry-After 头（秒数或HTTP日期），返回等待秒数，无法解析时返回None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        seconds = float(value)
+    else:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(0.0, seconds), max_wait)
+
+
+def backoff_delay(attempt, base=1.0, cap=30.0):
+    """第 attempt 次重试前的等待时间：指数退避加完全抖动"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class AdaptiveThrottle:
+    """
+    AIMD 自适应限速（线程安全）
+
+    请求延迟低于 target_latency 时并发上限加性增加、等待间隔逐步缩短；
+    出错、被限流或延迟过高时并发上限减半、等待间隔加倍（每个冷却期内最多减一次）。
+
+    Args:
+        max_concurrency: 并发上限的最大值
+        min_concurrency: 并发上限的最小值
+        target_latency: 目标延迟（秒）
+        initial_delay: 逐页爬取时两次请求之间的初始等待（秒）
+        min_delay: 等待间隔的最小值
+        max_delay: 等待间隔的最大值
+    """
+
+    def __init__(self, max_concurrency=4, min_concurrency=1, target_latency=2.0,
+                 initial_delay=2.0, min_delay=0.5, max_delay=60.0):
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.target_latency = target_latency
+        self.limit = float(self.max_concurrency)
+        self.delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.in_flight = 0
+        self.successes = 0
+        self.failures = 0
+        self._resume_at = 0.0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """等待直到并发数低于当前上限且不在 Retry-After 暂停期内"""
+        with self._cond:
+            while True:
+                pause = self._resume_at - time.monotonic()
+                if pause <= 0 and self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                self._cond.wait(pause if pause > 0 else None)
+
+    def release(self, latency=None, ok=True, retry_after=None):
+        """
+        一次请求结束
+
+        Args:
+            latency: 请求耗时（秒），请求未完成时为None
+            ok: 请求是否成功
+            retry_after: 服务器要求的暂停时间（秒）
+        """
+        with self._cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if retry_after:
+                self._resume_at = max(self._resume_at, now + retry_after)
+            if ok and latency is not None and latency <= self.target_latency:
+                self.successes += 1
+                self.limit = min(self.max_concurrency, self.limit + 1.0 / self.limit)
+                self.delay = max(self.min_delay, self.delay - 0.1)
+            else:
+                if not ok:
+                    self.failures += 1
+                # 冷却期内同一波失败只减一次，避免并发上限一下子跌到底
+                if now - self._last_decrease >= max(self.target_latency, latency or 0):
+                    self._last_decrease = now
+                    self.limit = max(self.min_concurrency, self.limit / 2)
+                    self.delay = min(self.max_delay, self.delay * 2)
+            self._cond.notify_all()
+
+
+class RetryAdapter(HTTPAdapter):
+    """
+    带重试和自适应限速的 HTTPAdapter
+
+    Args:
+        throttle: AdaptiveThrottle，为None时只重试不限速
+        retries: 最多重试次数
+        backoff_base: 退避的基础时间（秒）
+        backoff_cap: 单次退避的最长时间（秒）
+        其余参数传给 HTTPAdapter（如 pool_connections / pool_maxsize）
+    """
+
+    def __init__(self, throttle=None, retries=3, backoff_base=1.0, backoff_cap=30.0, **kwargs):
+        self.throttle = throttle
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        retries = self.retries if request.method in IDEMPOTENT_METHODS else 0
+        attempt = 0
+        while True:
+            if self.throttle is not None:
+                self.throttle.acquire()
+            started = time.monotonic()
+            response = error = retry_after = None
+            outcome = {'ok': False}
+            try:
+                response = super().send(request, **kwargs)
+                if response.status_code in RETRY_AFTER_STATUSES:
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'), self.backoff_cap * 4)
+                outcome = {'latency': time.monotonic() - started, 'ok': response.status_code not in RETRY_STATUSES,
+                           'retry_after': retry_after}
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            finally:
+                # 其他异常（InvalidURL、KeyboardInterrupt 等）直接抛出，但同样要归还并发名额
+                if self.throttle is not None:
+                    self.throttle.release(**outcome)
+
+            if error is not None:
+                if attempt >= retries:
+                    raise error
+                wait = backoff_delay(attempt, self.backoff_base, self.backoff_cap)
+                print(f"请求 {request.url} 出错: {error}，{wait:.1f} 秒后重试（第 {attempt + 1} 次）")
+            else:
+                if outcome['ok'] or attempt >= retries:
+                    return response
+                response.close()
+                wait = retry_after if retry_after is not None else backoff_delay(attempt, self.backoff_base,
+                                                                                 self.backoff_cap)
+                print(f"请求 {request.url} 返回 {response.status_code}，{wait:.1f} 秒后重试（第 {attempt + 1} 次）")
+            time.sleep(wait)
+            attempt += 1
+
+
+def mount_retry_adapter(session, pool_size=10, retries=3, throttle=None):
+    """
+    为会话挂载 RetryAdapter，并把限速器保存为 session.throttle
+
+    Args:
+        session: requests.Session
+        pool_size: 连接池大小，也是默认的最大并发上限
+        retries: 最多重试次数
+        throttle: AdaptiveThrottle，为None时新建一个
+    """
+    throttle = throttle or AdaptiveThrottle(max_concurrency=pool_size)
+    adapter = RetryAdapter(throttle, retries, pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.throttle = throttle
+    return session
@@ -0,0 +1,510 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+书籍搜索索引 - 在内存中按书名、作者、出版社查找已爬取的书籍，不必每次 grep JSON 或载入 pandas
+
+- 中文没有空格分词，按字符 n-gram（单字 + 相邻双字）建倒排索引；查询取各 n-gram 倒排表的交集，
+  再核对原文去掉误匹配，支持子串查询和前缀查询（文本开头加标记字符，前缀即包含“标记+首字”）
+- 作者、出版社重复度高，n-gram 建在不同的取值上，再由取值找到书籍，索引只有书名的一小部分大小
+- 可按出版社（完全匹配）和评分范围过滤，结果用堆取评分最高的 k 本
+- 保存为单个二进制文件，载入时倒排表整块读入，不为每个 n-gram 建对象；
+  新的爬取结果可以增量加入（按书籍链接更新已有的书籍）
+
+用法:
+    python douban_search.py build                              # 从默认的爬取结果建立索引
+    python douban_search.py build batch_output/douban_catalog.json --db douban_books.db
+    python douban_search.py update douban_books_all.ndjson     # 加入新的爬取结果
+    python douban_search.py query 三体
+    python douban_search.py query 刘慈 --field 作者 --prefix --min-rating 8.5 --top 20
+    python douban_search.py query --publisher 人民文学出版社 --min-rating 9
+"""
+
+import argparse
+import heapq
+import json
+import math
+import os
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left
+
+from douban_books import BLOB_HEADER, Book, BookTable, read_array, read_blob, write_blob
+
+DEFAULT_INDEX_FILE = 'douban_search.idx'
+INDEX_MAGIC = b'DBSEARCH2'
+
+SEARCH_FIELDS = ('书名', '作者', '出版社')
+
+# 文本开头的标记字符：前缀查询“三体”即查找包含“标记三”“三体”的书名
+PREFIX_MARK = '\x02'
+
+# 删除的书籍超过该比例时，保存前重建索引
+COMPACT_RATIO = 0.25
+
+_EMPTY = array('I')
+
+
+def normalize(text):
+    """统一全角半角和大小写，合并连续空白"""
+    return ' '.join(unicodedata.normalize('NFKC', text or '').lower().split())
+
+
+def text_grams(text):
+    """已规范化文本的全部单字和相邻双字（开头带 PREFIX_MARK）"""
+    marked = PREFIX_MARK + text
+    grams = set(text)
+    grams.update(marked[i:i + 2] for i in range(len(text)))
+    return grams
+
+
+def query_grams(query, prefix=False):
+    """
+    查询用到的 n-gram
+
+    Returns:
+        tuple: (n-gram 列表, 是否无需核对原文)，查询不超过两个字（含前缀标记）时倒排表即精确结果
+    """
+    if prefix:
+        query = PREFIX_MARK + query
+    if len(query) == 1:
+        return [query], True
+    return list({query[i:i + 2] for i in range(len(query) - 1)}), len(query) == 2
+
+
+def _contains(postings, value):
+    index = bisect_left(postings, value)
+    return index < len(postings) and postings[index] == value
+
+
+def intersect(postings_lists):
+    """求多个升序编号序列的交集（从最短的开始，差距大时二分查找，否则用集合）"""
+    postings_lists = sorted(postings_lists, key=len)
+    result = list(postings_lists[0])
+    for postings in postings_lists[1:]:
+        if not result:
+            break
+        if len(postings) > 16 * len(result):
+            result = [value for value in result if _contains(postings, value)]
+        else:
+            members = set(postings)
+            result = [value for value in result if value in members]
+    return result
+
+
+class _Postings:
+    """
+    键 → 升序编号数组
+
+    从磁盘载入的部分保存在一整块连续数组中，按偏移取出（不为每个键建对象）；
+    某个键写入新编号时才复制为独立的数组
+    """
+
+    def __init__(self):
+        self._slots = {}
+        self._offsets = array('Q', [0])
+        self._view = memoryview(array('I'))
+        self._changed = {}
+
+    def get(self, key):
+        postings = self._changed.get(key)
+        if postings is not None:
+            return postings
+        slot = self._slots.get(key)
+        if slot is None:
+            return _EMPTY
+        return self._view[self._offsets[slot]:self._offsets[slot + 1]]
+
+    def add(self, key, value):
+        postings = self._changed.get(key)
+        if postings is None:
+            postings = self._changed[key] = array('I', self.get(key))
+        postings.append(value)
+
+    def __len__(self):
+        return len(self._slots) + sum(1 for key in self._changed if key not in self._slots)
+
+    def write(self, f):
+        keys = list(self._slots) + [key for key in self._changed if key not in self._slots]
+        offsets = array('Q', [0])
+        data = array('I')
+        for key in keys:
+            data.frombytes(self.get(key).tobytes())
+            offsets.append(len(data))
+        # 键都是规范化后的文本，不含换行；另存键的个数，唯一的键为空字符串时也能读回
+        write_blob(f, array('Q', [len(keys)]).tobytes())
+        write_blob(f, '\n'.join(keys).encode('utf-8'))
+        write_blob(f, offsets.tobytes())
+        write_blob(f, data.tobytes())
+
+    @classmethod
+    def read(cls, f):
+        postings = cls()
+        (count,) = read_array(f, 'Q')
+        keys = read_blob(f).decode('utf-8')
+        keys = keys.split('\n') if count else []
+        postings._slots = dict(zip(keys, range(len(keys))))
+        postings._offsets = read_array(f, 'Q')
+        postings._view = memoryview(read_array(f, 'I'))
+        return postings
+
+
+class _ValueField:
+    """重复度高的字段（作者、出版社）：n-gram 倒排表指向不同的取值，每个取值再指向书籍"""
+
+    def __init__(self):
+        self.values = []
+        self.code_by_value = {}
+        self.grams = _Postings()
+        self.docs = _Postings()
+
+    def add(self, doc, value):
+        code = self.code_by_value.get(value)
+        if code is None:
+            code = self.code_by_value[value] = len(self.values)
+            self.values.append(value)
+            for gram in text_grams(value):
+                self.grams.add(gram, code)
+        self.docs.add(value, doc)
+
+    def match(self, query, prefix):
+        """包含（或以之开头）query 的取值下的全部书籍，升序"""
+        grams, exact = query_grams(query, prefix)
+        codes = intersect([self.grams.get(gram) for gram in grams])
+        if not exact:
+            codes = [code for code in codes
+                     if (self.values[code].startswith(query) if prefix else query in self.values[code])]
+        if len(codes) == 1:
+            return self.docs.get(self.values[codes[0]])
+        return sorted(set().union(*(self.docs.get(self.values[code]) for code in codes)))
+
+    def write(self, f):
+        write_blob(f, json.dumps(self.values, ensure_ascii=False).encode('utf-8'))
+        self.grams.write(f)
+        self.docs.write(f)
+
+    @classmethod
+    def read(cls, f):
+        field = cls()
+        field.values = json.loads(read_blob(f))
+        field.code_by_value = {value: code for code, value in enumerate(field.values)}
+        field.grams = _Postings.read(f)
+        field.docs = _Postings.read(f)
+        return field
+
+
+class SearchIndex:
+    """
+    书籍搜索索引
+
+    书籍按加入顺序编号，保存在 BookTable 中（只保留六个基本字段）；书名的 n-gram 倒排表指向书籍编号，
+    作者和出版社见 _ValueField。书籍链接已存在的书籍再次加入时，只有评分变化的就地更新评分，
+    其他字段变化的把旧记录标记为删除并追加新记录。
+
+    用法:
+        index = SearchIndex.load('douban_search.idx')
+        index.update(new_books)
+        index.search('三体', min_rating=8, k=10)
+        index.save('douban_search.idx')
+    """
+
+    def __init__(self, books=()):
+        self._table = BookTable()
+        # 当前评分（就地更新评分时 BookTable 中的评分不再使用）
+        self._ratings = array('f')
+        self._alive = bytearray()
+        self._deleted = 0
+        self._titles = _Postings()
+        self._authors = _ValueField()
+        self._publishers = _ValueField()
+        # 书籍链接 → 编号；从文件载入的索引在第一次 update() 时才建立
+        self._doc_by_url = None
+        # 按评分从高到低排列的编号及其负评分（升序，用于二分查找评分范围），书籍变化后重新建立
+        self._by_rating = None
+        self._rating_keys = None
+        self.update(books)
+
+    def __len__(self):
+        return len(self._table) - self._deleted
+
+    def _append(self, book):
+        doc = len(self._table)
+        self._table.append(book)
+        self._ratings.append(book.rating)
+        self._alive.append(1)
+        self._by_rating = None
+        for gram in text_grams(normalize(book.title)):
+            self._titles.add(gram, doc)
+        self._authors.add(doc, normalize(book.author))
+        self._publishers.add(doc, normalize(book.publisher))
+        return doc
+
+    def _doc_ids(self):
+        if self._doc_by_url is None:
+            self._doc_by_url = {book.book_url: doc for doc, book in enumerate(self._table)
+                                if book.book_url and self._alive[doc]}
+        return self._doc_by_url
+
+    def update(self, books):
+        """
+        加入书籍（书籍字典或 Book），按书籍链接更新已有的书籍
+
+        Returns:
+            tuple: (新增数, 更新数)
+        """
+        doc_by_url = self._doc_ids()
+        added = updated = 0
+        for book in books:
+            if isinstance(book, dict):
+                book = Book.from_dict(book)
+            book = Book(book.title, book.author, book.publisher, book.rating, book.cover_url, book.book_url)
+            doc = doc_by_url.get(book.book_url) if book.book_url else None
+            if doc is not None:
+                old = self._table[doc]
+                if (old.title, old.author, old.publisher, old.cover_url) == (
+                        book.title, book.author, book.publisher, book.cover_url):
+                    old_rating = self._ratings[doc]
+                    if not (math.isnan(old_rating) and math.isnan(book.rating)) and (
+                            round(old_rating, 1) != round(book.rating, 1)):
+                        self._ratings[doc] = book.rating
+                        self._by_rating = None
+                        updated += 1
+                    continue
+                self._alive[doc] = 0
+                self._deleted += 1
+                updated += 1
+            else:
+                added += 1
+            doc = self._append(book)
+            if book.book_url:
+                doc_by_url[book.book_url] = doc
+        return added, updated
+
+    def _match(self, query, fields, prefix):
+        """在指定字段中匹配 query 的书籍编号，升序"""
+        results = []
+        if '书名' in fields:
+            grams, exact = query_grams(query, prefix)
+            docs = intersect([self._titles.get(gram) for gram in grams])
+            if not exact:
+                docs = [doc for doc in docs if self._title_matches(doc, query, prefix)]
+            results.append(docs)
+        if '作者' in fields:
+            results.append(self._authors.match(query, prefix))
+        if '出版社' in fields:
+            results.append(self._publishers.match(query, prefix))
+        if len(results) == 1:
+            return results[0]
+        return sorted(set().union(*results))
+
+    def _title_matches(self, doc, query, prefix):
+        title = normalize(self._table[doc].title)
+        return title.startswith(query) if prefix else query in title
+
+    def _rank(self, doc):
+        # 无评分的书籍排在最后
+        rating = self._ratings[doc]
+        return -1.0 if math.isnan(rating) else rating
+
+    def _rating_order(self):
+        if self._by_rating is None:
+            # reverse=True 保持同分书籍的加入顺序，与 heapq.nlargest 的结果一致
+            order = sorted(range(len(self._table)), key=self._rank, reverse=True)
+            self._by_rating = array('I', order)
+            self._rating_keys = array('f', [-self._rank(doc) for doc in order])
+        return self._by_rating, self._rating_keys
+
+    def _top_by_rating(self, low, high, k):
+        """没有文本和出版社条件时，沿评分顺序从 high 开始取前 k 本，不扫描全部书籍"""
+        order, keys = self._rating_order()
+        bounded = low > -math.inf or high < math.inf
+        top = []
+        for position in range(bisect_left(keys, -high) if high < math.inf else 0, len(order)):
+            rank = -keys[position]
+            if len(top) == k or rank < low or (bounded and rank < 0):
+                break
+            if self._alive[order[position]]:
+                top.append(order[position])
+        return top
+
+    def book(self, doc):
+        """按编号读取书籍（评分为当前评分）"""
+        book = self._table[doc]
+        book.rating = round(self._ratings[doc], 1)
+        return book
+
+    def search(self, query='', field=None, prefix=False, publisher=None, min_rating=None, max_rating=None, k=10):
+        """
+        查找书籍
+
+        Args:
+            query: 查询文本，为空时只按过滤条件查找
+            field: 只在 '书名' / '作者' / '出版社' 中查找，默认为三者任一匹配
+            prefix: 为True时字段须以 query 开头，否则为子串匹配
+            publisher: 出版社（完全匹配，忽略全角半角和大小写）
+            min_rating: 最低评分（含），无评分的书籍不满足任何评分条件
+            max_rating: 最高评分（含）
+            k: 返回数量，按评分从高到低（同分按加入顺序）；为None时返回全部
+
+        Returns:
+            list: Book 列表
+        """
+        low = -math.inf if min_rating is None else min_rating - 0.05
+        high = math.inf if max_rating is None else max_rating + 0.05
+        # 边界放宽半档，避免 float32 存储的一位小数在边界上被排除
+
+        constraints = []
+        query = normalize(query)
+        if query:
+            constraints.append(self._match(query, (field,) if field else SEARCH_FIELDS, prefix))
+        if publisher is not None:
+            constraints.append(self._publishers.docs.get(normalize(publisher)))
+        if not constraints and k is not None:
+            return [self.book(doc) for doc in self._top_by_rating(low, high, k)]
+        docs = intersect(constraints) if constraints else range(len(self._table))
+
+        alive = self._alive
+        ratings = self._ratings
+        if min_rating is not None or max_rating is not None:
+            docs = [doc for doc in docs if alive[doc] and low < ratings[doc] < high]
+        elif self._deleted:
+            docs = [doc for doc in docs if alive[doc]]
+
+        if k is None:
+            top = sorted(docs, key=self._rank, reverse=True)
+        else:
+            top = heapq.nlargest(k, docs, key=self._rank)
+        return [self.book(doc) for doc in top]
+
+    def compact(self):
+        """去掉已删除的书籍，重建索引"""
+        books = [self.book(doc) for doc in range(len(self._table)) if self._alive[doc]]
+        self.__init__(books)
+
+    def save(self, path=DEFAULT_INDEX_FILE):
+        """保存到文件（先写临时文件再替换）；删除的书籍较多时先重建"""
+        if self._deleted > len(self._table) * COMPACT_RATIO:
+            self.compact()
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'wb') as f:
+            write_blob(f, INDEX_MAGIC)
+            self._table.write(f)
+            write_blob(f, self._ratings.tobytes())
+            write_blob(f, bytes(self._alive))
+            order, keys = self._rating_order()
+            write_blob(f, order.tobytes())
+            write_blob(f, keys.tobytes())
+            self._titles.write(f)
+            self._authors.write(f)
+            self._publishers.write(f)
+        os.replace(temp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path=DEFAULT_INDEX_FILE):
+        """从 save() 保存的文件载入"""
+        index = cls()
+        with open(path, 'rb') as f:
+            # 直接比较长度前缀和标记的原始字节：其他文件开头的8字节可能被当作极大的长度
+            magic = BLOB_HEADER.pack(len(INDEX_MAGIC)) + INDEX_MAGIC
+            if f.read(len(magic)) != magic:
+                raise ValueError(f"{path} 不是搜索索引文件")
+            index._table = BookTable.read(f)
+            index._ratings = read_array(f, 'f')
+            index._alive = bytearray(read_blob(f))
+            index._deleted = index._alive.count(0)
+            index._by_rating = read_array(f, 'I')
+            index._rating_keys = read_array(f, 'f')
+            index._titles = _Postings.read(f)
+            index._authors = _ValueField.read(f)
+            index._publishers = _ValueField.read(f)
+        index._doc_by_url = None
+        return index
+
+
+def iter_source_books(sources=(), db_file=None):
+    """
+    逐本读取爬取结果：.ndjson（JSON Lines）、.json（书籍数组）和SQLite书籍库；
+    都未指定时读取默认的爬取结果
+    """
+    if not sources and not db_file:
+        from create_excel_simple import load_books
+
+        books_data, _ = load_books()
+        yield from books_data
+        return
+    for source in sources:
+        if source.endswith('.ndjson'):
+            from douban_ndjson import NdjsonReader
+
+            with NdjsonReader(source) as reader:
+                yield from reader
+        else:
+            with open(source, 'r', encoding='utf-8') as f:
+                yield from json.load(f)
+    if db_file:
+        from douban_store import BookStore
+
+        store = BookStore(db_file)
+        try:
+            yield from store.iter_books()
+        finally:
+            store.close()
+
+
+def update_index(books, path=DEFAULT_INDEX_FILE):
+    """把书籍加入索引文件（文件不存在时新建），返回 (新增数, 更新数)"""
+    index = SearchIndex.load(path) if os.path.exists(path) else SearchIndex()
+    added, updated = index.update(books)
+    index.save(path)
+    print(f"搜索索引已更新: 新增 {added} 本，更新 {updated} 本，共 {len(index)} 本（{path}）")
+    return added, updated
+
+
+def print_results(books, seconds):
+    print(f"找到 {len(books)} 本（{seconds * 1000:.2f} ms）")
+    for rank, book in enumerate(books, 1):
+        print(f"{rank:>3}. {book['书名']} / {book['作者']} / {book['出版社']}  {book['评分'] or '无评分'}  "
+              f"{book['书籍链接']}")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='书籍搜索索引')
+    parser.add_argument('--index', default=DEFAULT_INDEX_FILE, help='索引文件')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    for command, description in (('build', '从爬取结果重新建立索引'), ('update', '把新的爬取结果加入索引')):
+        source_parser = subparsers.add_parser(command, help=description)
+        source_parser.add_argument('sources', nargs='*', help='.json / .ndjson 爬取结果（默认读取爬取结果）')
+        source_parser.add_argument('--db', help='SQLite书籍库')
+
+    query_parser = subparsers.add_parser('query', help='查找书籍')
+    query_parser.add_argument('query', nargs='?', default='', help='查询文本（子串匹配）')
+    query_parser.add_argument('--field', choices=SEARCH_FIELDS, help='只在该字段中查找（默认为书名、作者、出版社）')
+    query_parser.add_argument('--prefix', action='store_true', help='前缀匹配')
+    query_parser.add_argument('--publisher', help='出版社（完全匹配）')
+    query_parser.add_argument('--min-rating', type=float, help='最低评分')
+    query_parser.add_argument('--max-rating', type=float, help='最高评分')
+    query_parser.add_argument('--top', type=int, default=10, help='返回评分最高的前几本')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        start_time = time.perf_counter()
+        index = SearchIndex(iter_source_books(args.sources, args.db))
+        index.save(args.index)
+        print(f"已为 {len(index)} 本书籍建立索引（{time.perf_counter() - start_time:.1f} 秒）: {args.index}")
+    elif args.command == 'update':
+        update_index(iter_source_books(args.sources, args.db), args.index)
+    elif args.command == 'query':
+        start_time = time.perf_counter()
+        index = SearchIndex.load(args.index)
+        print(f"载入索引 {len(index)} 本（{(time.perf_counter() - start_time) * 1000:.0f} ms）")
+        start_time = time.perf_counter()
+        books = index.search(args.query, args.field, args.prefix, args.publisher, args.min_rating, args.max_rating,
+                             args.top)
+        print_results(books, time.perf_counter() - start_time)
+
+
+if __name__ == "__main__":
+    main()
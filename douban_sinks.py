@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+书籍输出端 - 爬取结果按批次扇出到多个输出端（CSV / NDJSON / JSON / Excel / SQLite），
+每个输出端在自己的线程中从有界队列读取批次并写入，
+结果边爬边落盘，内存占用不随书单大小增长
+"""
+
+import csv
+import json
+import os
+import queue
+import threading
+from collections import Counter
+
+BOOK_COLUMNS = ['书名', '作者', '出版社', '评分', '封面链接', '书籍链接']
+
+
+class BookSink:
+    """输出端基类，子类实现 write_batch 和 close"""
+
+    def write_batch(self, books):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class CsvSink(BookSink):
+    """CSV输出（utf-8-sig，与 save_data 的格式一致），columns 默认为 BOOK_COLUMNS"""
+
+    def __init__(self, path, columns=None):
+        self.path = path
+        self._file = open(path, 'w', encoding='utf-8-sig', newline='')
+        self._writer = csv.DictWriter(self._file, fieldnames=columns or BOOK_COLUMNS, lineterminator=os.linesep,
+                                      extrasaction='ignore')
+        self._writer.writeheader()
+
+    def write_batch(self, books):
+        self._writer.writerows(books)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class NdjsonSink(BookSink):
+    """每行一本书的 JSON Lines 输出，同时写出字节偏移索引（见 douban_ndjson），读取时可按行号跳读"""
+
+    def __init__(self, path, write_index=True):
+        from douban_ndjson import NdjsonWriter
+
+        self.path = path
+        self._writer = NdjsonWriter(path, write_index)
+
+    def write_batch(self, books):
+        self._writer.write_many(books)
+
+    def close(self):
+        self._writer.close()
+
+
+class JsonSink(BookSink):
+    """JSON数组输出，逐条追加，格式与 json.dump(..., indent=2) 一致"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'w', encoding='utf-8')
+        self._count = 0
+
+    def write_batch(self, books):
+        parts = []
+        for book in books:
+            text = json.dumps(book, ensure_ascii=False, indent=2).replace('\n', '\n  ')
+            parts.append(('[\n  ' if self._count == 0 else ',\n  ') + text)
+            self._count += 1
+        self._file.write(''.join(parts))
+        self._file.flush()
+
+    def close(self):
+        self._file.write('\n]' if self._count else '[]')
+        self._file.close()
+
+
+class ExcelSink(BookSink):
+    """Excel输出（只写模式，逐行写入，不含封面图片）"""
+
+    def __init__(self, path, sheet_title="豆瓣书单"):
+        from douban_excel import book_row, create_streaming_sheet
+
+        self.path = path
+        self._book_row = book_row
+        self._wb, self._ws = create_streaming_sheet(sheet_title, '封面链接')
+        self._count = 0
+
+    def write_batch(self, books):
+        for book in books:
+            self._count += 1
+            self._ws.append(self._book_row(self._ws, self._count, book, book['封面链接']))
+
+    def close(self):
+        self._wb.save(self.path)
+
+
+class SqliteSink(BookSink):
+    """SQLite书籍库输出，每批一个事务，按书籍链接 upsert"""
+
+    def __init__(self, path):
+        from douban_store import BookStore
+
+        self.path = path
+        self._store = BookStore(path)
+
+    def write_batch(self, books):
+        self._store.upsert_many(books)
+
+    def close(self):
+        self._store.close()
+
+
+class StatsSink(BookSink):
+    """
+    边写边统计：总数、评分汇总和出版社计数，内存只与出版社数量有关
+
+    rating_summary / top_publishers 与 BookStore 的同名方法返回相同的格式，
+    可以直接交给 print_statistics_from_store 打印
+    """
+
+    def __init__(self):
+        self.total = 0
+        self._rating_sum = 0.0
+        self._rated = 0
+        self._highest = None
+        self._lowest = None
+        self._publishers = Counter()
+
+    def write_batch(self, books):
+        for book in books:
+            self.total += 1
+            if book['出版社']:
+                self._publishers[book['出版社']] += 1
+            try:
+                rating = float(book['评分'])
+            except (TypeError, ValueError):
+                continue
+            self._rated += 1
+            self._rating_sum += rating
+            self._highest = rating if self._highest is None else max(self._highest, rating)
+            self._lowest = rating if self._lowest is None else min(self._lowest, rating)
+
+    def rating_summary(self):
+        """返回 (总数, 有评分数, 平均分, 最高分, 最低分)"""
+        average = self._rating_sum / self._rated if self._rated else None
+        return self.total, self._rated, average, self._highest, self._lowest
+
+    def top_publishers(self, k=5):
+        """返回书籍最多的前k个出版社 [(出版社, 数量)]，同数量按出版社名排序"""
+        return sorted(self._publishers.items(), key=lambda item: (-item[1], item[0]))[:k]
+
+
+class SinkFanout:
+    """
+    把书籍分批扇出到多个输出端
+
+    Args:
+        sinks: BookSink 列表
+        batch_size: 每批的书籍数量
+        max_batches: 每个输出端队列中最多积压的批次数，队列满时 put 阻塞（背压）
+    """
+
+    def __init__(self, sinks, batch_size=100, max_batches=10):
+        self.sinks = list(sinks)
+        self.batch_size = batch_size
+        self.count = 0
+        self._batch = []
+        self._errors = []
+        self._queues = [queue.Queue(maxsize=max_batches) for _ in self.sinks]
+        self._threads = [
+            threading.Thread(target=self._run, args=(sink, sink_queue), daemon=True)
+            for sink, sink_queue in zip(self.sinks, self._queues)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _run(self, sink, sink_queue):
+        failed = False
+        while True:
+            batch = sink_queue.get()
+            if batch is None:
+                break
+            if failed:
+                # 出错后继续取走队列中的批次，避免阻塞生产者
+                continue
+            try:
+                sink.write_batch(batch)
+            except Exception as e:
+                failed = True
+                self._errors.append((sink, e))
+                print(f"写入 {getattr(sink, 'path', sink)} 时出错: {e}")
+        try:
+            sink.close()
+        except Exception as e:
+            self._errors.append((sink, e))
+            print(f"关闭 {getattr(sink, 'path', sink)} 时出错: {e}")
+
+    def _flush(self):
+        if self._batch:
+            batch, self._batch = self._batch, []
+            for sink_queue in self._queues:
+                sink_queue.put(batch)
+
+    def put(self, book):
+        """写入一本书"""
+        self._batch.append(book)
+        self.count += 1
+        if len(self._batch) >= self.batch_size:
+            self._flush()
+
+    def put_many(self, books):
+        """写入多本书"""
+        for book in books:
+            self.put(book)
+
+    def close(self):
+        """写出剩余批次并等待所有输出端完成"""
+        self._flush()
+        for sink_queue in self._queues:
+            sink_queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        if self._errors:
+            sink, error = self._errors[0]
+            raise RuntimeError(f"输出端 {getattr(sink, 'path', sink)} 写入失败: {error}") from error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            # 已有异常时尽量保存已写入的部分，不再覆盖原异常
+            try:
+                self.close()
+            except Exception:
+                pass
+        return False
+
+
+def create_sinks(csv_file=None, json_file=None, ndjson_file=None, excel_file=None, db_file=None, columns=None):
+    """按给定的文件名创建输出端列表，columns 为CSV的列（默认 BOOK_COLUMNS）"""
+    sinks = []
+    if csv_file:
+        sinks.append(CsvSink(csv_file, columns))
+    if json_file:
+        sinks.append(JsonSink(json_file))
+    if ndjson_file:
+        sinks.append(NdjsonSink(ndjson_file))
+    if excel_file:
+        sinks.append(ExcelSink(excel_file))
+    if db_file:
+        sinks.append(SqliteSink(db_file))
+    return sinks
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SQLite书籍库 - 以书籍链接为主键增量写入（upsert），
+为出版社、作者和评分建立索引，导出和统计直接查询，无需重新加载整个JSON
+"""
+
+import sqlite3
+import threading
+import time
+
+DEFAULT_DB_FILE = 'douban_books.db'
+
+# 书籍字典字段 → 数据库列
+COLUMN_MAP = [
+    ('书名', 'title'),
+    ('作者', 'author'),
+    ('出版社', 'publisher'),
+    ('评分', 'rating'),
+    ('封面链接', 'cover_url'),
+    ('书籍链接', 'book_url'),
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS books (
+    book_url TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    author TEXT NOT NULL DEFAULT '',
+    publisher TEXT NOT NULL DEFAULT '',
+    rating TEXT NOT NULL DEFAULT '',
+    rating_value REAL,
+    cover_url TEXT NOT NULL DEFAULT '',
+    first_seen REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_books_publisher ON books (publisher);
+CREATE INDEX IF NOT EXISTS idx_books_author ON books (author);
+CREATE INDEX IF NOT EXISTS idx_books_rating_value ON books (rating_value);
+"""
+
+UPSERT_SQL = """
+INSERT INTO books (book_url, title, author, publisher, rating, rating_value, cover_url, first_seen, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (book_url) DO UPDATE SET
+    title = excluded.title,
+    author = excluded.author,
+    publisher = excluded.publisher,
+    rating = excluded.rating,
+    rating_value = excluded.rating_value,
+    cover_url = excluded.cover_url,
+    updated_at = excluded.updated_at
+"""
+
+SELECT_COLUMNS = ', '.join(column for _, column in COLUMN_MAP)
+
+
+def parse_rating(rating):
+    """把评分文本转换为浮点数，无评分时返回None"""
+    try:
+        return float(rating) if rating else None
+    except ValueError:
+        return None
+
+
+class BookStore:
+    """
+    SQLite书籍库（线程安全）
+
+    Args:
+        path: 数据库文件路径
+    """
+
+    def __init__(self, path=DEFAULT_DB_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+
+    def upsert_many(self, books):
+        """在一个事务中按书籍链接插入或更新一批书籍"""
+        now = time.time()
+        rows = [
+            (book['书籍链接'], book['书名'], book['作者'], book['出版社'], book['评分'],
+             parse_rating(book['评分']), book['封面链接'], now, now)
+            for book in books if book['书籍链接']
+        ]
+        with self._lock, self._db:
+            self._db.executemany(UPSERT_SQL, rows)
+        return len(rows)
+
+    def count(self, where='', params=()):
+        with self._lock:
+            return self._db.execute(f"SELECT COUNT(*) FROM books {where}", params).fetchone()[0]
+
+    def iter_books(self, where='', params=(), order_by='rowid', limit=None, offset=0, fetch_size=1000):
+        """
+        按条件逐批读取书籍，返回与爬虫相同格式的字典
+
+        Args:
+            where: 以 WHERE 开头的条件子句，如 "WHERE publisher = ?"
+            params: 条件参数
+            order_by: 排序，默认按首次写入的顺序
+            limit: 最多返回多少本
+            offset: 跳过多少本
+            fetch_size: 每次从数据库取出的行数
+        """
+        sql = f"SELECT {SELECT_COLUMNS} FROM books {where} ORDER BY {order_by} LIMIT ? OFFSET ?"
+        params = tuple(params) + (-1 if limit is None else limit, offset)
+        keys = [key for key, _ in COLUMN_MAP]
+        with self._lock:
+            cursor = self._db.execute(sql, params)
+            rows = cursor.fetchmany(fetch_size)
+        while rows:
+            for row in rows:
+                yield dict(zip(keys, row))
+            with self._lock:
+                rows = cursor.fetchmany(fetch_size)
+
+    def get(self, book_url):
+        """按书籍链接读取一本书，不存在时返回None"""
+        for book in self.iter_books("WHERE book_url = ?", (book_url,), limit=1):
+            return book
+        return None
+
+    def rating_summary(self):
+        """返回 (总数, 有评分数, 平均分, 最高分, 最低分)"""
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(*), COUNT(rating_value), AVG(rating_value), MAX(rating_value), MIN(rating_value) "
+                "FROM books"
+            ).fetchone()
+
+    def top_publishers(self, k=5):
+        """返回书籍最多的前k个出版社 [(出版社, 数量)]"""
+        with self._lock:
+            return self._db.execute(
+                "SELECT publisher, COUNT(*) AS n FROM books WHERE publisher != '' "
+                "GROUP BY publisher ORDER BY n DESC, publisher LIMIT ?", (k,)
+            ).fetchall()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
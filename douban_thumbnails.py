@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+封面缩略图生成 - 在进程池中对内存中的图片数据做 LANCZOS 缩放，
+结果按 (原图哈希, 目标尺寸) 缓存到磁盘，同一封面不会重复缩放
+"""
+
+import hashlib
+import io
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from douban_metrics import METRICS
+
+THUMBNAIL_SIZE = (100, 140)
+DEFAULT_THUMBNAIL_DIR = os.path.join('book_covers', 'thumbnails')
+
+# 少于这个数量时直接在当前进程缩放，省去启动进程池的开销
+MIN_POOL_TASKS = 8
+
+
+def make_thumbnail(content, size=THUMBNAIL_SIZE, quality=85):
+    """把图片数据缩放为JPEG缩略图，返回缩略图字节"""
+    from PIL import Image as PILImage
+
+    img = PILImage.open(io.BytesIO(content))
+    img.thumbnail(size, PILImage.Resampling.LANCZOS)
+    if img.mode not in ('RGB', 'L'):
+        img = img.convert('RGB')
+    output = io.BytesIO()
+    img.save(output, 'JPEG', quality=quality)
+    return output.getvalue()
+
+
+class ThumbnailCache:
+    """按 (原图哈希, 目标尺寸) 保存缩略图的磁盘缓存"""
+
+    def __init__(self, cache_dir=DEFAULT_THUMBNAIL_DIR):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, source_hash, size):
+        return os.path.join(self.cache_dir, f"{source_hash}_{size[0]}x{size[1]}.jpg")
+
+    def get(self, source_hash, size):
+        path = self._path(source_hash, size)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def put(self, source_hash, size, content):
+        path = self._path(source_hash, size)
+        # 多个进程（例如并行导出的工作进程）可能同时写同一张缩略图，临时文件按进程和线程区分
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(content)
+        os.replace(temp_path, path)
+
+
+def thumbnail_covers(paths, size=THUMBNAIL_SIZE, workers=None, cache=None):
+    """
+    为一批封面文件生成缩略图
+
+    Args:
+        paths: 封面文件路径（可重复，重复的只处理一次）
+        size: 目标尺寸
+        workers: 进程池大小，默认为CPU核数
+        cache: ThumbnailCache，为None时使用默认缓存目录
+
+    Returns:
+        tuple: (缩略图字典 {路径: JPEG字节}, 错误字典 {路径: 错误信息})
+    """
+    with METRICS.timer('thumbnail'):
+        thumbnails, errors = _thumbnail_covers(paths, size, workers, cache or ThumbnailCache())
+    METRICS.count('thumbnail', len(thumbnails))
+    if errors:
+        METRICS.error('thumbnail', len(errors))
+    return thumbnails, errors
+
+
+def _thumbnail_covers(paths, size, workers, cache):
+    thumbnails = {}
+    errors = {}
+    pending = {}
+
+    for path in dict.fromkeys(paths):
+        try:
+            with open(path, 'rb') as f:
+                content = f.read()
+        except OSError as e:
+            errors[path] = str(e)
+            continue
+        source_hash = hashlib.sha1(content).hexdigest()
+        cached = cache.get(source_hash, size)
+        if cached is not None:
+            thumbnails[path] = cached
+        else:
+            pending[path] = (source_hash, content)
+
+    if pending:
+        print(f"缩略图缓存命中 {len(thumbnails)} 张，需要缩放 {len(pending)} 张")
+
+    def collect(path, result):
+        thumbnails[path] = result
+        cache.put(pending[path][0], size, result)
+
+    if len(pending) < MIN_POOL_TASKS or workers == 1:
+        for path, (_, content) in pending.items():
+            try:
+                collect(path, make_thumbnail(content, size))
+            except Exception as e:
+                errors[path] = str(e)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {path: executor.submit(make_thumbnail, content, size) for path, (_, content) in pending.items()}
+            for path, future in futures.items():
+                try:
+                    collect(path, future.result())
+                except Exception as e:
+                    errors[path] = str(e)
+
+    return thumbnails, errors
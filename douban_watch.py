@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+豆瓣书单增量监控 - 为每一页的书籍列表记录指纹，
+每次轮询从第一页开始抓取，遇到指纹未变化的页面时再核对一次末页（总页数和末页指纹），
+两者都未变化才停止，否则继续抓取到末页；只输出新增、删除和评分变化的书籍
+
+局限：只有首段页面或末页变化时才会抓取中间的页面，若变化只发生在中间某一页
+（例如中间某本书的评分变了），本次轮询不会发现
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+
+import requests
+
+from douban_cache import HttpCache
+from douban_http import create_session
+from douban_metrics import LOG_FORMATS, LOG_LEVELS, setup_logging
+from douban_rate_limit import TokenBucket
+from douban_parser import DEFAULT_DOULIST_URL
+from enhanced_douban_spider import PAGE_SIZE, build_page_url, fetch_page, parse_page, save_data
+
+DEFAULT_STATE_FILE = 'douban_watch_state.json'
+DEFAULT_DELTA_FILE = 'douban_books_delta.json'
+
+# 参与指纹计算的字段
+FINGERPRINT_FIELDS = ('书籍链接', '书名', '作者', '出版社', '评分', '封面链接')
+
+
+def page_fingerprint(books):
+    """计算一页书籍列表的指纹"""
+    digest = hashlib.sha1()
+    for book in books:
+        digest.update(json.dumps([book[field] for field in FINGERPRINT_FIELDS], ensure_ascii=False).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def load_state(state_file, doulist_url):
+    """读取上次轮询的页面指纹，书单不一致时视为首次运行"""
+    if not os.path.exists(state_file):
+        return {}
+    with open(state_file, 'r', encoding='utf-8') as f:
+        state = json.load(f)
+    if state.get('doulist_url') != doulist_url:
+        return {}
+    return {int(start): page for start, page in state.get('pages', {}).items()}
+
+
+def save_state(state_file, doulist_url, pages):
+    temp_file = state_file + '.tmp'
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            'doulist_url': doulist_url,
+            'updated_at': datetime.now().isoformat(timespec='seconds'),
+            'pages': {str(start): page for start, page in sorted(pages.items())},
+        }, f, ensure_ascii=False)
+    os.replace(temp_file, state_file)
+
+
+def load_books(data_file):
+    if not os.path.exists(data_file):
+        return []
+    with open(data_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compute_delta(old_books, new_books):
+    """比较新旧书籍列表，返回 (新增, 删除, 评分变化)"""
+    old_by_url = {book['书籍链接']: book for book in old_books}
+    new_by_url = {book['书籍链接']: book for book in new_books}
+
+    added = [book for url, book in new_by_url.items() if url not in old_by_url]
+    removed = [book for url, book in old_by_url.items() if url not in new_by_url]
+    rerated = []
+    for url, book in new_by_url.items():
+        old_book = old_by_url.get(url)
+        if old_book is not None and old_book['评分'] != book['评分']:
+            rerated.append({**book, '原评分': old_book['评分']})
+    return added, removed, rerated
+
+
+def watch_once(doulist_url, data_file='douban_books_all.json', csv_file='douban_books_all.csv',
+               state_file=DEFAULT_STATE_FILE, delta_file=DEFAULT_DELTA_FILE, max_pages=20,
+               backend='html.parser', cache=None, rate=0.5):
+    """
+    轮询一次书单，只抓取发生变化的页面
+
+    Args:
+        doulist_url: 豆瓣书单URL
+        data_file: 上次的完整结果（douban_books_all.json），会被更新
+        csv_file: 同步更新的CSV文件
+        state_file: 页面指纹文件
+        delta_file: 本次增量输出文件
+        max_pages: 最大页数
+        backend: 页面解析后端
+        cache: HttpCache
+        rate: 每秒允许的请求数
+
+    Returns:
+        dict: 增量结果，包含 added / removed / rerated
+    """
+    old_books = load_books(data_file)
+    old_urls = {book['书籍链接'] for book in old_books}
+    old_by_url = {book['书籍链接']: book for book in old_books}
+    old_pages = load_state(state_file, doulist_url)
+
+    session = create_session()
+    bucket = TokenBucket(rate)
+
+    new_pages = {}
+    new_books = []
+    pages_fetched = 0
+    start = 0
+    reached_end = False
+    total_pages = None
+    stop_early = True
+
+    def unchanged(page_start, books):
+        old_page = old_pages.get(page_start)
+        return (old_page is not None and old_page['fingerprint'] == page_fingerprint(books)
+                and old_urls.issuperset(old_page['book_urls']))
+
+    def tail_unchanged():
+        """总页数与上次相同且末页指纹未变化（末页之后追加或改评分的书籍由此发现）"""
+        nonlocal pages_fetched
+        if not total_pages or not old_pages:
+            return False
+        last_start = min(total_pages, max_pages) * PAGE_SIZE - PAGE_SIZE
+        if last_start != max(old_pages):
+            return False
+        if last_start <= start:
+            return True
+        last_page = parse_page(fetch_page(session, build_page_url(doulist_url, last_start), bucket, cache), backend)
+        pages_fetched += 1
+        return unchanged(last_start, last_page.books)
+
+    print(f"开始检查书单变化: {doulist_url}")
+
+    while start < max_pages * PAGE_SIZE:
+        doulist_page = parse_page(fetch_page(session, build_page_url(doulist_url, start), bucket, cache), backend)
+        pages_fetched += 1
+        if start == 0:
+            total_pages = doulist_page.total_pages
+        book_urls = [book['书籍链接'] for book in doulist_page.books]
+        new_pages[start] = {'fingerprint': page_fingerprint(doulist_page.books), 'book_urls': book_urls}
+        new_books.extend(doulist_page.books)
+
+        page_unchanged = unchanged(start, doulist_page.books)
+        if stop_early and page_unchanged:
+            if tail_unchanged():
+                print(f"第 {start // PAGE_SIZE + 1} 页和末页均未变化，停止抓取")
+                break
+            # 末页或总页数有变化：后面的页面逐页抓取到末页
+            stop_early = False
+            print(f"第 {start // PAGE_SIZE + 1} 页未变化，但末页有变化，继续抓取")
+        else:
+            print(f"第 {start // PAGE_SIZE + 1} 页{'未变化' if page_unchanged else '有变化'}")
+
+        if not doulist_page.has_next:
+            reached_end = True
+            break
+        start += PAGE_SIZE
+
+    # 未抓取的后续页面沿用上次的结果
+    if not reached_end:
+        for old_start in sorted(old_pages):
+            if old_start > start:
+                new_pages[old_start] = old_pages[old_start]
+                new_books.extend(old_by_url[url] for url in old_pages[old_start]['book_urls'] if url in old_by_url)
+
+    added, removed, rerated = compute_delta(old_books, new_books)
+    delta = {
+        'doulist_url': doulist_url,
+        'checked_at': datetime.now().isoformat(timespec='seconds'),
+        'pages_fetched': pages_fetched,
+        'added': added,
+        'removed': removed,
+        'rerated': rerated,
+    }
+
+    with open(delta_file, 'w', encoding='utf-8') as f:
+        json.dump(delta, f, ensure_ascii=False, indent=2)
+
+    if added or removed or rerated or new_books != old_books:
+        save_data(new_books, csv_file=csv_file, json_file=data_file)
+    save_state(state_file, doulist_url, new_pages)
+
+    print(f"抓取 {pages_fetched} 页：新增 {len(added)} 本，删除 {len(removed)} 本，评分变化 {len(rerated)} 本")
+    print(f"增量已保存到 {delta_file}")
+    return delta
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='豆瓣书单增量监控')
+    parser.add_argument('--url', default=DEFAULT_DOULIST_URL, help='豆瓣书单URL')
+    parser.add_argument('--interval', type=int, default=0, help='轮询间隔（秒），为0时只检查一次')
+    parser.add_argument('--max-pages', type=int, default=20, help='最大页数')
+    parser.add_argument('--no-cache', action='store_true', help='不使用HTTP缓存')
+    parser.add_argument('--log-level', choices=LOG_LEVELS, default='INFO', help='日志级别，DEBUG 时输出每本书')
+    parser.add_argument('--log-format', choices=LOG_FORMATS, default='text',
+                        help='日志格式：text 为带时间、级别和来源的文本，kv 为 key=value 行，json 为JSON行')
+    args = parser.parse_args()
+    setup_logging(args.log_level, args.log_format)
+
+    cache = None if args.no_cache else HttpCache()
+
+    try:
+        while True:
+            try:
+                watch_once(args.url, max_pages=args.max_pages, cache=cache)
+            except requests.RequestException as e:
+                print(f"检查书单时请求出错: {e}")
+            if args.interval <= 0:
+                break
+            print(f"等待 {args.interval} 秒后再次检查...")
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        print("\n用户中断监控")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,104 +6,343 @@
 """
 
 import requests
-from bs4 import BeautifulSoup
-import pandas as pd
 import time
-import json
 import re
 import os
-from openpyxl import Workbook
-from openpyxl.drawing.image import Image
-from openpyxl.styles import Alignment
-from PIL import Image as PILImage
-import io
+import argparse
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-def crawl_all_douban_books(doulist_url, max_pages=20):
+from douban_rate_limit import TokenBucket
+from douban_archive import PageArchive
+from douban_cache import COVER_TTL, PAGE_TTL, HttpCache, fetch_bytes
+from douban_http import IMAGE_ACCEPT, REQUEST_TIMER, create_session, get_default_session
+from douban_books import BookTable
+from douban_checkpoint import DEFAULT_CHECKPOINT_FILE, CrawlCheckpoint
+from douban_covers import CoverStore, cover_key
+from douban_details import DetailCache, enrich_books
+from douban_ndjson import NdjsonReader
+from douban_metrics import DEFAULT_METRICS_FILE, LOG_FORMATS, LOG_LEVELS, METRICS, setup_logging
+from douban_search import update_index
+from douban_store import BookStore
+from douban_sinks import SinkFanout, StatsSink, create_sinks
+from douban_thumbnails import thumbnail_covers
+from douban_parser import DEFAULT_DOULIST_URL, PAGE_SIZE, PARSER_BACKENDS, extract_author_publisher, parse_doulist_page
+
+logger = logging.getLogger(__name__)
+
+def build_page_url(doulist_url, start):
+    """构建指定 start 偏移量的页面URL"""
+    if start == 0:
+        return doulist_url
+    if re.search(r'start=\d+', doulist_url):
+        # 替换URL中的start参数
+        return re.sub(r'start=\d+', f'start={start}', doulist_url)
+    separator = '&' if '?' in doulist_url else '?'
+    return f"{doulist_url}{separator}start={start}"
+
+def plan_page_offsets(total_pages, max_pages):
+    """根据总页数构建全部页面的 start 偏移量，无法判断总页数时返回None"""
+    if total_pages is None:
+        return None
+    return [page * PAGE_SIZE for page in range(min(total_pages, max_pages))]
+
+def fetch_page(session, url, bucket=None, cache=None, archive=None):
+    """
+    （在限速器允许时）请求页面并返回原始字节，传入cache时优先使用缓存，
+    传入archive（PageArchive）时把原始字节压缩归档，供以后离线重新解析
+    """
+    if bucket is not None:
+        bucket.acquire()
+    with METRICS.timer('fetch'):
+        content = fetch_bytes(session, url, cache, ttl=PAGE_TTL)
+    METRICS.count('fetch')
+    if archive is not None:
+        archive.add(url, content)
+    return content
+
+def parse_page(content, backend='html.parser', parse_item=None):
+    """
+    使用指定的解析后端解析一页书单，parse_item 默认为 parse_single_book（lxml 后端不使用）
+    
+    Returns:
+        DoulistPage: books 只保留有书名的条目，另附总页数和是否有下一页
+    """
+    with METRICS.timer('parse'):
+        doulist_page = parse_doulist_page(content, backend, parse_item or parse_single_book)
+    page_books = []
+    for book_info in doulist_page.books:
+        if book_info['书名']:
+            page_books.append(book_info)
+            logger.debug(f"  ✓ {book_info['书名']} - {book_info['评分']}")
+    METRICS.count('parse', len(page_books))
+    return doulist_page._replace(books=page_books)
+
+def crawl_all_douban_books(doulist_url, max_pages=20, workers=1, rate=2.0, backend='html.parser', cache=None,
+                           checkpoint=None, sink=None, collect=True, compact=False, parse_workers=0,
+                           archive=None):
     """
     爬取豆瓣书单中的所有书籍信息
     
     Args:
         doulist_url: 豆瓣书单URL
         max_pages: 最大爬取页数（每页25本，20页=500本）
+        workers: 并发抓取数，大于1时启用并发模式
+        rate: 并发模式下每秒允许的请求数（令牌桶限速）
+        backend: 页面解析后端，取值见 douban_parser.PARSER_BACKENDS
+        cache: HttpCache，为None时每次都重新下载
+        checkpoint: CrawlCheckpoint，传入时记录每页进度，出错的页面跳过而不中断爬取，
+            已完成的页面直接从检查点读取
+        sink: SinkFanout，传入时每页解析完成后立即按书单顺序写出
+        collect: 为False时不在内存中保留结果（配合sink使用），返回空列表
+        compact: 为True时结果保存在按列存储的 BookTable 中（见 douban_books），适合上百万本的书单
+        parse_workers: 并发模式下的解析进程数，大于0时抓取与解析分为流水线的两个阶段（见 douban_pipeline）
+        archive: PageArchive，传入时归档每个抓取到的页面，可用 douban_archive reparse 离线重新解析
     
     Returns:
-        list: 包含书籍信息的字典列表
+        list: 包含书籍信息的字典列表（compact 时为 BookTable）
     """
+    if workers > 1:
+        return crawl_all_douban_books_concurrent(doulist_url, max_pages, workers, rate, backend, cache, checkpoint,
+                                                 sink, collect, compact, parse_workers, archive)
     
-    # 设置请求头
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-    }
-    
-    books_data = []
-    session = requests.Session()
-    session.headers.update(headers)
+    books_data = BookTable() if compact else []
+    total_books = 0
+    session = create_session()
     
     page = 0
     start = 0
+    finished = False
     
-    print(f"开始爬取豆瓣书单: {doulist_url}")
-    print(f"计划爬取最多 {max_pages} 页，约 {max_pages * 25} 本书籍")
+    logger.info(f"开始爬取豆瓣书单: {doulist_url}")
+    logger.info(f"计划爬取最多 {max_pages} 页，约 {max_pages * 25} 本书籍")
     
     while page < max_pages:
         # 构建当前页面URL
-        if start == 0:
-            current_url = doulist_url
-        else:
-            # 替换URL中的start参数
-            current_url = re.sub(r'start=\d+', f'start={start}', doulist_url)
+        current_url = build_page_url(doulist_url, start)
+        
+        # 已在检查点中完成的页面直接复用
+        saved_page = checkpoint.get(start) if checkpoint else None
+        if saved_page is not None:
+            total_books += len(saved_page.books)
+            emit_page(saved_page.books, books_data, sink, collect)
+            logger.info(f"第 {page + 1} 页已在检查点中（{len(saved_page.books)} 本），跳过")
+            if not saved_page.has_next:
+                finished = True
+                break
+            start += 25
+            page += 1
+            continue
         
         try:
-            print(f"正在爬取第 {page + 1} 页...")
-            response = session.get(current_url, timeout=10)
-            response.raise_for_status()
-            response.encoding = 'utf-8'
+            logger.info(f"正在爬取第 {page + 1} 页...")
+            content = fetch_page(session, current_url, cache=cache, archive=archive)
             
-            soup = BeautifulSoup(response.text, 'html.parser')
-            items = soup.find_all('div', class_='doulist-item')
+            with METRICS.timer('parse'):
+                doulist_page = parse_doulist_page(content, backend, parse_single_book)
+            items = doulist_page.books
             
             if not items:
-                print(f"第 {page + 1} 页没有找到书籍，可能已到最后一页")
+                logger.info(f"第 {page + 1} 页没有找到书籍，可能已到最后一页")
+                finished = True
                 break
             
-            print(f"第 {page + 1} 页找到 {len(items)} 本书籍")
+            logger.info(f"第 {page + 1} 页找到 {len(items)} 本书籍")
             
             # 解析每本书的信息
-            page_books = 0
-            for i, item in enumerate(items):
-                book_info = parse_single_book(item)
+            page_books = []
+            for book_info in items:
                 if book_info['书名']:
-                    books_data.append(book_info)
-                    page_books += 1
-                    print(f"  ✓ {book_info['书名']} - {book_info['评分']}")
+                    page_books.append(book_info)
+                    logger.debug(f"  ✓ {book_info['书名']} - {book_info['评分']}")
+            METRICS.count('parse', len(page_books))
+            total_books += len(page_books)
+            emit_page(page_books, books_data, sink, collect)
+            
+            if checkpoint:
+                checkpoint.record_page(start, page_books, doulist_page.has_next, doulist_page.total_pages)
             
-            print(f"第 {page + 1} 页成功解析 {page_books} 本书籍")
-            print(f"累计已爬取 {len(books_data)} 本书籍")
+            logger.info(f"第 {page + 1} 页成功解析 {len(page_books)} 本书籍")
+            logger.info(f"累计已爬取 {total_books} 本书籍")
             
             # 检查是否还有下一页
-            next_page = soup.find('span', class_='next')
-            if not next_page or not next_page.find('a'):
-                print("没有找到下一页链接，爬取完成")
+            if not doulist_page.has_next:
+                logger.info("没有找到下一页链接，爬取完成")
+                finished = True
                 break
             
-            # 准备下一页
-            start += 25
-            page += 1
-            
-            # 添加延时
-            print("等待 2 秒...")
-            time.sleep(2)
+        except Exception as e:
+            if isinstance(e, requests.RequestException):
+                logger.warning(f"请求第 {page + 1} 页时出错: {e}")
+            else:
+                logger.warning(f"处理第 {page + 1} 页时出错: {e}")
             
+            # 没有检查点，或无法确定后面是否还有页面时停止
+            if checkpoint is None or checkpoint.total_pages is None or page + 1 >= checkpoint.total_pages:
+                if checkpoint:
+                    checkpoint.record_failure(start)
+                break
+            checkpoint.record_failure(start)
+            logger.warning(f"已记录第 {page + 1} 页失败，继续爬取后续页面")
+        
+        # 准备下一页
+        start += 25
+        page += 1
+        
+        # 添加延时（间隔随服务器的响应情况自适应调整）
+        delay = session.throttle.delay
+        logger.info(f"等待 {delay:.1f} 秒...")
+        time.sleep(delay)
+    else:
+        finished = True
+    
+    if checkpoint:
+        finish_checkpoint(checkpoint, finished)
+    
+    logger.info(f"爬取完成！共获取 {total_books} 本书籍")
+    return books_data
+
+def emit_page(page_books, books_data, sink=None, collect=True):
+    """把一页结果写入输出端，并按需保留在内存中"""
+    if sink is not None:
+        sink.put_many(page_books)
+    if collect:
+        books_data.extend(page_books)
+
+def finish_checkpoint(checkpoint, finished):
+    """爬取结束时处理检查点：全部成功则删除，否则保留以便 --resume"""
+    if finished and not checkpoint.failed:
+        checkpoint.complete()
+        return
+    checkpoint.close()
+    failed_pages = sorted(start // PAGE_SIZE + 1 for start in checkpoint.failed)
+    logger.warning(f"仍有未完成的页面 {failed_pages or ''}，进度已保存到 {checkpoint.path}，可使用 --resume 补抓")
+
+def crawl_all_douban_books_concurrent(doulist_url, max_pages=20, workers=4, rate=2.0, backend='html.parser', cache=None,
+                                      checkpoint=None, sink=None, collect=True, compact=False, parse_workers=0,
+                                      archive=None):
+    """
+    并发爬取豆瓣书单：先读取第一页的分页信息，一次性规划全部页面，
+    再由多个线程在令牌桶限速下并发抓取，结果按书单顺序返回
+    
+    Args:
+        doulist_url: 豆瓣书单URL
+        max_pages: 最大爬取页数
+        workers: 并发抓取数
+        rate: 每秒允许的请求数
+        backend: 页面解析后端
+        cache: HttpCache，为None时每次都重新下载
+        checkpoint: CrawlCheckpoint，传入时只抓取检查点中缺失的页面
+        sink: SinkFanout，传入时各页按书单顺序写出（先完成的后续页面等待前面的页面）
+        collect: 为False时不在内存中保留结果（配合sink使用），返回空列表
+        compact: 为True时结果保存在 BookTable 中
+        parse_workers: 解析进程数；为0时在抓取线程中解析，大于0时抓取线程只做I/O，
+            页面经有界队列交给解析进程池（见 douban_pipeline）
+        archive: PageArchive，传入时归档每个抓取到的页面
+    
+    Returns:
+        list: 包含书籍信息的字典列表（compact 时为 BookTable）
+    """
+    session = create_session(pool_size=workers)
+    bucket = TokenBucket(rate, capacity=workers)
+    
+    logger.info(f"开始并发爬取豆瓣书单: {doulist_url}")
+    logger.info(f"并发数 {workers}，限速 {rate} 次请求/秒")
+    
+    first_page = checkpoint.get(0) if checkpoint else None
+    if first_page is None:
+        try:
+            logger.info("正在爬取第 1 页...")
+            first_page = parse_page(fetch_page(session, doulist_url, bucket, cache, archive), backend)
         except requests.RequestException as e:
-            print(f"请求第 {page + 1} 页时出错: {e}")
-            break
-        except Exception as e:
-            print(f"处理第 {page + 1} 页时出错: {e}")
-            break
+            logger.warning(f"请求第 1 页时出错: {e}")
+            if checkpoint:
+                checkpoint.record_failure(0)
+                finish_checkpoint(checkpoint, False)
+            return BookTable() if compact else []
+        if checkpoint:
+            checkpoint.record_page(0, first_page.books, first_page.has_next, first_page.total_pages)
+    
+    offsets = plan_page_offsets(first_page.total_pages, max_pages)
+    if offsets is None:
+        logger.warning("无法从第一页读取总页数，改用逐页爬取")
+        return crawl_all_douban_books(doulist_url, max_pages, backend=backend, cache=cache, checkpoint=checkpoint,
+                                      sink=sink, collect=collect, compact=compact, archive=archive)
+    
+    page_results = {0: first_page.books}
+    # 检查点中已完成的页面轮到时才从检查点文件中读回
+    resumed = {start for start in checkpoint.pages if start in offsets} - {0} if checkpoint else set()
+    pending = [start for start in offsets if start not in page_results and start not in resumed]
+    
+    logger.info(f"共规划 {len(offsets)} 页，约 {len(offsets) * PAGE_SIZE} 本书籍，需抓取 {len(pending)} 页")
+    
+    books_data = BookTable() if compact else []
+    total_books = 0
+    failed_starts = set()
+    next_index = 0
+    
+    def emit_ready():
+        """按书单顺序写出已就绪的连续页面"""
+        nonlocal next_index, total_books
+        while next_index < len(offsets):
+            start = offsets[next_index]
+            if start in page_results or start in resumed:
+                page_books = page_results.pop(start) if start in page_results else checkpoint.get(start).books
+                total_books += len(page_books)
+                emit_page(page_books, books_data, sink, collect)
+            elif start not in failed_starts:
+                break
+            next_index += 1
+    
+    emit_ready()
+    
+    def record_result(start, doulist_page, error):
+        page_number = start // PAGE_SIZE + 1
+        if error is None:
+            page_results[start] = doulist_page.books
+            if checkpoint:
+                checkpoint.record_page(start, doulist_page.books, doulist_page.has_next, doulist_page.total_pages)
+            logger.info(f"第 {page_number} 页成功解析 {len(doulist_page.books)} 本书籍")
+        else:
+            if isinstance(error, requests.RequestException):
+                logger.warning(f"请求第 {page_number} 页时出错: {error}")
+            else:
+                logger.warning(f"处理第 {page_number} 页时出错: {error}")
+            failed_starts.add(start)
+            if checkpoint:
+                checkpoint.record_failure(start)
+        emit_ready()
     
-    print(f"\n爬取完成！共获取 {len(books_data)} 本书籍")
+    if parse_workers:
+        from douban_pipeline import CrawlPipeline
+        
+        def fetch(url):
+            return fetch_page(session, url, bucket, cache, archive)
+        
+        with CrawlPipeline(fetch, backend, workers, parse_workers) as pipeline:
+            for start in pending:
+                pipeline.submit(start, build_page_url(doulist_url, start))
+            for start, doulist_page, error in pipeline.results():
+                record_result(start, doulist_page, error)
+    else:
+        def fetch_and_parse(start):
+            content = fetch_page(session, build_page_url(doulist_url, start), bucket, cache, archive)
+            return parse_page(content, backend)
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(fetch_and_parse, start): start for start in pending}
+            for future in as_completed(futures):
+                try:
+                    doulist_page = future.result()
+                except Exception as e:
+                    record_result(futures[future], None, e)
+                    continue
+                record_result(futures[future], doulist_page, None)
+    
+    if checkpoint:
+        finish_checkpoint(checkpoint, True)
+    
+    logger.info(f"爬取完成！共获取 {total_books} 本书籍")
     return books_data
 
 def parse_single_book(item):
@@ -145,207 +384,295 @@ def parse_single_book(item):
         if abstract_div:
             abstract_text = abstract_div.get_text(strip=True)
             
-            # 使用正则表达式提取作者和出版社
-            author_match = re.search(r'作者[:：]\s*(.+?)(?=出版社|出版年|$)', abstract_text)
-            if author_match:
-                book_info['作者'] = author_match.group(1).strip()
-            
-            publisher_match = re.search(r'出版社[:：]\s*(.+?)(?=出版年|$)', abstract_text)
-            if publisher_match:
-                book_info['出版社'] = publisher_match.group(1).strip()
+            # 使用预编译的正则表达式提取作者和出版社
+            book_info['作者'], book_info['出版社'] = extract_author_publisher(abstract_text)
     
     except Exception as e:
-        print(f"解析书籍信息时出错: {e}")
+        logger.warning(f"解析书籍信息时出错: {e}")
     
     return book_info
 
-def download_image(url, filename):
-    """下载图片到本地"""
+def download_image(url, filename, session=None, cache=None):
+    """下载图片到本地，传入session时复用其连接池，传入cache时优先使用缓存"""
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
+        # 未传入session时使用进程内共享的会话，避免每张图片都新建连接
+        session = session or get_default_session()
+        content = fetch_bytes(session, url, cache, ttl=COVER_TTL, headers={'Accept': IMAGE_ACCEPT})
         
         with open(filename, 'wb') as f:
-            f.write(response.content)
+            f.write(content)
         return True
     except Exception as e:
-        print(f"下载图片失败 {url}: {e}")
+        logger.warning(f"下载图片失败 {url}: {e}")
         return False
 
-def create_excel_with_covers(books_data, excel_file='douban_books_with_covers.xlsx'):
-    """创建带封面的Excel文件"""
-    print(f"\n开始创建Excel文件: {excel_file}")
+def download_covers(books_data, covers_dir='book_covers', workers=8, cache=None, store=None):
+    """
+    使用有界线程池和共享连接池并发下载全部封面，存入按内容寻址的封面存储，
+    已存在的封面直接复用，相同封面只下载一次
     
-    # 创建工作簿
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "豆瓣书单"
+    Args:
+        books_data: 书籍信息列表
+        covers_dir: 封面存储目录
+        workers: 并发下载数
+        cache: HttpCache，为None时每次都重新下载
+        store: CoverStore，为None时使用 covers_dir 下的存储
     
-    # 设置列标题
-    headers = ['序号', '书名', '作者', '出版社', '评分', '书籍链接', '封面']
-    for col, header in enumerate(headers, 1):
-        ws.cell(row=1, column=col, value=header)
+    Returns:
+        list: 与books_data一一对应，成功为封面文件路径，失败或无封面为None
+    """
+    store = store or CoverStore(covers_dir)
+    session = create_session(pool_size=workers)
+    cover_paths = [None] * len(books_data)
+    
+    # 按封面键分组，相同封面只下载一次
+    indexes_by_key = {}
+    for index, book in enumerate(books_data):
+        if book['封面链接']:
+            indexes_by_key.setdefault(cover_key(book['封面链接']), []).append(index)
+    pending_keys = [key for key in indexes_by_key if not store.has(key)]
     
-    # 创建封面图片文件夹
+    def download(key):
+        url = books_data[indexes_by_key[key][0]]['封面链接']
+        try:
+            with METRICS.timer('cover_download'):
+                content = fetch_bytes(session, url, cache, ttl=COVER_TTL, headers={'Accept': IMAGE_ACCEPT})
+        except Exception as e:
+            logger.warning(f"下载图片失败 {url}: {e}")
+            return False
+        store.add(books_data[indexes_by_key[key][0]], content)
+        METRICS.count('cover_download')
+        return True
+    
+    logger.info(f"共 {len(indexes_by_key)} 张封面，已存在 {len(indexes_by_key) - len(pending_keys)} 张，"
+                f"开始并发下载 {len(pending_keys)} 张（并发数 {workers}）...")
+    
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        failed_keys = {key for key, ok in zip(pending_keys, executor.map(download, pending_keys)) if not ok}
+    
+    for key, indexes in indexes_by_key.items():
+        if key in failed_keys:
+            continue
+        path = store.path_for(key)
+        for index in indexes:
+            store.link(books_data[index], key)
+            cover_paths[index] = path
+    store.save()
+    session.close()
+    
+    logger.info(f"封面下载完成：成功 {len(pending_keys) - len(failed_keys)} 张，失败 {len(failed_keys)} 张")
+    return cover_paths
+
+def create_excel_with_covers(books_data, excel_file='douban_books_with_covers.xlsx', workers=8, cache=None):
+    """创建带封面的Excel文件，先并发下载全部封面，再逐行流式写入工作簿"""
+    from douban_excel import write_books_streaming
+    
+    # 创建封面图片文件夹并下载全部封面
     covers_dir = 'book_covers'
-    if not os.path.exists(covers_dir):
-        os.makedirs(covers_dir)
+    cover_paths = download_covers(books_data, covers_dir, workers, cache)
     
-    # 设置列宽
-    ws.column_dimensions['A'].width = 8   # 序号
-    ws.column_dimensions['B'].width = 30  # 书名
-    ws.column_dimensions['C'].width = 25  # 作者
-    ws.column_dimensions['D'].width = 20  # 出版社
-    ws.column_dimensions['E'].width = 8   # 评分
-    ws.column_dimensions['F'].width = 50  # 链接
-    ws.column_dimensions['G'].width = 15  # 封面
+    # 在进程池中批量生成缩略图
+    thumbnails, thumbnail_errors = thumbnail_covers([path for path in cover_paths if path])
     
-    # 设置行高
-    ws.row_dimensions[1].height = 20
+    def cover_status(book, image_filename):
+        if not book['封面链接']:
+            return "无封面"
+        if not image_filename:
+            return "封面下载失败"
+        return f"封面处理失败: {thumbnail_errors.get(image_filename, '')}"
     
+    print(f"\n开始创建Excel文件: {excel_file}")
     print(f"开始处理 {len(books_data)} 本书籍...")
     
-    for i, book in enumerate(books_data, 2):
-        print(f"处理第 {i-1} 本书: {book['书名']}")
-        
-        # 填充基本信息
-        ws.cell(row=i, column=1, value=i-1)  # 序号
-        ws.cell(row=i, column=2, value=book['书名'])  # 书名
-        ws.cell(row=i, column=3, value=book['作者'])  # 作者
-        ws.cell(row=i, column=4, value=book['出版社'])  # 出版社
-        ws.cell(row=i, column=5, value=book['评分'])  # 评分
-        ws.cell(row=i, column=6, value=book['书籍链接'])  # 链接
-        
-        # 下载并插入封面
-        if book['封面链接']:
-            try:
-                # 生成文件名
-                safe_title = re.sub(r'[^\w\s-]', '', book['书名'])[:20]  # 限制文件名长度
-                image_filename = f"{covers_dir}/cover_{i-1}_{safe_title}.jpg"
-                
-                # 下载图片
-                if download_image(book['封面链接'], image_filename):
-                    # 调整图片大小
-                    img = PILImage.open(image_filename)
-                    img.thumbnail((100, 140), PILImage.Resampling.LANCZOS)
-                    img.save(image_filename, 'JPEG', quality=85)
-                    
-                    # 插入到Excel
-                    excel_img = Image(image_filename)
-                    excel_img.width = 80
-                    excel_img.height = 112
-                    
-                    # 设置图片位置
-                    cell_ref = f'G{i}'
-                    ws.add_image(excel_img, cell_ref)
-                    
-                    # 设置行高以适应图片
-                    ws.row_dimensions[i].height = 90
-                    
-                    print(f"  ✓ 封面已添加")
-                else:
-                    ws.cell(row=i, column=7, value="封面下载失败")
-                    print(f"  ✗ 封面下载失败")
-                    
-            except Exception as e:
-                ws.cell(row=i, column=7, value=f"封面处理失败: {str(e)}")
-                print(f"  ✗ 封面处理失败: {e}")
-        else:
-            ws.cell(row=i, column=7, value="无封面")
-            print(f"  - 无封面链接")
-        
-        # 设置文本对齐
-        for col in range(1, 7):
-            ws.cell(row=i, column=col).alignment = Alignment(horizontal='left', vertical='center')
+    # 书籍与封面按位置对应
+    rows = ((book, thumbnails.get(path), None if path in thumbnails else cover_status(book, path))
+            for book, path in zip(books_data, cover_paths))
+    write_books_streaming(rows, excel_file, "豆瓣书单", '封面', progress_every=50)
     
-    # 保存Excel文件
-    wb.save(excel_file)
     print(f"\nExcel文件已保存: {excel_file}")
     print(f"封面图片已保存到: {covers_dir}/ 文件夹")
     
     return excel_file
 
-def save_data(books_data, csv_file='douban_books_all.csv', json_file='douban_books_all.json'):
-    """保存数据到文件"""
+def save_data(books_data, csv_file='douban_books_all.csv', json_file='douban_books_all.json', ndjson_file=None):
+    """
+    保存数据到文件（CSV、JSON和带偏移索引的NDJSON由各自的线程同时写出）
+    
+    除CSV和JSON外总是同时写出NDJSON及其 .idx 偏移索引（关闭时写出），load_books 据此按行号跳读。
+    
+    Args:
+        books_data: 书籍字典列表或 BookTable
+        ndjson_file: NDJSON文件，默认与 json_file 同名（扩展名为 .ndjson）
+    """
     if not books_data:
         print("没有数据可保存")
         return
     
-    # 保存为CSV
-    df = pd.DataFrame(books_data)
-    df.to_csv(csv_file, index=False, encoding='utf-8-sig')
-    print(f"数据已保存到 {csv_file}")
+    if ndjson_file is None:
+        ndjson_file = os.path.splitext(json_file)[0] + '.ndjson'
     
-    # 保存为JSON
-    with open(json_file, 'w', encoding='utf-8') as f:
-        json.dump(books_data, f, ensure_ascii=False, indent=2)
+    # 补充过详情时书籍字典带有额外字段，CSV列与之保持一致；紧凑书籍表逐条转换为字典写出
+    if isinstance(books_data, BookTable):
+        columns, rows = books_data.columns, books_data.iter_dicts()
+    else:
+        columns, rows = list(books_data[0].keys()), books_data
+    with METRICS.timer('save'), SinkFanout(create_sinks(csv_file=csv_file, json_file=json_file,
+                                                          ndjson_file=ndjson_file, columns=columns)) as fanout:
+        fanout.put_many(rows)
+    METRICS.count('save', len(books_data))
+    print(f"数据已保存到 {csv_file}")
     print(f"数据已保存到 {json_file}")
 
 def print_statistics(books_data):
-    """打印统计信息"""
-    if not books_data:
+    """打印统计信息（向量化计算，见 douban_analytics）"""
+    from douban_analytics import BookAnalytics
+    
+    BookAnalytics.from_books(books_data).print_report()
+
+def print_statistics_from_store(store):
+    """打印 BookStore（SQL查询）或 StatsSink（边写边统计）的统计信息，不需要把书籍载入内存"""
+    total, rated, average, highest, lowest = store.rating_summary()
+    if not total:
         print("没有数据可统计")
         return
     
     print(f"\n=== 统计信息 ===")
-    print(f"总书籍数量: {len(books_data)}")
-    
-    # 有评分的书籍
-    rated_books = [book for book in books_data if book['评分']]
-    print(f"有评分的书籍: {len(rated_books)}")
-    
-    # 评分统计
-    if rated_books:
-        scores = [float(book['评分']) for book in rated_books if book['评分']]
-        if scores:
-            print(f"平均评分: {sum(scores)/len(scores):.2f}")
-            print(f"最高评分: {max(scores)}")
-            print(f"最低评分: {min(scores)}")
-    
-    # 出版社统计
-    publishers = [book['出版社'] for book in books_data if book['出版社']]
-    if publishers:
-        from collections import Counter
-        publisher_counts = Counter(publishers)
+    print(f"总书籍数量: {total}")
+    print(f"有评分的书籍: {rated}")
+    if rated:
+        print(f"平均评分: {average:.2f}")
+        print(f"最高评分: {highest}")
+        print(f"最低评分: {lowest}")
+    
+    publisher_counts = store.top_publishers(5)
+    if publisher_counts:
         print(f"\n出版社分布 (前5名):")
-        for publisher, count in publisher_counts.most_common(5):
+        for publisher, count in publisher_counts:
             print(f"  {publisher}: {count}本")
 
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description='豆瓣书单爬虫 - 增强版')
+    parser.add_argument('--workers', type=int, default=1, help='并发抓取数，大于1时启用并发模式')
+    parser.add_argument('--rate', type=float, default=2.0, help='并发模式下每秒允许的请求数')
+    parser.add_argument('--parser', choices=PARSER_BACKENDS, default='html.parser', help='页面解析后端')
+    parser.add_argument('--parse-workers', type=int, default=0,
+                        help='并发模式下的解析进程数，大于0时抓取线程只做I/O，解析在进程池中进行')
+    parser.add_argument('--cover-workers', type=int, default=8, help='封面并发下载数')
+    parser.add_argument('--cache-dir', default='http_cache', help='HTTP缓存目录')
+    parser.add_argument('--cache-size', type=int, default=512, help='HTTP缓存大小上限（MB）')
+    parser.add_argument('--no-cache', action='store_true', help='不使用HTTP缓存')
+    parser.add_argument('--checkpoint', default=DEFAULT_CHECKPOINT_FILE, help='检查点文件')
+    parser.add_argument('--resume', action='store_true', help='从检查点恢复，只补抓缺失的页面')
+    parser.add_argument('--stream', action='store_true', help='边爬边写出CSV和JSON，而不是结束后一次性保存')
+    parser.add_argument('--ndjson', help='边爬边写出的 JSON Lines 文件（默认 douban_books_all.ndjson，隐含 --stream）')
+    parser.add_argument('--db', help='边爬边写入的SQLite书籍库（隐含 --stream）')
+    parser.add_argument('--details', action='store_true', help='抓取详情页补充 ISBN、页数、定价、出版年和评价人数')
+    parser.add_argument('--detail-workers', type=int, default=4, help='详情页并发抓取数')
+    parser.add_argument('--detail-rate', type=float, default=1.0, help='详情页每秒允许的请求数')
+    parser.add_argument('--compact', action='store_true',
+                        help='爬取结果按列紧凑存储（适合超大书单，不能与 --details 同时使用）')
+    parser.add_argument('--search-index', help='爬取完成后把结果增量加入该搜索索引文件（见 douban_search.py）')
+    parser.add_argument('--archive', help='把抓取到的书单页面压缩归档到该目录，可用 douban_archive.py reparse 离线重新解析')
+    parser.add_argument('--log-level', choices=LOG_LEVELS, default='INFO', help='日志级别，DEBUG 时输出每本书')
+    parser.add_argument('--log-format', choices=LOG_FORMATS, default='text',
+                        help='日志格式：text 为带时间、级别和来源的文本，kv 为 key=value 行，json 为JSON行')
+    parser.add_argument('--metrics-file', default=DEFAULT_METRICS_FILE,
+                        help='运行指标文件（.prom 为 Prometheus 文本格式，其余为JSON）')
+    args = parser.parse_args()
+    if args.compact and args.details:
+        parser.error('--compact 不能与 --details 同时使用')
+    setup_logging(args.log_level, args.log_format)
+    
+    cache = None if args.no_cache else HttpCache(args.cache_dir, args.cache_size * 1024 * 1024)
+    
     # 目标豆瓣书单URL
-    doulist_url = "https://www.douban.com/doulist/45298673/?start=0&sort=seq&playable=0&sub_type="
+    doulist_url = DEFAULT_DOULIST_URL
+    
+    checkpoint = CrawlCheckpoint(args.checkpoint, doulist_url, resume=args.resume)
+    
+    # 流式输出：每页解析完成后立即写出，结果不保留在内存中（补充详情时需要全部书籍，仍然保留）
+    sink = None
+    stats_sink = None
+    ndjson_file = args.ndjson or 'douban_books_all.ndjson'
+    if args.stream or args.ndjson or args.db:
+        stats_sink = StatsSink()
+        sink = SinkFanout(create_sinks(csv_file='douban_books_all.csv', json_file='douban_books_all.json',
+                                       ndjson_file=ndjson_file, db_file=args.db) + [stats_sink])
+    collect = sink is None or args.details
+    archive = PageArchive(args.archive) if args.archive else None
     
     try:
         # 开始爬取（爬取20页，约500本书）
-        books_data = crawl_all_douban_books(doulist_url, max_pages=20)
+        try:
+            books_data = crawl_all_douban_books(doulist_url, max_pages=20, workers=args.workers, rate=args.rate,
+                                                backend=args.parser, cache=cache, checkpoint=checkpoint, sink=sink,
+                                                compact=args.compact, parse_workers=args.parse_workers,
+                                                archive=archive, collect=collect)
+        finally:
+            if sink is not None:
+                sink.close()
+            if archive is not None:
+                archive.close()
         
-        if books_data:
-            # 保存数据
-            save_data(books_data)
+        # 流式输出时，搜索索引和带封面的Excel逐行读取刚写出的NDJSON（封面按行号随机读取），
+        # 不把全部书籍载入内存
+        reader = NdjsonReader(ndjson_file) if not collect and sink.count else None
+        try:
+            if reader is not None:
+                books_data = reader
             
-            # 创建带封面的Excel文件
-            excel_file = create_excel_with_covers(books_data)
+            if books_data:
+                # 补充详情（结果按书籍链接缓存，已抓取过的书不再请求）
+                if args.details:
+                    detail_cache = DetailCache()
+                    try:
+                        enrich_books(books_data, args.detail_workers, args.detail_rate, detail_cache)
+                    finally:
+                        detail_cache.close()
             
-            # 统计信息
-            print_statistics(books_data)
+                # 保存数据（流式输出的文件不含详情，补充后重新保存）
+                if sink is None or args.details:
+                    save_data(books_data)
             
-            print(f"\n=== 完成 ===")
-            print(f"✓ 成功爬取 {len(books_data)} 本书籍")
-            print(f"✓ 数据已保存为CSV和JSON格式")
-            print(f"✓ 带封面的Excel文件已生成: {excel_file}")
-            print(f"✓ 封面图片已下载到 book_covers/ 文件夹")
+                if args.search_index:
+                    update_index(books_data, args.search_index)
             
-        else:
-            print("没有爬取到任何数据")
+                # 创建带封面的Excel文件
+                excel_file = create_excel_with_covers(books_data, workers=args.cover_workers, cache=cache)
+            
+                # 统计信息：写入了书籍库时直接在库中用SQL统计，流式输出时使用边写边统计的结果
+                if args.db:
+                    with BookStore(args.db) as store:
+                        print_statistics_from_store(store)
+                elif stats_sink is not None:
+                    print_statistics_from_store(stats_sink)
+                else:
+                    print_statistics(books_data)
+                REQUEST_TIMER.print_summary()
+            
+                print(f"\n=== 完成 ===")
+                print(f"✓ 成功爬取 {len(books_data)} 本书籍")
+                print(f"✓ 数据已保存为CSV和JSON格式")
+                print(f"✓ 带封面的Excel文件已生成: {excel_file}")
+                print(f"✓ 封面图片已下载到 book_covers/ 文件夹")
+            
+            else:
+                print("没有爬取到任何数据")
+        finally:
+            if reader is not None:
+                reader.close()
     
     except KeyboardInterrupt:
+        checkpoint.close()
         print("\n用户中断爬取")
+        if os.path.exists(checkpoint.path):
+            print(f"已完成的页面已保存到 {checkpoint.path}，使用 --resume 继续")
     except Exception as e:
         print(f"程序执行出错: {e}")
+    
+    METRICS.print_summary()
+    print(f"运行指标已保存到 {METRICS.dump(args.metrics_file)}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+"""评分分布：区间标签与 np.histogram 的计数方式一致，满分计入最后一个两端闭合的区间"""
+
+from douban_analytics import BookAnalytics
+
+
+def test_rating_histogram_labels_match_counts():
+    ratings = [9.5, 10.0, 10.0, 0.0, 7.4]
+    books = [{'书名': f'书{index}', '作者': '', '出版社': '', '评分': str(rating), '书籍链接': ''}
+             for index, rating in enumerate(ratings + [''])]
+    histogram = BookAnalytics.from_books(books).rating_histogram()
+
+    assert histogram.sum() == 5
+    last = histogram.index[-1]
+    assert (last.left, last.right, last.closed) == (9.5, 10.0, 'both')
+    assert 10.0 in last and histogram.iloc[-1] == 3
+    assert all(interval.closed == 'left' for interval in histogram.index[:-1])
+    # 每个区间的数量等于落在该区间标签内的评分数
+    for interval, count in histogram.items():
+        assert count == sum(rating in interval for rating in ratings)
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""页面归档：写入与按时刻读取、分段滚动与重建索引，以及离线重新解析"""
+
+import json
+import os
+
+from benchmarks.fake_douban import doulist_page
+from douban_archive import PageArchive, doulist_page_key, reparse_archive, save_reparsed
+
+BASE_URL = 'http://douban.test'
+LIST_URL = 'https://www.douban.com/doulist/123/'
+
+
+def page_bytes(item_count, start):
+    return doulist_page(BASE_URL, '/doulist/123/', item_count, start, cover_count=7).encode('utf-8')
+
+
+def test_add_and_get_versions(tmp_path):
+    with PageArchive(str(tmp_path / 'archive')) as archive:
+        assert archive.add('u', b'v1', fetched_at=100)
+        # 内容未变化时不重复写入
+        assert not archive.add('u', b'v1', fetched_at=150)
+        assert archive.add('u', b'v2', fetched_at=200)
+
+        assert archive.get('u') == b'v2'
+        assert archive.get('u', at=199) == b'v1'
+        assert archive.get('u', at=50) is None
+        assert archive.get('other') is None
+        assert archive.stats()[:3] == (2, 1, 4)
+
+
+def test_segments_roll_over_and_index_rebuilds(tmp_path):
+    archive_dir = str(tmp_path / 'archive')
+    contents = {f'u{index}': os.urandom(200) for index in range(6)}
+    with PageArchive(archive_dir, segment_bytes=500, level=0) as archive:
+        for fetched_at, (url, content) in enumerate(contents.items(), 1):
+            archive.add(url, content, fetched_at=fetched_at)
+        latest = archive.latest()
+    assert len([name for name in os.listdir(archive_dir) if name.startswith('segment_')]) > 1
+
+    # 删除索引后从分段文件重建，读取结果不变
+    os.remove(os.path.join(archive_dir, 'index.sqlite3'))
+    with PageArchive(archive_dir) as archive:
+        assert archive.latest() == []
+        assert archive.rebuild_index() == 6
+        assert archive.latest() == latest
+        assert all(archive.get(url) == content for url, content in contents.items())
+
+
+def test_rebuild_skips_truncated_record(tmp_path):
+    archive_dir = str(tmp_path / 'archive')
+    with PageArchive(archive_dir) as archive:
+        archive.add('u1', b'first', fetched_at=1)
+        archive.add('u2', b'second' * 100, fetched_at=2)
+    segment = os.path.join(archive_dir, 'segment_00001.dat')
+    with open(segment, 'r+b') as f:
+        f.truncate(os.path.getsize(segment) - 10)
+
+    with PageArchive(archive_dir) as archive:
+        assert archive.rebuild_index() == 1
+        assert archive.get('u1') == b'first'
+
+
+def test_doulist_page_key():
+    assert doulist_page_key('https://www.douban.com/doulist/123/?start=50&sort=seq') == (LIST_URL, 50)
+    assert doulist_page_key('https://www.douban.com/doulist/123/') == (LIST_URL, 0)
+    assert doulist_page_key('https://img9.doubanio.com/view/subject/s/public/s1.jpg') is None
+
+
+def test_reparse_round_trip(tmp_path, monkeypatch):
+    archive_dir = str(tmp_path / 'archive')
+    with PageArchive(archive_dir) as archive:
+        for start in (0, 25, 50):
+            archive.add(f'{LIST_URL}?start={start}&sort=seq', page_bytes(60, start), fetched_at=100)
+
+    books_by_list = reparse_archive(archive_dir, workers=1)
+    books = books_by_list[LIST_URL]
+    assert [book['书名'] for book in books] == [f'测试书名 {index} & 副标题' for index in range(60)]
+
+    # 只保存到输出目录，不覆盖工作目录中的爬取结果
+    monkeypatch.chdir(tmp_path)
+    save_reparsed(books_by_list, 'out')
+    assert not os.path.exists('douban_books_all.json')
+    with open(os.path.join('out', 'doulist_123.json'), encoding='utf-8') as f:
+        assert json.load(f) == books
+
+
+def test_reparse_drops_stale_pages_and_duplicates(tmp_path):
+    archive_dir = str(tmp_path / 'archive')
+    with PageArchive(archive_dir) as archive:
+        for start in (0, 25, 50):
+            archive.add(f'{LIST_URL}?start={start}', page_bytes(60, start), fetched_at=100)
+        # 之后书单缩短为两页，第一页的书籍整体后移了一本，第二页未变化（不重复归档）
+        archive.add(f'{LIST_URL}?start=0', page_bytes(45, 1), fetched_at=200)
+        archive.add(f'{LIST_URL}?start=25', page_bytes(60, 25), fetched_at=200)
+
+    books = reparse_archive(archive_dir, [LIST_URL], workers=1)[LIST_URL]
+    links = [book['书籍链接'] for book in books]
+    assert len(links) == len(set(links)) == 49
+    assert links[0] == f'{BASE_URL}/subject/1000001/'
+    assert links[-1] == f'{BASE_URL}/subject/1000049/'
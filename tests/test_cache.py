@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""HTTP缓存：新鲜条目直接返回，过期后条件请求重新验证，按最久未访问淘汰"""
+
+import os
+
+import pytest
+
+import douban_cache
+from douban_cache import HttpCache, fetch_bytes
+
+URL = 'https://www.douban.com/doulist/1/?start=0'
+
+
+class Clock:
+    """替换 douban_cache 中的 time 模块，测试中手动推进时间"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+class Response:
+    def __init__(self, status_code, content=b'', headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(self.status_code)
+
+
+class Session:
+    """按顺序返回预设响应，并记录每次请求的请求头"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.requests.append(dict(headers or {}))
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(douban_cache, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    cache = HttpCache(str(tmp_path / 'cache'), max_bytes=10)
+    yield cache
+    cache.close()
+
+
+def test_fresh_entry_is_served_without_request(cache):
+    session = Session(Response(200, b'page', {'ETag': '"v1"'}))
+    assert fetch_bytes(session, URL, cache, ttl=60) == b'page'
+    assert fetch_bytes(session, URL, cache, ttl=60) == b'page'
+    assert len(session.requests) == 1
+
+
+def test_expired_entry_is_revalidated(cache, clock):
+    session = Session(Response(200, b'page', {'ETag': '"v1"', 'Last-Modified': 'Sat, 01 Jan 2022 00:00:00 GMT'}),
+                      Response(304))
+    fetch_bytes(session, URL, cache, ttl=60)
+    clock.now += 61
+
+    assert fetch_bytes(session, URL, cache, ttl=60) == b'page'
+    assert session.requests[1] == {'If-None-Match': '"v1"', 'If-Modified-Since': 'Sat, 01 Jan 2022 00:00:00 GMT'}
+
+    # 304 之后有效期重新计算，再次请求直接命中
+    clock.now += 30
+    assert fetch_bytes(session, URL, cache, ttl=60) == b'page'
+    assert len(session.requests) == 2
+
+
+def test_changed_page_replaces_entry(cache, clock):
+    session = Session(Response(200, b'old', {'ETag': '"v1"'}), Response(200, b'new', {'ETag': '"v2"'}))
+    fetch_bytes(session, URL, cache, ttl=60)
+    clock.now += 61
+
+    assert fetch_bytes(session, URL, cache, ttl=60) == b'new'
+    assert cache.lookup(URL).etag == '"v2"'
+
+
+def test_missing_body_refetches_without_validators(cache, clock):
+    session = Session(Response(200, b'page', {'ETag': '"v1"'}), Response(200, b'page2'))
+    fetch_bytes(session, URL, cache, ttl=60)
+    os.remove(cache._body_path(cache.lookup(URL).key))
+
+    assert fetch_bytes(session, URL, cache, ttl=60) == b'page2'
+    assert session.requests[1] == {}
+
+
+def test_evicts_least_recently_used(cache, clock):
+    for name in ('a', 'b', 'c'):
+        cache.store(name, b'1234')
+        clock.now += 1
+    # 总大小 12 > 10：最早存入的 a 被淘汰
+    assert cache.lookup('a') is None
+
+    # 访问 b 之后再存入 d，淘汰的是最久未访问的 c
+    cache.read(cache.lookup('b'))
+    clock.now += 1
+    cache.store('d', b'1234')
+
+    assert cache.lookup('c') is None
+    assert cache.lookup('b') is not None and cache.lookup('d') is not None
+    assert cache.total_size() == 8
+    assert len([name for _, _, names in os.walk(cache.cache_dir) for name in names if name.endswith('.bin')]) == 2
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""爬取检查点：内存中只保留页面元数据，恢复时从文件读回书籍"""
+
+from douban_checkpoint import CrawlCheckpoint
+
+URL = 'https://www.douban.com/doulist/1/'
+
+
+def books(start):
+    return [{'书名': f'书{index}', '书籍链接': f'https://book.douban.com/subject/{index}/'}
+            for index in range(start, start + 3)]
+
+
+def test_resume_reads_books_back(tmp_path):
+    path = str(tmp_path / 'checkpoint.jsonl')
+    checkpoint = CrawlCheckpoint(path, URL)
+    checkpoint.record_page(0, books(0), True, 3)
+    checkpoint.record_failure(25)
+    checkpoint.record_page(50, books(50), False, 3)
+    # 本次运行中记录的页面也能读回
+    assert checkpoint.get(50).books == books(50)
+    checkpoint.close()
+
+    resumed = CrawlCheckpoint(path, URL, resume=True)
+    assert sorted(resumed.pages) == [0, 50]
+    assert not hasattr(resumed.pages[0], 'books')
+    assert resumed.failed == {25}
+    assert resumed.total_pages == 3
+    assert resumed.get(0) == (0, books(0), True, 3)
+    assert resumed.get(25) is None
+
+    # 失败的页面补抓成功后，再次恢复时不再算作失败
+    resumed.record_page(25, books(25), True, 3)
+    resumed.close()
+    again = CrawlCheckpoint(path, URL, resume=True)
+    assert again.failed == set()
+    assert [again.get(start).books for start in (0, 25, 50)] == [books(0), books(25), books(50)]
+    again.close()
+
+
+def test_half_written_line_is_ignored(tmp_path):
+    path = str(tmp_path / 'checkpoint.jsonl')
+    checkpoint = CrawlCheckpoint(path, URL)
+    checkpoint.record_page(0, books(0), True, 2)
+    checkpoint.close()
+    with open(path, 'ab') as f:
+        f.write('{"start": 25, "books": [{"书名": "写了一半'.encode('utf-8'))
+
+    resumed = CrawlCheckpoint(path, URL, resume=True)
+    assert sorted(resumed.pages) == [0]
+    assert resumed.get(0).books == books(0)
+    # 残缺的行已被截掉，补抓的页面写在新的一行
+    resumed.record_page(25, books(25), False, 2)
+    resumed.close()
+    again = CrawlCheckpoint(path, URL, resume=True)
+    assert again.get(25).books == books(25)
+    again.close()
+
+
+def test_other_doulist_starts_over(tmp_path):
+    path = str(tmp_path / 'checkpoint.jsonl')
+    checkpoint = CrawlCheckpoint(path, URL)
+    checkpoint.record_page(0, books(0), True, 2)
+    checkpoint.close()
+
+    other = CrawlCheckpoint(path, 'https://www.douban.com/doulist/2/', resume=True)
+    assert other.pages == {}
+    other.complete()
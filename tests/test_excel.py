@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""流式Excel导出：每行的图片和G列文本按位置对应；带封面的全量导出显示缩略图错误"""
+
+import io
+
+import pytest
+
+pytest.importorskip('openpyxl')
+PIL_Image = pytest.importorskip('PIL.Image')
+
+from openpyxl import load_workbook
+
+from douban_covers import CoverStore
+from douban_excel import write_books_streaming
+from douban_illustrated import export_illustrated
+
+
+def book(number, cover=True):
+    return {'书名': f'书{number}', '作者': '作者', '出版社': '出版社', '评分': '8.0',
+            '封面链接': f'https://img.test/s{number}.jpg' if cover else '',
+            '书籍链接': f'https://book.douban.com/subject/{number}/'}
+
+
+def jpeg_bytes(color='red'):
+    output = io.BytesIO()
+    PIL_Image.new('RGB', (60, 90), color).save(output, 'JPEG')
+    return output.getvalue()
+
+
+def column_g(path):
+    ws = load_workbook(path).active
+    return [ws.cell(row, 7).value for row in range(2, ws.max_row + 1)], len(ws._images)
+
+
+def test_rows_are_written_in_order(tmp_path):
+    path = str(tmp_path / 'books.xlsx')
+    # 同一个书籍对象出现两次，各行的图片和文本仍按位置对应
+    shared = book(1)
+    rows = [(shared, None, '第一行'), (book(2), jpeg_bytes(), '不写出'), (shared, None, None)]
+
+    assert write_books_streaming(iter(rows), path, progress_every=0) == 3
+    assert column_g(path) == (['第一行', None, None], 1)
+    ws = load_workbook(path).active
+    assert [ws.cell(row, 2).value for row in range(2, 5)] == ['书1', '书2', '书1']
+
+
+def test_illustrated_export_statuses(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    store = CoverStore('covers')
+    books = [book(0), book(1), book(2), book(3, cover=False)]
+    store.add(books[0], jpeg_bytes())
+    store.add(books[1], b'not an image')
+    store.save()
+
+    files = export_illustrated(books, 'out', 'covers', workers=1)
+
+    statuses, images = column_g(files[0])
+    assert images == 1
+    assert statuses[0] is None
+    assert statuses[1].startswith('缩略图失败')
+    assert statuses[2:] == ['封面文件未找到', '无封面']
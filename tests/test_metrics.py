@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""日志格式：key=value 与 JSON 行都带时间、级别、来源和消息"""
+
+import json
+import logging
+
+from douban_metrics import JsonFormatter, KeyValueFormatter
+
+
+def make_record(message, level=logging.WARNING):
+    return logging.LogRecord('enhanced_douban_spider', level, __file__, 1, message, None, None)
+
+
+def test_key_value_format():
+    line = KeyValueFormatter().format(make_record('请求第 3 页时出错: "timeout"'))
+    fields = line.split(' ', 3)
+    assert fields[0].startswith('time=') and '"' not in fields[0]
+    assert fields[1:3] == ['level=WARNING', 'logger=enhanced_douban_spider']
+    assert fields[3] == 'msg=' + json.dumps('请求第 3 页时出错: "timeout"', ensure_ascii=False)
+    line = KeyValueFormatter().format(make_record('完成', logging.INFO))
+    assert line.endswith('level=INFO logger=enhanced_douban_spider msg=完成')
+
+
+def test_json_format():
+    record = json.loads(JsonFormatter().format(make_record('第 1 页成功解析 25 本书籍', logging.INFO)))
+    assert record['level'] == 'INFO'
+    assert record['logger'] == 'enhanced_douban_spider'
+    assert record['msg'] == '第 1 页成功解析 25 本书籍'
+    assert record['time']
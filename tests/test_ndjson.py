@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""NDJSON偏移索引：按行号区间读取，索引缺失或过期时重建；load_books 只读取已完整写出的NDJSON"""
+
+import json
+import os
+
+import pytest
+
+from create_excel_simple import load_books
+from douban_ndjson import NdjsonReader, NdjsonWriter, build_index, index_is_current, index_path
+
+
+def write_records(path, records, batch=3, write_index=True):
+    writer = NdjsonWriter(path, write_index=write_index)
+    for start in range(0, len(records), batch):
+        writer.write_many(records[start:start + batch])
+    writer.close()
+
+
+def test_round_trip_and_ranges(tmp_path):
+    path = str(tmp_path / 'books.ndjson')
+    records = [{'书名': f'书{index}', '评分': f'{index % 10}.0', '备注': '换行\n与"引号"'} for index in range(10)]
+    write_records(path, records)
+
+    with NdjsonReader(path) as reader:
+        assert len(reader) == 10
+        assert list(reader) == records
+        assert reader.read(3, 6) == records[3:6]
+        assert reader.read(8, 100) == records[8:]
+        assert reader.read(12) == []
+        assert reader[7] == records[7]
+        with pytest.raises(IndexError):
+            reader[10]
+
+
+def test_index_matches_scan(tmp_path):
+    path = str(tmp_path / 'books.ndjson')
+    write_records(path, [{'n': index} for index in range(7)])
+    with open(index_path(path), 'rb') as f:
+        assert f.read() == build_index(path).tobytes()
+
+
+def test_missing_index_is_rebuilt(tmp_path):
+    path = str(tmp_path / 'books.ndjson')
+    records = [{'n': index} for index in range(5)]
+    write_records(path, records, write_index=False)
+    assert not os.path.exists(index_path(path))
+
+    with NdjsonReader(path) as reader:
+        assert reader.read(2, 4) == records[2:4]
+    assert os.path.exists(index_path(path))
+
+
+def test_stale_index_is_rebuilt(tmp_path):
+    path = str(tmp_path / 'books.ndjson')
+    write_records(path, [{'n': 0}, {'n': 1}])
+    # 之后又追加了一行，索引中的文件长度对不上
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({'n': 2}) + '\n')
+
+    with NdjsonReader(path) as reader:
+        assert len(reader) == 3
+        assert reader.read(2) == [{'n': 2}]
+
+
+def test_empty_file(tmp_path):
+    path = str(tmp_path / 'empty.ndjson')
+    write_records(path, [])
+    with NdjsonReader(path) as reader:
+        assert len(reader) == 0
+        assert list(reader) == []
+
+
+def test_index_is_current(tmp_path):
+    path = str(tmp_path / 'books.ndjson')
+    assert not index_is_current(path)
+    write_records(path, [{'n': 0}, {'n': 1}])
+    assert index_is_current(path)
+
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({'n': 2}) + '\n')
+    assert not index_is_current(path)
+
+
+def test_load_books_prefers_complete_ndjson(tmp_path):
+    json_file = str(tmp_path / 'books.json')
+    ndjson_file = str(tmp_path / 'books.ndjson')
+    write_records(ndjson_file, [{'书名': 'NDJSON'}])
+    with open(json_file, 'w', encoding='utf-8') as f:
+        json.dump([{'书名': 'JSON'}], f, ensure_ascii=False)
+
+    # 与修改时间无关：索引与NDJSON一致即读取NDJSON
+    os.utime(ndjson_file, (1000, 1000))
+    books, count = load_books(json_file=json_file, ndjson_file=ndjson_file)
+    assert (list(books), count) == ([{'书名': 'NDJSON'}], 1)
+
+    # 没有写完的NDJSON（索引尚未写出）：读取JSON
+    os.remove(index_path(ndjson_file))
+    books, count = load_books(json_file=json_file, ndjson_file=ndjson_file)
+    assert (list(books), count) == ([{'书名': 'JSON'}], 1)
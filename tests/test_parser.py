@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""书单页面解析：三种后端的结果一致，分页信息的各种来源"""
+
+import pytest
+
+from benchmarks.fake_douban import doulist_page
+from douban_parser import PARSER_BACKENDS, compute_total_pages, extract_author_publisher, parse_doulist_page
+from enhanced_douban_spider import parse_single_book
+
+BASE_URL = 'http://douban.test'
+
+
+def page_bytes(item_count, start):
+    return doulist_page(BASE_URL, '/doulist/1/', item_count, start, cover_count=7).encode('utf-8')
+
+
+@pytest.mark.parametrize('backend', PARSER_BACKENDS)
+def test_parses_books_and_pagination(backend):
+    page = parse_doulist_page(page_bytes(60, 0), backend, parse_single_book)
+
+    assert len(page.books) == 25
+    assert page.books[3] == {
+        '书名': '测试书名 3 & 副标题',
+        '作者': '作者3',
+        '出版社': '出版社3',
+        '评分': '6.3',
+        '封面链接': f'{BASE_URL}/cover/3.jpg',
+        '书籍链接': f'{BASE_URL}/subject/1000003/',
+    }
+    assert page.total_pages == 3
+    assert page.has_next
+
+
+@pytest.mark.parametrize('backend', PARSER_BACKENDS)
+def test_last_page_has_no_next(backend):
+    page = parse_doulist_page(page_bytes(60, 50), backend, parse_single_book)
+
+    assert [book['书名'] for book in page.books] == [f'测试书名 {index} & 副标题' for index in range(50, 60)]
+    assert page.total_pages == 3
+    assert not page.has_next
+
+
+def test_backends_agree():
+    content = page_bytes(40, 25)
+    results = [parse_doulist_page(content, backend, parse_single_book) for backend in PARSER_BACKENDS]
+    assert all(result == results[0] for result in results[1:])
+
+
+def test_soup_backends_require_parse_item():
+    with pytest.raises(ValueError):
+        parse_doulist_page(page_bytes(1, 0), 'html.parser')
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        parse_doulist_page(page_bytes(1, 0), 'regex', parse_single_book)
+
+
+def test_total_pages_sources():
+    # 分页器属性优先，其次是分页链接中最大的 start，再次是“共N本”
+    assert compute_total_pages('7', ['?start=50'], '(共 300 本)', True) == 7
+    assert compute_total_pages(None, ['?start=25', '?start=100'], '', True) == 5
+    assert compute_total_pages(None, [], '(共 51 本)', True) == 3
+    assert compute_total_pages(None, [], '', False) == 1
+    assert compute_total_pages(None, [], '', True) is None
+
+
+def test_extract_author_publisher():
+    assert extract_author_publisher('作者: 刘慈欣 出版社: 重庆出版社 出版年: 2008-1') == ('刘慈欣', '重庆出版社')
+    assert extract_author_publisher('作者：[英] 乔治·奥威尔出版社：上海译文出版社') == ('[英] 乔治·奥威尔', '上海译文出版社')
+    assert extract_author_publisher('出版年: 2008') == ('', '')
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""SQLite工作队列：去重入队、租约领取、租约过期后被接管、失败重试"""
+
+import pytest
+
+import douban_queue
+from douban_queue import DONE, FAILED, LEASED, PENDING, WorkQueue
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(douban_queue, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def queue_file(tmp_path):
+    return str(tmp_path / 'queue.db')
+
+
+@pytest.fixture
+def queue(queue_file, clock):
+    with WorkQueue(queue_file, max_attempts=2) as queue:
+        yield queue
+
+
+def test_enqueue_ignores_duplicates(queue):
+    assert queue.enqueue('page', [{'start': 0}, {'start': 25}]) == 2
+    assert queue.enqueue('page', [{'start': 25}, {'start': 50}]) == 1
+    assert queue.counts() == {'page': {PENDING: 3}}
+
+
+def test_lists_keep_insertion_order(queue):
+    queue.add_lists(['b', 'a'])
+    queue.add_lists(['a', 'c'])
+    assert queue.lists() == ['b', 'a', 'c']
+
+
+def test_claim_in_order_and_complete(queue):
+    queue.enqueue('page', [{'start': 0}, {'start': 25}])
+
+    first = queue.claim('w1')
+    second = queue.claim('w2')
+    assert first[1:] == ('page', {'start': 0})
+    assert second[1:] == ('page', {'start': 25})
+    assert queue.claim('w3') is None
+
+    assert queue.complete(first[0], 'w1', ['book'])
+    assert queue.results('page') == [({'start': 0}, ['book'])]
+    assert queue.counts() == {'page': {DONE: 1, LEASED: 1}}
+    assert queue.has_active()
+
+
+def test_expired_lease_is_taken_over(queue_file, queue, clock):
+    queue.enqueue('page', [{'start': 0}])
+    task_id, _, _ = queue.claim('w1', lease_seconds=60)
+
+    clock.now += 30
+    assert queue.claim('w2') is None
+
+    clock.now += 31
+    with WorkQueue(queue_file) as other:
+        assert other.claim('w2', lease_seconds=60)[0] == task_id
+
+    # 原工作进程的结果被拒绝，接管者的结果被接受
+    assert not queue.complete(task_id, 'w1', ['stale'])
+    assert queue.complete(task_id, 'w2', ['fresh'])
+    assert queue.results('page') == [({'start': 0}, ['fresh'])]
+
+
+def test_repeatedly_expired_lease_fails(queue, clock):
+    queue.enqueue('page', [{'start': 0}])
+    for _ in range(2):
+        assert queue.claim('w1', lease_seconds=10) is not None
+        clock.now += 11
+
+    assert queue.claim('w1') is None
+    assert queue.failures('page') == [({'start': 0}, '租约多次过期')]
+    assert not queue.has_active()
+
+
+def test_fail_requeues_until_max_attempts(queue):
+    queue.enqueue('cover', [{'url': 'x'}])
+
+    task_id, _, _ = queue.claim('w1')
+    queue.fail(task_id, 'w1', 'timeout')
+    assert queue.counts() == {'cover': {PENDING: 1}}
+
+    task_id, _, _ = queue.claim('w1')
+    queue.fail(task_id, 'w1', 'timeout again')
+    assert queue.counts() == {'cover': {FAILED: 1}}
+    assert queue.failures('cover') == [({'url': 'x'}, 'timeout again')]
+
+
+def test_failed_transaction_rolls_back(queue):
+    queue.enqueue('page', [{'start': 0}])
+    with pytest.raises(RuntimeError):
+        with queue._transaction() as conn:
+            conn.execute("INSERT INTO tasks (kind, payload, created, updated) VALUES ('page', '{}', 0, 0)")
+            raise RuntimeError('中途出错')
+    assert queue.counts() == {'page': {PENDING: 1}}
+
+    # 回滚后连接回到自动提交模式，可以继续开始新事务
+    assert queue.enqueue('page', [{'start': 25}]) == 1
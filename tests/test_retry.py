@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""重试适配器：连接错误和 429/5xx 重试，任何异常都归还限速器的并发名额"""
+
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+
+import douban_retry
+from douban_retry import AdaptiveThrottle, RetryAdapter, parse_retry_after
+
+URL = 'http://douban.test/doulist/1/'
+
+
+def make_response(status_code, headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    response._content = b''
+    response._content_consumed = True
+    return response
+
+
+@pytest.fixture
+def session(monkeypatch):
+    """挂载 RetryAdapter 的会话：adapter_results 中依次为底层 send 的返回值或要抛出的异常"""
+    monkeypatch.setattr(douban_retry.time, 'sleep', lambda seconds: None)
+    results = []
+
+    def send(adapter, request, **kwargs):
+        result = results.pop(0)
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+    monkeypatch.setattr(HTTPAdapter, 'send', send)
+    throttle = AdaptiveThrottle(max_concurrency=1)
+    session = requests.Session()
+    session.mount('http://', RetryAdapter(throttle, retries=2, backoff_base=0))
+    session.throttle = throttle
+    session.adapter_results = results
+    return session
+
+
+def test_retries_connection_errors_then_succeeds(session):
+    session.adapter_results.extend([requests.ConnectionError('reset'), make_response(503), make_response(200)])
+    assert session.get(URL).status_code == 200
+    assert session.throttle.in_flight == 0
+    assert session.throttle.failures == 2
+
+
+def test_gives_up_after_retries(session):
+    session.adapter_results.extend([requests.Timeout('slow')] * 3)
+    with pytest.raises(requests.Timeout):
+        session.get(URL)
+    assert session.throttle.in_flight == 0
+
+
+def test_other_errors_release_the_slot(session):
+    # 并发上限为1：名额未归还时第二次请求会在 acquire() 中永远等待
+    session.adapter_results.extend([requests.exceptions.InvalidHeader('bad'), KeyboardInterrupt(),
+                                    make_response(200)])
+    with pytest.raises(requests.exceptions.InvalidHeader):
+        session.get(URL)
+    with pytest.raises(KeyboardInterrupt):
+        session.get(URL)
+    assert session.throttle.in_flight == 0
+    assert session.get(URL).status_code == 200
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('5') == 5.0
+    assert parse_retry_after('999', max_wait=60) == 60
+    assert parse_retry_after('Thu, 01 Jan 1970 00:00:00 GMT') == 0.0
+    assert parse_retry_after('soon') is None
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""搜索索引：各类查询、增量更新，以及保存后载入结果不变"""
+
+import pytest
+
+from douban_search import SearchIndex
+
+
+def book(number, title, author, publisher, rating):
+    return {'书名': title, '作者': author, '出版社': publisher, '评分': rating,
+            '封面链接': f'https://img.test/s{number}.jpg', '书籍链接': f'https://book.douban.com/subject/{number}/'}
+
+
+BOOKS = [
+    book(1, '三体', '刘慈欣', '重庆出版社', '8.8'),
+    book(2, '三体Ⅱ：黑暗森林', '刘慈欣', '重庆出版社', '9.3'),
+    book(3, '球状闪电', '刘慈欣', '四川科学技术出版社', '8.5'),
+    book(4, '活着', '余华', '作家出版社', '9.4'),
+    book(5, 'Python Cookbook', 'David Beazley', '人民邮电出版社', '9.2'),
+    book(6, '无名之书', '', '', ''),
+]
+
+QUERIES = [
+    {'query': '三体'},
+    {'query': '体', 'field': '书名'},
+    {'query': '三体', 'field': '书名', 'prefix': True},
+    {'query': '刘慈', 'field': '作者', 'prefix': True},
+    {'query': '出版社', 'field': '出版社'},
+    {'publisher': '重庆出版社', 'min_rating': 9},
+    {'min_rating': 9},
+    {'max_rating': 8.8},
+    {'query': 'ｐｙｔｈｏｎ'},
+    {'k': None},
+]
+
+
+def titles(books):
+    return [book.title for book in books]
+
+
+def run_queries(index):
+    return [titles(index.search(**query)) for query in QUERIES]
+
+
+@pytest.fixture
+def index():
+    return SearchIndex(BOOKS)
+
+
+def test_queries(index):
+    assert titles(index.search('三体')) == ['三体Ⅱ：黑暗森林', '三体']
+    assert titles(index.search('刘慈', field='作者', prefix=True, k=2)) == ['三体Ⅱ：黑暗森林', '三体']
+    assert titles(index.search('慈欣', field='作者', prefix=True)) == []
+    assert titles(index.search(publisher='重庆出版社', min_rating=9)) == ['三体Ⅱ：黑暗森林']
+    assert titles(index.search(min_rating=9.2, max_rating=9.3)) == ['三体Ⅱ：黑暗森林', 'Python Cookbook']
+    # 全角和大小写不影响匹配
+    assert titles(index.search('ｐｙｔｈｏｎ')) == ['Python Cookbook']
+    # 无评分的书籍排在最后，也不满足任何评分条件
+    assert titles(index.search(k=None))[-1] == '无名之书'
+    assert '无名之书' not in titles(index.search(max_rating=10))
+
+
+def test_update_by_book_url(index):
+    assert index.update([book(4, '活着', '余华', '作家出版社', '9.0')]) == (0, 1)
+    assert index.search('活着')[0].rating == 9.0
+
+    # 书名变化：替换旧记录，不留下重复的书籍
+    assert index.update([book(1, '三体（典藏版）', '刘慈欣', '重庆出版社', '8.8'), book(7, '兄弟', '余华', '作家出版社', '8.0')]) == (1, 1)
+    assert len(index) == 7
+    assert titles(index.search('三体', field='书名', prefix=True, k=None)) == ['三体Ⅱ：黑暗森林', '三体（典藏版）']
+
+
+def test_save_load_round_trip(index, tmp_path):
+    path = str(tmp_path / 'search.idx')
+    index.update([book(4, '活着', '余华', '作家出版社', '9.1'), book(1, '三体（典藏版）', '刘慈欣', '重庆出版社', '8.8')])
+    expected = run_queries(index)
+
+    index.save(path)
+    loaded = SearchIndex.load(path)
+    assert len(loaded) == len(index)
+    assert run_queries(loaded) == expected
+
+    # 载入后继续更新：按书籍链接找到已有的书籍，不重复加入
+    assert loaded.update([book(3, '球状闪电', '刘慈欣', '四川科学技术出版社', '8.6')]) == (0, 1)
+    assert len(loaded) == len(index)
+
+
+def test_empty_values_survive_save_load(tmp_path):
+    # 出版社只有空字符串一个取值时，其倒排表的唯一键为空字符串
+    path = str(tmp_path / 'search.idx')
+    SearchIndex([book(1, '无名之书', '', '', '7.0')]).save(path)
+
+    loaded = SearchIndex.load(path)
+    assert titles(loaded.search(publisher='')) == ['无名之书']
+    assert titles(loaded.search('无名')) == ['无名之书']
+
+
+def test_empty_index_round_trip(tmp_path):
+    path = str(tmp_path / 'search.idx')
+    SearchIndex().save(path)
+
+    loaded = SearchIndex.load(path)
+    assert len(loaded) == 0
+    assert loaded.search('三体') == []
+    assert loaded.update(BOOKS) == (len(BOOKS), 0)
+    assert run_queries(loaded) == run_queries(SearchIndex(BOOKS))
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / 'search.idx'
+    path.write_bytes(b'not an index')
+    with pytest.raises(ValueError):
+        SearchIndex.load(str(path))
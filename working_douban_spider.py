@@ -6,34 +6,35 @@
 """
 
 import requests
-from bs4 import BeautifulSoup
-import pandas as pd
+import logging
 import time
 import json
 import re
 
-def crawl_douban_books_working(doulist_url, max_pages=10):
+from douban_cache import PAGE_TTL, HttpCache, fetch_bytes
+from douban_parser import extract_author_publisher, parse_doulist_page
+from douban_http import REQUEST_TIMER, create_session
+from douban_metrics import setup_logging
+
+logger = logging.getLogger(__name__)
+
+def crawl_douban_books_working(doulist_url, max_pages=10, backend='html.parser', cache=None):
     """
     爬取豆瓣书单中的书籍信息 - 工作版
     
     Args:
         doulist_url: 豆瓣书单URL
         max_pages: 最大爬取页数
+        backend: 页面解析后端，取值见 douban_parser.PARSER_BACKENDS
+        cache: HttpCache，为None时每次都重新下载
     
     Returns:
         list: 包含书籍信息的字典列表
     """
     
-    # 设置请求头
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-    }
-    
     books_data = []
-    session = requests.Session()
-    session.headers.update(headers)
+    # 共享的会话配置：连接池、压缩、keep-alive、重试与自适应限速
+    session = create_session()
     
     page = 0
     start = 0
@@ -50,12 +51,10 @@ def crawl_douban_books_working(doulist_url, max_pages=10):
         
         try:
             print(f"正在爬取第 {page + 1} 页...")
-            response = session.get(current_url, timeout=10)
-            response.raise_for_status()
-            response.encoding = 'utf-8'
+            content = fetch_bytes(session, current_url, cache, ttl=PAGE_TTL)
             
-            soup = BeautifulSoup(response.text, 'html.parser')
-            items = soup.find_all('div', class_='doulist-item')
+            doulist_page = parse_doulist_page(content, backend, parse_single_book_working)
+            items = doulist_page.books
             
             if not items:
                 print(f"第 {page + 1} 页没有找到书籍，可能已到最后一页")
@@ -65,18 +64,16 @@ def crawl_douban_books_working(doulist_url, max_pages=10):
             
             # 解析每本书的信息
             page_books = 0
-            for i, item in enumerate(items):
-                book_info = parse_single_book_working(item)
+            for book_info in items:
                 if book_info['书名']:
                     books_data.append(book_info)
                     page_books += 1
-                    print(f"  ✓ {book_info['书名']} - {book_info['评分']}")
+                    logger.debug(f"  ✓ {book_info['书名']} - {book_info['评分']}")
             
             print(f"第 {page + 1} 页成功解析 {page_books} 本书籍")
             
             # 检查是否还有下一页
-            next_page = soup.find('span', class_='next')
-            if not next_page or not next_page.find('a'):
+            if not doulist_page.has_next:
                 print("没有找到下一页链接，爬取完成")
                 break
             
@@ -84,9 +81,10 @@ def crawl_douban_books_working(doulist_url, max_pages=10):
             start += 25
             page += 1
             
-            # 添加延时
-            print("等待 2 秒...")
-            time.sleep(2)
+            # 添加延时（间隔随服务器的响应情况自适应调整）
+            delay = session.throttle.delay
+            print(f"等待 {delay:.1f} 秒...")
+            time.sleep(delay)
             
         except requests.RequestException as e:
             print(f"请求第 {page + 1} 页时出错: {e}")
@@ -137,14 +135,8 @@ def parse_single_book_working(item):
         if abstract_div:
             abstract_text = abstract_div.get_text(strip=True)
             
-            # 使用正则表达式提取作者和出版社
-            author_match = re.search(r'作者[:：]\s*(.+?)(?=出版社|出版年|$)', abstract_text)
-            if author_match:
-                book_info['作者'] = author_match.group(1).strip()
-            
-            publisher_match = re.search(r'出版社[:：]\s*(.+?)(?=出版年|$)', abstract_text)
-            if publisher_match:
-                book_info['出版社'] = publisher_match.group(1).strip()
+            # 使用预编译的正则表达式提取作者和出版社
+            book_info['作者'], book_info['出版社'] = extract_author_publisher(abstract_text)
     
     except Exception as e:
         print(f"解析书籍信息时出错: {e}")
@@ -157,6 +149,8 @@ def save_data(books_data, csv_file='douban_books_working.csv', json_file='douban
         print("没有数据可保存")
         return
     
+    import pandas as pd
+    
     # 保存为CSV
     df = pd.DataFrame(books_data)
     df.to_csv(csv_file, index=False, encoding='utf-8-sig')
@@ -185,10 +179,11 @@ def main():
     """主函数"""
     # 目标豆瓣书单URL
     doulist_url = "https://www.douban.com/doulist/45298673/?start=0&sort=seq&playable=0&sub_type="
+    setup_logging()
     
     try:
         # 开始爬取（限制3页进行测试）
-        books_data = crawl_douban_books_working(doulist_url, max_pages=3)
+        books_data = crawl_douban_books_working(doulist_url, max_pages=3, cache=HttpCache())
         
         if books_data:
             # 保存数据
@@ -202,6 +197,7 @@ def main():
             print(f"总书籍数量: {len(books_data)}")
             rated_books = [book for book in books_data if book['评分']]
             print(f"有评分的书籍: {len(rated_books)}")
+            REQUEST_TIMER.print_summary()
             
         else:
             print("没有爬取到任何数据")